@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Project, Document, DocumentPage, Message, Quiz, Question
+from .models import CustomUser, Project, Document, DocumentPage, Message, SuggestedQuestionSet, ConversationSummary, Quiz, Question, BankQuestion, QuizJob
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -37,6 +37,14 @@ class MessageAdmin(admin.ModelAdmin):
     def short_content(self, obj):
         return obj.content[:50] + "..."
 
+@admin.register(SuggestedQuestionSet)
+class SuggestedQuestionSetAdmin(admin.ModelAdmin):
+    list_display = ('project', 'version', 'generated_version', 'updated_at')
+
+@admin.register(ConversationSummary)
+class ConversationSummaryAdmin(admin.ModelAdmin):
+    list_display = ('project', 'summarized_until', 'updated_at')
+
 class QuestionInline(admin.TabularInline):
     model = Question
     extra = 1
@@ -54,3 +62,17 @@ class QuestionAdmin(admin.ModelAdmin):
     
     def short_question(self, obj):
         return obj.question_text[:50] + "..."
+
+@admin.register(BankQuestion)
+class BankQuestionAdmin(admin.ModelAdmin):
+    list_display = ('project', 'quiz_type', 'short_question', 'times_used', 'created_at')
+    list_filter = ('quiz_type', 'project')
+    search_fields = ('question_text',)
+
+    def short_question(self, obj):
+        return obj.question_text[:50] + "..."
+
+@admin.register(QuizJob)
+class QuizJobAdmin(admin.ModelAdmin):
+    list_display = ('project', 'quiz_type', 'num_questions', 'status', 'created_at')
+    list_filter = ('status', 'quiz_type')
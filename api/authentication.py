@@ -1,11 +1,48 @@
+import os
+import threading
+from cachetools import TTLCache
 from rest_framework.authentication import TokenAuthentication
 from rest_framework import exceptions
+from api.services import instrumentation
+
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# token key -> (user, token). Per process: signals invalidate locally, the TTL bounds staleness elsewhere
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
+def invalidate_token(key):
+    with _token_cache_lock:
+        _token_cache.pop(key, None)
+
+def invalidate_user(user_id):
+    with _token_cache_lock:
+        stale = [key for key, (user, _) in _token_cache.items() if user.pk == user_id]
+        for key in stale:
+            del _token_cache[key]
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
 
 class CookieTokenAuthentication(TokenAuthentication):
     def authenticate(self, request):
         token = request.COOKIES.get('auth_token')
-        
+
         if not token:
             return None
-        
+
         return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, key):
+        with _token_cache_lock:
+            cached = _token_cache.get(key)
+        instrumentation.record_cache("token", cached is not None)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        with _token_cache_lock:
+            _token_cache[key] = (user, token)
+        return user, token
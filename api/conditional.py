@@ -0,0 +1,38 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from api.services import instrumentation
+
+def versioned_response(request, version_key, build):
+    """
+    Serves a read endpoint keyed on a version counter that is bumped on every
+    write (see api/signals.py). Answers 304 when the client's If-None-Match
+    still matches, otherwise returns the cached payload for this version,
+    calling build() only on a miss. Superseded versions are never looked up
+    again and simply expire.
+    """
+    digest = hashlib.sha1(repr((version_key, request.get_full_path())).encode()).hexdigest()
+    etag = f'"{digest}"'
+
+    # Weak comparison: CompressionMiddleware sends the tag back as W/"..."
+    client_etags = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+    if etag in client_etags:
+        instrumentation.increment("cache_requests_total", cache="response", result="not_modified")
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        cache_key = f"response:{digest}"
+        data = cache.get(cache_key)
+        instrumentation.record_cache("response", data is not None)
+        if data is None:
+            data = build()
+            cache.set(cache_key, data, settings.RESPONSE_CACHE_TIMEOUT)
+        response = Response(data)
+
+    response['ETag'] = etag
+    # Clients may keep the body but must revalidate before reusing it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,86 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+from chromadb.api.shared_system_client import SharedSystemClient
+from django.core.management.base import BaseCommand
+from api.services.vector_store import ChromaVectorStore
+
+LAYOUTS = [
+    ("per-project", 1),
+    ("shared", 1),
+    ("shared", 4),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds synthetic Chroma databases in each layout (per-project collections, one shared "
+        "collection, sharded shared collections) and compares build time, disk size, the cost of "
+        "opening a project's collection from a cold client, and warm filtered query latency as "
+        "the number of projects grows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', default="10,100,500", help="Comma-separated project counts")
+        parser.add_argument('--chunks', type=int, default=50, help="Chunks per project")
+        parser.add_argument('--dim', type=int, default=256)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        for num_projects in [int(n) for n in options['projects'].split(",")]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{num_projects} projects x {options['chunks']} chunks ({options['dim']} dims)"
+            ))
+            self.stdout.write(f"  {'layout':<16}{'build s':>9}{'disk MB':>9}{'cold open ms':>14}{'query p50 ms':>14}")
+            vectors = rng.normal(size=(num_projects, options['chunks'], options['dim'])).astype(np.float32)
+            for layout, shards in LAYOUTS:
+                row = self._measure(layout, shards, vectors, options['queries'])
+                label = layout if shards == 1 else f"{layout}/{shards}"
+                self.stdout.write(
+                    f"  {label:<16}{row['build']:>9.1f}{row['disk']:>9.1f}{row['cold']:>14.2f}{row['query']:>14.2f}"
+                )
+
+    def _measure(self, layout, shards, vectors, num_queries):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            store = ChromaVectorStore(tmp_dir, layout=layout, shards=shards)
+            project_ids = [f"p{i}" for i in range(len(vectors))]
+            started = time.perf_counter()
+            for project_id, project_vectors in zip(project_ids, vectors):
+                ids = [f"{project_id}_c{j}" for j in range(len(project_vectors))]
+                metadatas = [{"document_id": f"{project_id}_d{j % 3}"} for j in range(len(ids))]
+                store.add(project_id, ids, project_vectors.tolist(), [""] * len(ids), metadatas)
+            build = time.perf_counter() - started
+
+            timings = []
+            for _ in range(num_queries):
+                i = random.randrange(len(project_ids))
+                started = time.perf_counter()
+                store.query(project_ids[i], vectors[i, 0].tolist(), 10, where={"document_id": f"{project_ids[i]}_d1"})
+                timings.append((time.perf_counter() - started) * 1000)
+
+            # A fresh client has to open the project's collection (and its segment files) before querying
+            cold = []
+            for _ in range(5):
+                SharedSystemClient.clear_system_cache()
+                fresh = ChromaVectorStore(tmp_dir, layout=layout, shards=shards)
+                i = random.randrange(len(project_ids))
+                started = time.perf_counter()
+                fresh.query(project_ids[i], vectors[i, 0].tolist(), 10)
+                cold.append((time.perf_counter() - started) * 1000)
+            SharedSystemClient.clear_system_cache()
+
+            disk = sum(
+                os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(tmp_dir) for name in names
+            )
+            return {
+                "build": build, "disk": disk / 2**20,
+                "cold": statistics.median(cold), "query": statistics.median(timings),
+            }
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -0,0 +1,110 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, OperationalError
+from api.models import CustomUser, Project, Document, DocumentPage, Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures read latency while background-ingestion-style writers insert pages and "
+        "update document status, against a throwaway copy of the configured DB_PROFILE. "
+        "Run once per profile (e.g. DB_PROFILE=sqlite-legacy vs DB_PROFILE=sqlite) to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--messages', type=int, default=500, help="Messages in the project being read")
+
+    def handle(self, *args, **options):
+        tmp_dir = None
+        if connection.vendor == 'sqlite':
+            # The default in-memory test database can't be shared between threads
+            tmp_dir = tempfile.mkdtemp()
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp_dir, 'benchmark.sqlite3')
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            project = self._populate(options['messages'])
+            reads, read_errors, writes, write_errors = self._run(project, options)
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if tmp_dir:
+                os.rmdir(tmp_dir)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"DB_PROFILE={settings.DB_PROFILE} ({connection.vendor})"))
+        if reads:
+            quantiles = statistics.quantiles(reads, n=100)
+            self.stdout.write(
+                f"  reads:  {len(reads)} ok, {read_errors} errors | "
+                f"p50 {quantiles[49]:.2f} ms, p95 {quantiles[94]:.2f} ms, p99 {quantiles[98]:.2f} ms, max {max(reads):.2f} ms"
+            )
+        else:
+            self.stdout.write(f"  reads:  0 ok, {read_errors} errors")
+        self.stdout.write(f"  writes: {writes} pages ok, {write_errors} errors")
+
+    def _populate(self, num_messages):
+        user = CustomUser.objects.create(username='benchmark', email='benchmark@example.com')
+        project = Project.objects.create(owner=user, title="Benchmark")
+        Message.objects.bulk_create([
+            Message(project=project, role='user', content=f"message {i}") for i in range(num_messages)
+        ])
+        return project
+
+    def _run(self, project, options):
+        deadline = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        reads, counters = [], {"read_errors": 0, "writes": 0, "write_errors": 0}
+
+        def reader():
+            try:
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        list(Message.objects.filter(project=project).order_by('created_at')[:50])
+                        list(project.documents.all())
+                    except OperationalError:
+                        with lock:
+                            counters["read_errors"] += 1
+                        continue
+                    with lock:
+                        reads.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        def writer(number):
+            # Mirrors DocumentService: one page row plus a status update per page
+            try:
+                document = Document.objects.create(project=project, name=f"w{number}.pdf", file=f"w{number}.pdf", status='processing')
+                page_number = 0
+                while time.monotonic() < deadline:
+                    page_number += 1
+                    try:
+                        with transaction.atomic():
+                            DocumentPage.objects.create(
+                                document=document, page_number=page_number, original_text="x" * 2000, translated_text="y" * 2000
+                            )
+                            Document.objects.filter(id=document.id).update(processing_message=f"page {page_number}")
+                    except OperationalError:
+                        with lock:
+                            counters["write_errors"] += 1
+                        continue
+                    with lock:
+                        counters["writes"] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return reads, counters["read_errors"], counters["writes"], counters["write_errors"]
@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = ('api', '0010_quizjob')
+AFTER = ('api', '0011_composite_indexes')
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds synthetic tables in a throwaway test database and compares query plans "
+        "and latency of the hot list queries before and after the composite index migration."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=100)
+        parser.add_argument('--messages', type=int, default=300, help="Messages per project")
+        parser.add_argument('--documents', type=int, default=5, help="Documents per project")
+        parser.add_argument('--pages', type=int, default=100, help="Pages per document")
+        parser.add_argument('--quizzes', type=int, default=30, help="Quizzes per project")
+        parser.add_argument('--repeat', type=int, default=200, help="Timed runs per query")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._migrate(BEFORE)
+            # Models as of BEFORE: later migrations add columns the benchmark schema lacks,
+            # and 0011 only adds indexes, so the same models serve both runs
+            self.apps = MigrationExecutor(connection).loader.project_state(BEFORE).apps
+            self.stdout.write("Populating synthetic data...")
+            project_ids, document_ids = self._populate(options)
+            before = self._measure(project_ids, document_ids, options['repeat'])
+
+            self._migrate(AFTER)
+            after = self._measure(project_ids, document_ids, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for label in before:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+            self.stdout.write(f"  before: {before[label]['median_ms']:.3f} ms  plan: {before[label]['plan']}")
+            self.stdout.write(f"  after:  {after[label]['median_ms']:.3f} ms  plan: {after[label]['plan']}")
+
+    def _migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _populate(self, options):
+        CustomUser, Project, Document, DocumentPage, Message, Quiz = (
+            self.apps.get_model('api', name)
+            for name in ('CustomUser', 'Project', 'Document', 'DocumentPage', 'Message', 'Quiz')
+        )
+        user = CustomUser.objects.create(username='benchmark', email='benchmark@example.com')
+        projects = Project.objects.bulk_create([
+            Project(owner=user, title=f"Project {i}") for i in range(options['projects'])
+        ])
+        documents = Document.objects.bulk_create([
+            Document(project=project, name=f"doc{j}.pdf", file=f"doc{j}.pdf",
+                     status=random.choice(['processed', 'processing', 'failed']))
+            for project in projects for j in range(options['documents'])
+        ])
+        Message.objects.bulk_create([
+            Message(project=project, role='user' if j % 2 == 0 else 'assistant', content=f"message {j}")
+            for project in projects for j in range(options['messages'])
+        ], batch_size=5000)
+        DocumentPage.objects.bulk_create([
+            DocumentPage(document=document, page_number=n, original_text="text", translated_text="텍스트")
+            for document in documents for n in random.sample(range(1, options['pages'] + 1), options['pages'])
+        ], batch_size=5000)
+        Quiz.objects.bulk_create([
+            Quiz(project=project, title=f"Quiz {j}") for project in projects for j in range(options['quizzes'])
+        ], batch_size=5000)
+        return [p.id for p in projects], [d.id for d in documents]
+
+    def _queries(self, project_id, document_id):
+        Document, DocumentPage, Message, Quiz = (
+            self.apps.get_model('api', name) for name in ('Document', 'DocumentPage', 'Message', 'Quiz')
+        )
+        return {
+            "Messages by project, oldest first": Message.objects.filter(project_id=project_id).order_by('created_at')[:50],
+            "Processed documents in project": Document.objects.filter(project_id=project_id, status='processed'),
+            "Pages of a document in order": DocumentPage.objects.filter(document_id=document_id).order_by('page_number')[:20],
+            "Quizzes by project, newest first": Quiz.objects.filter(project_id=project_id).order_by('-created_at')[:50],
+        }
+
+    def _measure(self, project_ids, document_ids, repeat):
+        results = {}
+        sample = self._queries(project_ids[0], document_ids[0])
+        timings = {label: [] for label in sample}
+        # Times the compiled SQL directly so ORM model construction doesn't mask the plan difference
+        with connection.cursor() as cursor:
+            for run in range(repeat + 10):
+                queries = self._queries(random.choice(project_ids), random.choice(document_ids))
+                for label, queryset in queries.items():
+                    sql, params = queryset.query.sql_with_params()
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    if run >= 10:  # warm-up
+                        timings[label].append((time.perf_counter() - started) * 1000)
+        for label, queryset in sample.items():
+            results[label] = {
+                "median_ms": statistics.median(timings[label]),
+                "plan": " | ".join(line.strip() for line in queryset.explain().splitlines()),
+            }
+        return results
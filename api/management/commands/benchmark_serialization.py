@@ -0,0 +1,84 @@
+import gzip
+import statistics
+import time
+import uuid
+import zstandard
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from api.middleware import GZIP_LEVEL, ZSTD_LEVEL
+from api.models import DocumentPage, Message
+from api.renderers import ORJSONRenderer
+from api.serializers import DocumentPageSerializer, MessageSerializer
+
+PAGE_MARKDOWN = (
+    "### 행렬의 고유값 분해\n\n"
+    "- **정의**: 정방행렬 A에 대해 Av = λv 를 만족하는 스칼라 λ 와 벡터 v\n"
+    "- **성질**: 대칭행렬의 고유벡터는 서로 직교한다.\n\n"
+    "An eigendecomposition factorizes a matrix into its eigenvalues and eigenvectors. "
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares DRF's JSON renderer with the orjson renderer and measures gzip/zstd "
+        "sizes for page-list and message-list sized payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=100, help="Pages in the page-list payload")
+        parser.add_argument('--messages', type=int, default=50, help="Messages in the message-list payload")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        payloads = {
+            f"{options['pages']} document pages": self._page_payload(options['pages']),
+            f"{options['messages']} messages with sources": self._message_payload(options['messages']),
+        }
+        for label, data in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+            for name, renderer in (("DRF JSONRenderer", JSONRenderer()), ("ORJSONRenderer", ORJSONRenderer())):
+                ms, body = self._time(lambda: renderer.render(data), options['repeat'])
+                self.stdout.write(f"  {name:<18} {ms:8.3f} ms  {len(body):>9,} bytes")
+
+            body = ORJSONRenderer().render(data)
+            for name, compress in (
+                (f"gzip -{GZIP_LEVEL}", lambda: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)),
+                (f"zstd -{ZSTD_LEVEL}", lambda: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)),
+            ):
+                ms, compressed = self._time(compress, options['repeat'])
+                self.stdout.write(
+                    f"  {name:<18} {ms:8.3f} ms  {len(compressed):>9,} bytes ({len(compressed) / len(body):.0%})"
+                )
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
+
+    def _page_payload(self, num_pages):
+        pages = [
+            DocumentPage(
+                id=uuid.uuid4(), page_number=n,
+                original_text=PAGE_MARKDOWN * 12, translated_text=PAGE_MARKDOWN * 14
+            )
+            for n in range(1, num_pages + 1)
+        ]
+        return {"next": None, "previous": None, "results": DocumentPageSerializer(pages, many=True).data}
+
+    def _message_payload(self, num_messages):
+        messages = [
+            Message(
+                id=uuid.uuid4(), role='assistant', content=PAGE_MARKDOWN * 4, created_at=timezone.now(),
+                sources=[
+                    {"document_id": str(uuid.uuid4()), "page": p, "name": "lecture.pdf",
+                     "content_snippet": PAGE_MARKDOWN[:100] + "..."}
+                    for p in range(5)
+                ]
+            )
+            for _ in range(num_messages)
+        ]
+        return {"next": None, "previous": None, "results": MessageSerializer(messages, many=True).data}
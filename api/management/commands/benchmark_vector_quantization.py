@@ -0,0 +1,101 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from api.services.chroma_service import ChromaService
+from api.services.vector_store import FlatVectorStore, normalize
+
+# (dtype, truncated dimensions, re-score with float32)
+CONFIGS = [
+    ("float32", None, False),
+    ("float16", None, False),
+    ("int8", None, False),
+    ("int8", None, True),
+    ("float16", 512, True),
+    ("int8", 512, False),
+    ("int8", 512, True),
+    ("int8", 256, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares flat-store encodings (float16/int8, dimension truncation, float32 re-scoring) "
+        "by recall@k against exact float32 search, query latency, scanned memory and disk size. "
+        "Uses a real project's embeddings with --project, otherwise synthetic clustered vectors "
+        "whose variance decays across dimensions like text-embedding-3's."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', help="Project id whose stored embeddings to use")
+        parser.add_argument('--chunks', type=int, default=5000)
+        parser.add_argument('--dim', type=int, default=1536)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--k', type=int, default=10)
+
+    def handle(self, *args, **options):
+        vectors = self._vectors(options)
+        rng = np.random.default_rng(1)
+        picks = rng.choice(len(vectors), size=min(options['queries'], len(vectors)), replace=False)
+        noise = rng.normal(scale=0.5 / np.sqrt(vectors.shape[1]), size=(len(picks), vectors.shape[1]))
+        queries = normalize((vectors[picks] + noise).astype(np.float32))
+        k = options['k']
+        exact = [set(np.argsort(-(vectors @ query))[:k]) for query in queries]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(vectors)} chunks x {vectors.shape[1]} dims, {len(queries)} queries, recall@{k}"
+        ))
+        self.stdout.write(f"  {'encoding':<26}{'recall':>8}{'p50 ms':>9}{'cold ms':>9}{'scanned':>11}{'disk':>11}")
+        for dtype, dimensions, rescore in CONFIGS:
+            if dimensions and dimensions >= vectors.shape[1]:
+                continue
+            row = self._measure(vectors, queries, exact, k, dtype, dimensions, rescore)
+            label = f"{dtype}" + (f"/{dimensions}d" if dimensions else "") + (" +rescore" if rescore else "")
+            self.stdout.write(
+                f"  {label:<26}{row['recall']:>8.3f}{row['p50']:>9.2f}{row['cold']:>9.2f}"
+                f"{row['scanned'] / 2**20:>9.1f}MB{row['disk'] / 2**20:>9.1f}MB"
+            )
+
+    def _vectors(self, options):
+        if options['project']:
+            _, _, _, embeddings = ChromaService().get_embeddings(options['project'])
+            return normalize(np.asarray(embeddings, dtype=np.float32))
+
+        rng = np.random.default_rng(0)
+        dim = options['dim']
+        scale = 1 / np.sqrt(1 + np.arange(dim) / 64)
+        centers = rng.normal(size=(max(options['chunks'] // 50, 1), dim)) * scale
+        members = rng.integers(len(centers), size=options['chunks'])
+        vectors = centers[members] + rng.normal(scale=0.6, size=(options['chunks'], dim)) * scale
+        return normalize(vectors.astype(np.float32))
+
+    def _measure(self, vectors, queries, exact, k, dtype, dimensions, rescore):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            store = FlatVectorStore(tmp_dir, dtype=dtype, dimensions=dimensions, rescore=rescore)
+            ids = [str(i) for i in range(len(vectors))]
+            store.add('bench', ids, vectors, [''] * len(ids), [{}] * len(ids))
+            index = store._load('bench')
+            scanned = index.vectors.nbytes + (index.scales.nbytes if index.scales is not None else 0)
+            directory = store._dir('bench')
+            disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+            started = time.perf_counter()
+            FlatVectorStore(tmp_dir, dtype=dtype, dimensions=dimensions, rescore=rescore).query('bench', queries[0], k)
+            cold = (time.perf_counter() - started) * 1000
+
+            timings, hits = [], 0
+            for query, expected in zip(queries, exact):
+                started = time.perf_counter()
+                found, _, _ = store.query('bench', query, k)
+                timings.append((time.perf_counter() - started) * 1000)
+                hits += len(expected & {int(i) for i in found})
+            return {
+                "recall": hits / (len(queries) * k), "p50": statistics.median(timings),
+                "cold": cold, "scanned": scanned, "disk": disk,
+            }
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services.chroma_service import ChromaService
+from api.services.vector_store import ChromaVectorStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves per-project `project_<id>` Chroma collections into the shared layout "
+        "(one collection, or --shards collections, partitioned by project_id metadata). "
+        "Run it before switching CHROMA_LAYOUT=shared; it is safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, help="Shared collections to spread projects over (default CHROMA_SHARDS)")
+        parser.add_argument('--batch', type=int, default=1000, help="Chunks copied per request")
+        parser.add_argument('--keep', action='store_true', help="Keep the per-project collections after copying")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        configured = ChromaService().backend("chroma")
+        shards = options['shards'] or configured.shards
+        source = ChromaVectorStore(configured.path, layout="per-project")
+        target = ChromaVectorStore(configured.path, layout="shared", shards=shards)
+
+        names = [c.name for c in source.client.list_collections() if c.name.startswith("project_")]
+        self.stdout.write(f"{len(names)} per-project collections to move into {shards} shared collection(s)")
+        moved = chunks = 0
+        for name in names:
+            project_id = name[len("project_"):]
+            collection = source.client.get_collection(name=name)
+            total = collection.count()
+            if options['dry_run']:
+                self.stdout.write(f"  {name}: {total} chunks -> {target.collection_name(project_id)}")
+                continue
+
+            for offset in range(0, total, options['batch']):
+                page = collection.get(
+                    limit=options['batch'], offset=offset, include=["documents", "metadatas", "embeddings"]
+                )
+                target.add(project_id, page['ids'], page['embeddings'], page['documents'], page['metadatas'])
+
+            copied = target.count(project_id)
+            if copied < total:
+                raise CommandError(f"{name}: copied {copied} of {total} chunks; per-project collection kept")
+            if not options['keep']:
+                source.drop(project_id)
+            moved += 1
+            chunks += total
+            self.stdout.write(f"  {name}: {total} chunks")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} projects ({chunks} chunks)."))
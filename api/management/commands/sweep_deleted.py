@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.models import Document, Project
+from api.services.deletion_service import DeletionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Reclaims rows, vectors, keyword index entries and files of tombstoned projects and documents. "
+        "Deletes sweep on their own; run this after a crash or restart left tombstones behind."
+    )
+
+    def handle(self, *args, **options):
+        pending_projects = Project.all_objects.filter(deleted_at__isnull=False).count()
+        pending = Document.all_objects.filter(deleted_at__isnull=False).count()
+        DeletionService().sweep()
+        remaining_projects = Project.all_objects.filter(deleted_at__isnull=False).count()
+        remaining = Document.all_objects.filter(deleted_at__isnull=False).count()
+        self.stdout.write(
+            f"Reclaimed {pending_projects - remaining_projects} of {pending_projects} tombstoned projects "
+            f"and {pending - remaining} of {pending} tombstoned documents."
+        )
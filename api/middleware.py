@@ -0,0 +1,54 @@
+import gzip
+import re
+import zstandard
+from django.utils.cache import patch_vary_headers
+
+COMPRESSIBLE_TYPES = re.compile(r'^(application/json|text/)')
+MIN_COMPRESS_SIZE = 1024
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+class CompressionMiddleware:
+    """
+    Compresses non-streaming JSON/text responses of at least MIN_COMPRESS_SIZE
+    bytes with zstd when the client accepts it, otherwise gzip. Strong ETags
+    are weakened, as in Django's GZipMiddleware. Event streams are streaming
+    responses and are left alone.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < MIN_COMPRESS_SIZE
+            or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', ''))
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = {
+            encoding.split(';')[0].strip().lower()
+            for encoding in request.headers.get('Accept-Encoding', '').split(',')
+        }
+        if 'zstd' in accepted:
+            encoding = 'zstd'
+            compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(response.content)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = gzip.compress(response.content, compresslevel=GZIP_LEVEL, mtime=0)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_quiz_quiz_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestedQuestionSet',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('questions', models.JSONField(blank=True, default=list)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('generated_version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion_set', to='api.project')),
+            ],
+        ),
+    ]
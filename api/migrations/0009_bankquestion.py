@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_conversationsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankQuestion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quiz_type', models.CharField(choices=[('MULTIPLE_CHOICE', 'Multiple Choice'), ('FLASHCARD', 'Flashcard')], default='MULTIPLE_CHOICE', max_length=20)),
+                ('question_text', models.TextField()),
+                ('options', models.JSONField(default=list)),
+                ('answer', models.CharField(max_length=255)),
+                ('times_used', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_bank', to='api.project')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:15
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_bankquestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quiz_type', models.CharField(choices=[('MULTIPLE_CHOICE', 'Multiple Choice'), ('FLASHCARD', 'Flashcard')], default='MULTIPLE_CHOICE', max_length=20)),
+                ('num_questions', models.PositiveIntegerField(default=5)),
+                ('document_ids', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(default='queued', max_length=50)),
+                ('processing_message', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_jobs', to='api.project')),
+                ('quiz', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job', to='api.quiz')),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+def remove_duplicate_pages(apps, schema_editor):
+    """Keeps one page per (document, page_number) so the unique constraint can be added."""
+    DocumentPage = apps.get_model('api', 'DocumentPage')
+    seen = set()
+    duplicates = []
+    for page_id, document_id, page_number in DocumentPage.objects.order_by(
+        'document_id', 'page_number', 'id'
+    ).values_list('id', 'document_id', 'page_number'):
+        key = (document_id, page_number)
+        if key in seen:
+            duplicates.append(page_id)
+        seen.add(key)
+    DocumentPage.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_quizjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['project', 'status'], name='document_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['project', 'created_at'], name='document_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['project', 'created_at'], name='message_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['project', 'created_at'], name='quiz_project_created_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_pages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='documentpage',
+            constraint=models.UniqueConstraint(fields=('document', 'page_number'), name='documentpage_unique_page'),
+        ),
+    ]
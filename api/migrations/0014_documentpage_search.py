@@ -0,0 +1,88 @@
+from django.db import migrations
+
+# FTS5 table holding its own copy of each page's text, kept in sync by
+# triggers. Its rowid comes from api_documentpage_search_key, whose explicit
+# INTEGER PRIMARY KEY VACUUM leaves alone (unlike api_documentpage's implicit
+# rowid) and whose UNIQUE page_id gives the triggers an indexed lookup.
+# unicode61 splits on whitespace/punctuation; searches use prefix terms so
+# "행렬" also finds "행렬의" and "행렬은". SQLite drops the triggers when a later
+# migration rebuilds api_documentpage; such a migration must recreate them.
+SQLITE_FORWARD = [
+    """
+    CREATE TABLE api_documentpage_search_key (
+        id INTEGER PRIMARY KEY,
+        page_id char(32) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE api_documentpage_fts USING fts5(
+        original_text, translated_text,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER api_documentpage_fts_insert AFTER INSERT ON api_documentpage BEGIN
+        INSERT INTO api_documentpage_search_key(page_id) VALUES (new.id);
+        INSERT INTO api_documentpage_fts(rowid, original_text, translated_text)
+        SELECT id, new.original_text, new.translated_text
+        FROM api_documentpage_search_key WHERE page_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_documentpage_fts_delete AFTER DELETE ON api_documentpage BEGIN
+        DELETE FROM api_documentpage_fts
+        WHERE rowid = (SELECT id FROM api_documentpage_search_key WHERE page_id = old.id);
+        DELETE FROM api_documentpage_search_key WHERE page_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_documentpage_fts_update AFTER UPDATE OF original_text, translated_text ON api_documentpage BEGIN
+        UPDATE api_documentpage_fts SET original_text = new.original_text, translated_text = new.translated_text
+        WHERE rowid = (SELECT id FROM api_documentpage_search_key WHERE page_id = old.id);
+    END
+    """,
+    "INSERT INTO api_documentpage_search_key(page_id) SELECT id FROM api_documentpage",
+    """
+    INSERT INTO api_documentpage_fts(rowid, original_text, translated_text)
+    SELECT k.id, p.original_text, p.translated_text
+    FROM api_documentpage p JOIN api_documentpage_search_key k ON k.page_id = p.id
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_documentpage_fts_update",
+    "DROP TRIGGER IF EXISTS api_documentpage_fts_delete",
+    "DROP TRIGGER IF EXISTS api_documentpage_fts_insert",
+    "DROP TABLE IF EXISTS api_documentpage_fts",
+    "DROP TABLE IF EXISTS api_documentpage_search_key",
+]
+
+# Expression GIN index; PostgreSQL maintains it on every write
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX api_documentpage_search_idx ON api_documentpage USING GIN (
+        to_tsvector('simple', coalesce(original_text, '') || ' ' || coalesce(translated_text, ''))
+    )
+    """,
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS api_documentpage_search_idx"]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_document_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from .user import CustomUser
 from .project import Project
 from .document import Document, DocumentPage
-from .chat import Message
-from .quiz import Quiz, Question
+from .chat import Message, SuggestedQuestionSet, ConversationSummary
+from .quiz import Quiz, Question, BankQuestion, QuizJob
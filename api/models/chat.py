@@ -10,5 +10,35 @@ class Message(models.Model):
     sources = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['project', 'created_at'], name='message_project_created_idx')]
+
     def __str__(self):
         return f"[{self.role}] {self.content[:50]}..."
+
+class SuggestedQuestionSet(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='suggestion_set')
+    questions = models.JSONField(default=list, blank=True)
+    # Bumped whenever the inputs change; the set is fresh when generated_version == version
+    version = models.PositiveIntegerField(default=1)
+    generated_version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_stale(self):
+        return self.generated_version != self.version
+
+    def __str__(self):
+        return f"Suggestions for {self.project.title}"
+
+class ConversationSummary(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='conversation_summary')
+    summary = models.TextField(blank=True, default='')
+    # created_at of the newest message folded into the summary
+    summarized_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Conversation summary for {self.project.title}"
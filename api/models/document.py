@@ -2,6 +2,11 @@ import uuid
 from django.db import models
 from .project import Project
 
+class LiveDocumentManager(models.Manager):
+    """Hides tombstoned documents; the sweeper reclaims them through `all_objects`."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Document(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='documents')
@@ -10,6 +15,19 @@ class Document(models.Model):
     status = models.CharField(max_length=50, default='processed')
     processing_message = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever one of the document's pages is written; drives the page list ETag
+    version = models.PositiveIntegerField(default=1)
+    # Set on delete; vectors, files and the row itself are removed by DeletionService.sweep
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = LiveDocumentManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'status'], name='document_project_status_idx'),
+            models.Index(fields=['project', 'created_at'], name='document_project_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,6 +41,10 @@ class DocumentPage(models.Model):
 
     class Meta:
         ordering = ['page_number']
+        # Also serves the per-document page_number ordering
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'page_number'], name='documentpage_unique_page'),
+        ]
 
     def __str__(self):
         return f"{self.document.name} - Page {self.page_number}"
@@ -2,6 +2,11 @@ import uuid
 from django.db import models
 from .user import CustomUser
 
+class LiveProjectManager(models.Manager):
+    """Hides tombstoned projects; the sweeper reclaims them through `all_objects`."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Project(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='projects')
@@ -9,6 +14,13 @@ class Project(models.Model):
     description = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped (see api/signals.py) whenever the project or its documents, messages or quizzes change; drives ETags
+    version = models.PositiveIntegerField(default=1)
+    # Set on delete; vectors, files and every row of the project are removed by DeletionService.sweep
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = LiveProjectManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"{self.title} (Owner: {self.owner.username})"
@@ -2,13 +2,18 @@ import uuid
 from django.db import models
 from .project import Project
 
+QUIZ_TYPE_CHOICES = [('MULTIPLE_CHOICE', 'Multiple Choice'), ('FLASHCARD', 'Flashcard')]
+
 class Quiz(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='quizzes')
     title = models.CharField(max_length=255, default="Generated Quiz")
-    quiz_type = models.CharField(max_length=20, choices=[('MULTIPLE_CHOICE', 'Multiple Choice'), ('FLASHCARD', 'Flashcard')], default='MULTIPLE_CHOICE')
+    quiz_type = models.CharField(max_length=20, choices=QUIZ_TYPE_CHOICES, default='MULTIPLE_CHOICE')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['project', 'created_at'], name='quiz_project_created_idx')]
+
     def __str__(self):
         return self.title
 
@@ -22,3 +27,33 @@ class Question(models.Model):
 
     def __str__(self):
         return self.question_text[:50]
+
+class BankQuestion(models.Model):
+    """Pre-generated question kept per project so quizzes can be assembled without an LLM call."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='question_bank')
+    quiz_type = models.CharField(max_length=20, choices=QUIZ_TYPE_CHOICES, default='MULTIPLE_CHOICE')
+    question_text = models.TextField()
+    options = models.JSONField(default=list)
+    answer = models.CharField(max_length=255)
+    times_used = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.question_text[:50]
+
+class QuizJob(models.Model):
+    """Background quiz generation request; reports progress like Document processing."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='quiz_jobs')
+    quiz_type = models.CharField(max_length=20, choices=QUIZ_TYPE_CHOICES, default='MULTIPLE_CHOICE')
+    num_questions = models.PositiveIntegerField(default=5)
+    document_ids = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=50, default='queued')
+    processing_message = models.CharField(max_length=255, blank=True, null=True)
+    quiz = models.OneToOneField(Quiz, on_delete=models.SET_NULL, null=True, blank=True, related_name='job')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Quiz job {self.id} ({self.status})"
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Oldest-first cursor over created_at; clients follow `next` for more."""
+    ordering = 'created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+class NewestFirstCursorPagination(CreatedAtCursorPagination):
+    ordering = '-created_at'
+
+class PageNumberCursorPagination(CursorPagination):
+    ordering = 'page_number'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CustomUser, Project, Document, Message, DocumentPage, Quiz, Question
+from .models import CustomUser, Project, Document, Message, DocumentPage, Quiz, Question, QuizJob
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,12 +16,36 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
 
+class FieldSelectionMixin:
+    """
+    Limits a serializer to the comma-separated `?fields=` query parameter.
+    Unknown names are ignored; without the parameter every field is returned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request else None
+        if requested:
+            allowed = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Model columns to load with only(), or None when every field is needed."""
+        requested = request.query_params.get('fields')
+        if not requested:
+            return None
+        fields = [name for name in cls.Meta.fields if name in {n.strip() for n in requested.split(',')}]
+        return fields or None
+
 class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = ['id', 'name', 'file', 'status', 'processing_message', 'created_at']
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'role', 'content', 'sources', 'created_at']
@@ -33,7 +57,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = Project
         fields = ['id', 'title', 'description', 'created_at', 'updated_at', 'documents']
 
-class DocumentPageSerializer(serializers.ModelSerializer):
+class DocumentPageSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     class Meta:
         model = DocumentPage
         fields = ['id', 'page_number', 'original_text', 'translated_text']
@@ -48,4 +72,23 @@ class QuizSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'quiz_type', 'created_at', 'questions']
\ No newline at end of file
+        fields = ['id', 'title', 'quiz_type', 'created_at', 'questions']
+
+class QuizJobSerializer(serializers.ModelSerializer):
+    quiz = QuizSerializer(read_only=True)
+
+    class Meta:
+        model = QuizJob
+        fields = ['id', 'status', 'processing_message', 'quiz_type', 'num_questions', 'document_ids', 'quiz', 'created_at', 'updated_at']
+
+class DocumentScopeSerializer(serializers.Serializer):
+    """Optional subset of a project's documents to restrict retrieval to."""
+    document_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=True)
+
+    def validate_document_ids(self, value):
+        project = self.context['project']
+        known = set(project.documents.filter(id__in=value).values_list('id', flat=True))
+        unknown = [str(doc_id) for doc_id in value if doc_id not in known]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown document ids: {', '.join(unknown)}")
+        return [str(doc_id) for doc_id in value]
@@ -0,0 +1,35 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BACKGROUND_WORKERS", "4")),
+    thread_name_prefix="api-background"
+)
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, '__qualname__', func))
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs):
+    """Runs func on the shared background worker pool."""
+    return _executor.submit(_run, func, args, kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """Runs func on the worker pool once the current transaction commits."""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))
+
+
+def queue_depth():
+    """Tasks waiting for a free worker."""
+    return _executor._work_queue.qsize()
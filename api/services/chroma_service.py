@@ -1,12 +1,36 @@
+import contextlib
+import logging
 import os
-import chromadb
+import threading
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from . import instrumentation
+from .llm_limiter import Priority, embed_query
+from .vector_store import ChromaVectorStore, FlatVectorStore
+
+logger = logging.getLogger(__name__)
+
+# "auto" keeps new projects in the flat store until they outgrow FLAT_INDEX_MAX_CHUNKS
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "auto")
+FLAT_INDEX_MAX_CHUNKS = int(os.getenv("FLAT_INDEX_MAX_CHUNKS", "20000"))
+# "per-project" collections, or "shared" collection(s) partitioned by project_id metadata
+CHROMA_LAYOUT = os.getenv("CHROMA_LAYOUT", "per-project")
+CHROMA_SHARDS = int(os.getenv("CHROMA_SHARDS", "1"))
+# float32, float16 or int8; with FLAT_INDEX_DIMENSIONS the scanned vectors are also truncated
+FLAT_INDEX_DTYPE = os.getenv("FLAT_INDEX_DTYPE", "float32")
+FLAT_INDEX_DIMENSIONS = int(os.getenv("FLAT_INDEX_DIMENSIONS", "0")) or None
+# Keeps float32 copies on disk to re-score the final candidates of compact encodings
+FLAT_INDEX_RESCORE = os.getenv("FLAT_INDEX_RESCORE", "true").lower() == "true"
 
 class ChromaService:
+    """
+    Vector storage for project chunks. Each project lives in one backend:
+    Chroma (HNSW) or the memory-mapped flat store for small projects.
+    """
     _instance = None
-    _client = None
     _embeddings = None
+    _stores = None
+    _lock = None
 
     def __new__(cls):
         """Singleton pattern to ensure one DB connection"""
@@ -18,35 +42,128 @@ class ChromaService:
     @classmethod
     def _initialize(cls):
         CHROMA_PERSIST_DIR = "chroma_db"
-        cls._client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+        FLAT_INDEX_DIR = "vector_index"
+        cls._stores = {
+            "chroma": ChromaVectorStore(CHROMA_PERSIST_DIR, layout=CHROMA_LAYOUT, shards=CHROMA_SHARDS),
+            "flat": FlatVectorStore(
+                FLAT_INDEX_DIR, dtype=FLAT_INDEX_DTYPE,
+                dimensions=FLAT_INDEX_DIMENSIONS, rescore=FLAT_INDEX_RESCORE
+            ),
+        }
+        cls._lock = threading.Lock()
         cls._embeddings = OpenAIEmbeddings(
             model="text-embedding-3-small",
             api_key=os.getenv("OPENAI_API_KEY")
         )
 
-    def get_collection_name(self, project_id: str) -> str:
-        return f"project_{project_id}"
+    def backend(self, name: str):
+        return self._stores[name]
+
+    def store_for(self, project_id: str):
+        """The backend holding the project; projects with no chunks yet go to the default one."""
+        if VECTOR_BACKEND != "auto":
+            return self._stores[VECTOR_BACKEND]
+        flat = self._stores["flat"]
+        if flat.exists(project_id):
+            return flat
+        chroma = self._stores["chroma"]
+        if chroma.exists(project_id):
+            return chroma
+        return flat
+
+    @contextlib.contextmanager
+    def _resolved(self, project_id: str):
+        """
+        Yields the backend holding the project for a write. Promotion runs under
+        the flat store's project lock, so resolving under it too means no other
+        worker can move the project between the choice and the write.
+        """
+        if VECTOR_BACKEND != "auto":
+            yield self._stores[VECTOR_BACKEND]
+            return
+        with self._stores["flat"].writing(project_id):
+            yield self.store_for(project_id)
+
+    def add_chunks(self, project_id: str, ids, embeddings, documents, metadatas):
+        project_id = str(project_id)
+        with self._lock, self._resolved(project_id) as store:
+            if (VECTOR_BACKEND == "auto" and store.name == "flat" and store.keeps_full_width
+                    and store.count(project_id) + len(ids) > FLAT_INDEX_MAX_CHUNKS):
+                store = self._promote(project_id)
+            with instrumentation.timed("vector_add"):
+                store.add(project_id, ids, embeddings, documents, metadatas)
+
+    def _promote(self, project_id: str):
+        """Moves a project that outgrew exact search into Chroma."""
+        flat, chroma = self._stores["flat"], self._stores["chroma"]
+        moved = flat.move_to(project_id, chroma)
+        logger.info("Moved project %s (%d chunks) from the flat store to Chroma", project_id, moved)
+        return chroma
 
-    def get_or_create_collection(self, project_id: str):
-        collection_name = self.get_collection_name(project_id)
-        return self._client.get_or_create_collection(name=collection_name)
+    def count(self, project_id: str) -> int:
+        project_id = str(project_id)
+        return self.store_for(project_id).count(project_id)
 
-    def get_vector_store(self, project_id: str):
-        collection_name = self.get_collection_name(project_id)
-        return Chroma(
-            client=self._client,
-            collection_name=collection_name,
-            embedding_function=self._embeddings
+    def document_filter(self, document_ids=None):
+        """Chroma `where` clause restricting a query to the given documents."""
+        if not document_ids:
+            return None
+        if len(document_ids) == 1:
+            return {"document_id": str(document_ids[0])}
+        return {"document_id": {"$in": [str(doc_id) for doc_id in document_ids]}}
+
+    def similarity_search(self, project_id: str, query: str, k: int = 10, document_ids=None,
+                          priority=Priority.INTERACTIVE):
+        """
+        Dense top-k search returning langchain Documents with chunk ids set.
+        Skips the embedding call when the project has no chunks.
+        """
+        project_id = str(project_id)
+        store = self.store_for(project_id)
+        if not store.exists(project_id):
+            return []
+
+        with instrumentation.timed("embed_query"):
+            embedding = embed_query(self._embeddings, query, priority=priority)
+        with instrumentation.timed("vector_query"):
+            ids, documents, metadatas = store.query(
+                project_id, embedding, k, where=self.document_filter(document_ids)
+            )
+        return [
+            Document(id=chunk_id, page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(ids, documents, metadatas)
+        ]
+
+    def get_chunks(self, project_id: str):
+        """Returns (ids, documents, metadatas) for every chunk in the project."""
+        project_id = str(project_id)
+        ids, documents, metadatas, _ = self.store_for(project_id).get(project_id)
+        return ids, documents, metadatas
+
+    def get_embeddings(self, project_id: str, document_ids=None):
+        """Returns (ids, documents, metadatas, embeddings) for the project's stored chunks."""
+        project_id = str(project_id)
+        return self.store_for(project_id).get(
+            project_id, where=self.document_filter(document_ids), include_embeddings=True
         )
 
     def delete_collection(self, project_id: str):
-        pass
+        """Drops the project's chunks in one operation, whichever backend holds them."""
+        project_id = str(project_id)
+        dropped = [store.drop(project_id) for store in self._stores.values()]
+        return any(dropped)
+
+    def delete_documents(self, project_id: str, document_ids):
+        """Deletes every chunk of the given documents with a single filtered delete."""
+        project_id = str(project_id)
+        with self._resolved(project_id) as store:
+            if not store.exists(project_id):
+                return False
+            return store.delete(project_id, self.document_filter(document_ids))
 
-    def delete_documents(self, project_id: str, document_id: str):
-        collection_name = self.get_collection_name(project_id)
-        collection = self._client.get_collection(name=collection_name)
-        collection.delete(where={"document_id": document_id})
-        return True
+    def warm(self, project_id: str):
+        project_id = str(project_id)
+        self.store_for(project_id).warm(project_id)
 
     @property
     def embeddings(self):
@@ -0,0 +1,136 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.documents import Document
+from . import instrumentation
+
+NUM_CLUSTERS = int(os.getenv("QUIZ_CONTEXT_CLUSTERS", "30"))
+MAX_CLUSTER_POINTS = 5000
+CACHE_SIZE = 64
+
+
+def kmeans(X: np.ndarray, k: int, iterations: int = 25, seed: int = 0):
+    """Plain k-means with k-means++ seeding. Returns (labels, centroids)."""
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    centroids = np.empty((k, X.shape[1]), dtype=X.dtype)
+    centroids[0] = X[rng.integers(n)]
+    closest = ((X - centroids[0]) ** 2).sum(axis=1)
+    for j in range(1, k):
+        total = closest.sum()
+        idx = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centroids[j] = X[idx]
+        closest = np.minimum(closest, ((X - centroids[j]) ** 2).sum(axis=1))
+
+    x_norms = (X ** 2).sum(axis=1)[:, None]
+    labels = np.zeros(n, dtype=np.int64)
+    for _ in range(iterations):
+        distances = x_norms - 2 * X @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+        new_labels = distances.argmin(axis=1)
+        if _ and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for j in range(k):
+            members = X[labels == j]
+            if len(members):
+                centroids[j] = members.mean(axis=0)
+    return labels, centroids
+
+
+class RepresentativeChunkSelector:
+    """
+    Picks quiz context by clustering a project's stored chunk embeddings and
+    taking the chunk closest to each centroid, so different quizzes cover
+    different topics. Uses only vectors already in Chroma (no embedding calls);
+    cluster assignments are cached per document-set version.
+    """
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, chroma_service):
+        self.chroma_service = chroma_service
+
+    def select(self, project_id, num_chunks, document_ids=None, rng=None):
+        clusters = self._get_clusters(str(project_id), document_ids)
+        if not clusters:
+            return []
+
+        rng = rng or np.random.default_rng()
+        if num_chunks < len(clusters):
+            # Sample topics weighted towards larger clusters, varying across quizzes
+            sizes = np.array([len(cluster) for cluster in clusters], dtype=np.float64)
+            weights = np.sqrt(sizes) / np.sqrt(sizes).sum()
+            picked = sorted(rng.choice(len(clusters), size=num_chunks, replace=False, p=weights))
+            return [clusters[i][0] for i in picked]
+
+        # More chunks than clusters: walk each cluster from its centre outwards
+        selected = []
+        depth = 0
+        while len(selected) < num_chunks:
+            added = False
+            for cluster in clusters:
+                if depth < len(cluster):
+                    selected.append(cluster[depth])
+                    added = True
+                    if len(selected) == num_chunks:
+                        break
+            if not added:
+                break
+            depth += 1
+        return selected
+
+    def _version_key(self, project_id, document_ids):
+        from api.models import Document
+
+        documents = Document.objects.filter(project_id=project_id, status='processed')
+        if document_ids:
+            documents = documents.filter(id__in=document_ids)
+        ids = sorted(str(doc_id) for doc_id in documents.values_list('id', flat=True))
+        return hashlib.sha1(",".join(ids).encode()).hexdigest()
+
+    def _get_clusters(self, project_id, document_ids):
+        key = (project_id, self._version_key(project_id, document_ids))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                instrumentation.record_cache("clusters", True)
+                return self._cache[key]
+
+        instrumentation.record_cache("clusters", False)
+        clusters = self._build_clusters(project_id, document_ids)
+        with self._lock:
+            self._cache[key] = clusters
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return clusters
+
+    def _build_clusters(self, project_id, document_ids):
+        """Returns clusters (largest first) as lists of Documents ordered by distance to the centroid."""
+        ids, documents, metadatas, embeddings = self.chroma_service.get_embeddings(project_id, document_ids)
+        if not ids:
+            return []
+
+        X = np.asarray(embeddings, dtype=np.float32)
+        rng = np.random.default_rng(0)
+        sample = np.arange(len(ids))
+        if len(sample) > MAX_CLUSTER_POINTS:
+            sample = np.sort(rng.choice(len(ids), size=MAX_CLUSTER_POINTS, replace=False))
+            X = X[sample]
+
+        k = min(NUM_CLUSTERS, len(sample))
+        labels, centroids = kmeans(X, k)
+
+        clusters = []
+        for j in range(k):
+            members = np.flatnonzero(labels == j)
+            if not len(members):
+                continue
+            order = members[((X[members] - centroids[j]) ** 2).sum(axis=1).argsort()]
+            clusters.append([
+                Document(id=ids[i], page_content=documents[i], metadata=metadatas[i] or {})
+                for i in sample[order]
+            ])
+        clusters.sort(key=len, reverse=True)
+        return clusters
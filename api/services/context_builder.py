@@ -0,0 +1,158 @@
+import os
+import re
+import logging
+import mmh3
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_NUM_PERM = 64
+_rng = np.random.default_rng(20251)
+_PERM_A = _rng.integers(1, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+
+_encoding = None
+_encoding_failed = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count under the gpt-4o tokenizer. Falls back to a character-based
+    estimate when the tiktoken encoding files cannot be loaded.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-4o")
+        except Exception:
+            _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 3) if text else 0
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash signature over lowercase word 3-shingles."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+    hashes = np.array([mmh3.hash(s, signed=False) for s in shingles], dtype=np.uint64)
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+def merge_overlapping(first: str, second: str, min_overlap: int = 20, max_overlap: int = 400):
+    """
+    Joins two chunks, dropping the longest suffix of `first` that is repeated
+    as a prefix of `second` (the splitter's chunk_overlap). Returns None when
+    no overlap is found.
+    """
+    upper = min(len(first), len(second), max_overlap)
+    for length in range(upper, min_overlap - 1, -1):
+        if first.endswith(second[:length]):
+            return first + second[length:]
+    return None
+
+
+def _chunk_index(doc):
+    if 'chunk_index' in doc.metadata:
+        return doc.metadata['chunk_index']
+    match = re.search(r"_chunk_(\d+)$", doc.id or "")
+    return int(match.group(1)) if match else None
+
+
+class ContextBuilder:
+    """
+    Turns retrieved chunks into a prompt context: merges adjacent/overlapping
+    chunks of the same document page, drops near-duplicate blocks and packs
+    the rest, in retrieval order, under a token budget.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET, duplicate_threshold: float = 0.85):
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+
+    def build(self, docs):
+        """Returns (formatted_context, sources, stats)."""
+        naive_tokens = sum(count_tokens(self._format_block(doc.metadata, doc.page_content)) for doc in docs)
+
+        blocks = self._drop_near_duplicates(self._merge_blocks(docs))
+
+        formatted_context = ""
+        sources = []
+        used_tokens = 0
+        for block in blocks:
+            text = self._format_block(block['metadata'], block['text'])
+            tokens = count_tokens(text)
+            if used_tokens + tokens > self.token_budget:
+                continue
+            formatted_context += text
+            used_tokens += tokens
+            sources.append({
+                "document_id": block['metadata'].get('document_id', 'unknown'),
+                "page": block['metadata'].get('source_page', 0) + 1,
+                "name": block['metadata'].get('name', 'Unknown Document'),
+                "content_snippet": block['text'][:100] + "..."
+            })
+
+        stats = {
+            "chunks": len(docs),
+            "blocks": len(sources),
+            "naive_tokens": naive_tokens,
+            "context_tokens": used_tokens,
+            "tokens_saved": naive_tokens - used_tokens,
+        }
+        return formatted_context, sources, stats
+
+    def _format_block(self, metadata, text):
+        doc_id = metadata.get('document_id', 'unknown')
+        page_num = metadata.get('source_page', 0) + 1
+        return f"[Document ID: {doc_id}, Page: {page_num}] {text}\n\n"
+
+    def _merge_blocks(self, docs):
+        groups = {}
+        for rank, doc in enumerate(docs):
+            key = (doc.metadata.get('document_id'), doc.metadata.get('source_page'))
+            groups.setdefault(key, []).append((rank, doc))
+
+        blocks = []
+        for members in groups.values():
+            members.sort(key=lambda item: (_chunk_index(item[1]) is None, _chunk_index(item[1]) or 0, item[0]))
+            current = None
+            for rank, doc in members:
+                index = _chunk_index(doc)
+                if current is not None:
+                    merged = merge_overlapping(current['text'], doc.page_content)
+                    adjacent = index is not None and current['last_index'] is not None and index == current['last_index'] + 1
+                    if merged is None and adjacent:
+                        merged = current['text'] + "\n" + doc.page_content
+                    if merged is not None:
+                        current['text'] = merged
+                        current['rank'] = min(current['rank'], rank)
+                        current['last_index'] = index
+                        continue
+                    blocks.append(current)
+                current = {'text': doc.page_content, 'metadata': doc.metadata, 'rank': rank, 'last_index': index}
+            if current is not None:
+                blocks.append(current)
+
+        blocks.sort(key=lambda block: block['rank'])
+        return blocks
+
+    def _drop_near_duplicates(self, blocks):
+        kept = []
+        signatures = []
+        for block in blocks:
+            signature = minhash_signature(block['text'])
+            if any(estimate_jaccard(signature, other) >= self.duplicate_threshold for other in signatures):
+                continue
+            kept.append(block)
+            signatures.append(signature)
+        return kept
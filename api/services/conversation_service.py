@@ -0,0 +1,72 @@
+import os
+import threading
+from .background import submit_on_commit
+
+HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "6"))
+SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "4"))
+MAX_SUMMARY_UPDATE = 20
+MAX_MESSAGE_CHARS = 800
+MAX_SUMMARY_CHARS = 2000
+
+class ConversationService:
+    """
+    Keeps the chat prompt bounded: the last HISTORY_WINDOW messages are sent
+    verbatim, older ones are folded into a per-project rolling summary that
+    is updated in the background.
+    """
+    _in_flight = set()
+    _lock = threading.Lock()
+
+    def get_history(self, project):
+        from api.models import ConversationSummary
+
+        recent = list(
+            project.messages.order_by('-created_at').only('role', 'content')[:HISTORY_WINDOW]
+        )[::-1]
+        summary = ConversationSummary.objects.filter(project=project).values_list('summary', flat=True).first()
+        return {
+            "summary": (summary or "")[:MAX_SUMMARY_CHARS],
+            "messages": [
+                {"role": message.role, "content": message.content[:MAX_MESSAGE_CHARS]}
+                for message in recent
+            ],
+        }
+
+    def schedule_summary_update(self, project_id):
+        submit_on_commit(self.update_summary, str(project_id))
+
+    def update_summary(self, project_id):
+        with self._lock:
+            if project_id in self._in_flight:
+                return
+            self._in_flight.add(project_id)
+        try:
+            self._update_summary(project_id)
+        finally:
+            with self._lock:
+                self._in_flight.discard(project_id)
+
+    def _update_summary(self, project_id):
+        from api.models import ConversationSummary, Message
+        from .rag_service import RAGService
+
+        window = Message.objects.filter(project_id=project_id).order_by('-created_at')
+        oldest_in_window = window.values_list('created_at', flat=True)[HISTORY_WINDOW - 1:HISTORY_WINDOW].first()
+        if oldest_in_window is None:
+            return
+
+        summary_obj, _ = ConversationSummary.objects.get_or_create(project_id=project_id)
+        aged_out = Message.objects.filter(project_id=project_id, created_at__lt=oldest_in_window)
+        if summary_obj.summarized_until:
+            aged_out = aged_out.filter(created_at__gt=summary_obj.summarized_until)
+        aged_out = list(aged_out.order_by('created_at').only('role', 'content', 'created_at')[:MAX_SUMMARY_UPDATE])
+        if len(aged_out) < SUMMARY_BATCH:
+            return
+
+        summary = RAGService().summarize_conversation(
+            summary_obj.summary,
+            [{"role": m.role, "content": m.content[:MAX_MESSAGE_CHARS]} for m in aged_out]
+        )
+        summary_obj.summary = summary[:MAX_SUMMARY_CHARS]
+        summary_obj.summarized_until = aged_out[-1].created_at
+        summary_obj.save()
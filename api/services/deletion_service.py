@@ -0,0 +1,102 @@
+import logging
+import threading
+from collections import defaultdict
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from .background import submit_on_commit
+from .chroma_service import ChromaService
+from .document_service import DocumentService
+from .keyword_index import KeywordIndexService
+
+logger = logging.getLogger(__name__)
+
+class DeletionService:
+    """
+    Keeps delete requests O(1): documents and projects are tombstoned, while
+    their rows, vectors, keyword indexes and uploaded files are reclaimed on
+    the background pool.
+    """
+    _lock = threading.Lock()
+    _sweeping = False
+    _rerun = False
+
+    def __init__(self):
+        self.chroma_service = ChromaService()
+        self.keyword_index = KeywordIndexService()
+
+    def delete_document(self, document):
+        """Hides the document from every query and schedules its cleanup."""
+        document.deleted_at = timezone.now()
+        document.save(update_fields=['deleted_at'])
+        submit_on_commit(self.sweep)
+
+    def delete_project(self, project):
+        """Hides the project and everything in it, and schedules its cleanup."""
+        project.deleted_at = timezone.now()
+        project.save(update_fields=['deleted_at'])
+        submit_on_commit(self.sweep)
+
+    def purge_project(self, project_id):
+        """Drops the project's collection, index, files and rows."""
+        from api.models import Document, Project
+
+        self.chroma_service.delete_collection(project_id)
+        self.keyword_index.delete_index(project_id)
+        for document in list(Document.all_objects.filter(project_id=project_id).only('id', 'project_id', 'file')):
+            if document.file:
+                self._delete_files([document.file.name])
+            # One document (and its pages) per statement keeps each write lock short
+            document.delete()
+        Project.all_objects.filter(id=project_id).delete()
+
+    def sweep(self):
+        """Reclaims every tombstoned project and document; concurrent calls fold into one more pass."""
+        with self._lock:
+            if DeletionService._sweeping:
+                DeletionService._rerun = True
+                return
+            DeletionService._sweeping = True
+        try:
+            while True:
+                self._sweep()
+                with self._lock:
+                    if not DeletionService._rerun:
+                        break
+                    DeletionService._rerun = False
+        finally:
+            with self._lock:
+                DeletionService._sweeping = False
+                DeletionService._rerun = False
+
+    def _sweep(self):
+        from api.models import Document, Project
+
+        for project_id in Project.all_objects.filter(deleted_at__isnull=False).values_list('id', flat=True):
+            try:
+                self.purge_project(str(project_id))
+            except Exception:
+                # Left tombstoned so the next sweep retries
+                logger.exception("Failed to reclaim project %s", project_id)
+
+        tombstones = Document.all_objects.filter(deleted_at__isnull=False).only('id', 'project_id', 'file')
+        by_project = defaultdict(list)
+        for document in tombstones:
+            by_project[str(document.project_id)].append(document)
+
+        for project_id, documents in by_project.items():
+            document_ids = [str(document.id) for document in documents]
+            try:
+                DocumentService().delete_document_vectors(project_id, document_ids)
+                self._delete_files([document.file.name for document in documents if document.file])
+            except Exception:
+                # Left tombstoned so the next sweep retries
+                logger.exception("Failed to reclaim documents %s of project %s", document_ids, project_id)
+                continue
+            Document.all_objects.filter(id__in=document_ids).delete()
+
+    def _delete_files(self, names):
+        for name in names:
+            try:
+                default_storage.delete(name)
+            except OSError:
+                logger.warning("Could not delete uploaded file %s", name, exc_info=True)
@@ -1,19 +1,22 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-import os
+from . import instrumentation
 from .chroma_service import ChromaService
+from .keyword_index import KeywordIndexService
+from .llm_limiter import Priority, embed_documents
+from .llm_router import LLMRouter
+from .quiz_service import QuizService
+from .suggestion_service import SuggestionService
+
+class DocumentDeleted(Exception):
+    """Raised inside processing once the document has been tombstoned."""
 
 class DocumentService:
     def __init__(self):
         self.chroma_service = ChromaService()
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            api_key=os.getenv("OPENAI_API_KEY"),
-            temperature=0.0
-        )
+        self.keyword_index = KeywordIndexService()
+        self.llm_router = LLMRouter()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200
@@ -34,6 +37,10 @@ class DocumentService:
         """
         Orchestrates the PDF loading, formatting, translating, and indexing process.
         """
+        with instrumentation.breakdown("document", document_obj.id):
+            return self._process(document_obj)
+
+    def _process(self, document_obj):
         try:
             # 1. Update Status
             self._update_status(document_obj, 'processing', "Starting PDF processing...")
@@ -45,7 +52,8 @@ class DocumentService:
             # 2. Load PDF
             self._update_status(document_obj, 'processing', "Loading PDF...")
             loader = PyPDFLoader(file_path)
-            docs = loader.load()
+            with instrumentation.timed("pdf_load"):
+                docs = loader.load()
             
             # 3. Format & Translate Pages
             self._process_pages(document_obj, docs)
@@ -56,22 +64,51 @@ class DocumentService:
             
             # 5. Complete
             self._update_status(document_obj, 'processed', "Completed")
+            SuggestionService().schedule_refresh(document_obj.project_id)
+            QuizService().schedule_bank_refill(document_obj.project_id, reset=True)
             return True
 
+        except DocumentDeleted:
+            self._discard_vectors(document_obj)
+            return False
         except Exception as e:
-            self._update_status(document_obj, 'failed', f"Error: {str(e)}")
+            try:
+                self._update_status(document_obj, 'failed', f"Error: {str(e)}")
+            except DocumentDeleted:
+                self._discard_vectors(document_obj)
             return False
 
+    def _discard_vectors(self, document_obj):
+        """
+        Removes chunks this run may have indexed after the sweep (or the
+        project purge) had already run, so they never surface in retrieval.
+        """
+        from api.models import Project
+
+        project_id = str(document_obj.project_id)
+        if Project.objects.filter(id=project_id).exists():
+            self.delete_document_vectors(project_id, [str(document_obj.id)])
+        else:
+            self.chroma_service.delete_collection(project_id)
+            self.keyword_index.delete_index(project_id)
+
     def _update_status(self, doc, status, message):
-        doc.status = status
-        doc.processing_message = message
-        doc.save()
+        from api.models import Document
+
+        # Stops processing of deleted documents and never writes over the tombstone
+        with instrumentation.timed("db_write"):
+            if not Document.objects.filter(id=doc.id).exists():
+                raise DocumentDeleted(doc.id)
+            doc.status = status
+            doc.processing_message = message
+            # A full save would write the stale in-memory version over the signal's F() bump
+            doc.save(update_fields=['status', 'processing_message'])
 
     def _process_pages(self, document_obj, docs):
         from api.models import DocumentPage
         
-        formatting_chain = self._create_formatting_chain()
-        translation_chain = self._create_translation_chain()
+        formatting_prompt = self._create_formatting_prompt()
+        translation_prompt = self._create_translation_prompt()
         
         total_pages = len(docs)
         
@@ -82,22 +119,31 @@ class DocumentService:
             raw_text = doc.page_content
             
             try:
-                formatted_text = self._clean_llm_output(formatting_chain.invoke({"text": raw_text}))
-                translated_text = self._clean_llm_output(translation_chain.invoke({"text": formatted_text}))
+                with instrumentation.timed("format"):
+                    formatted_text = self._clean_llm_output(
+                        self.llm_router.run("formatting", formatting_prompt, {"text": raw_text}, priority=Priority.BACKGROUND)
+                    )
+                with instrumentation.timed("translate"):
+                    translated_text = self._clean_llm_output(
+                        self.llm_router.run(
+                            "translation", translation_prompt, {"text": formatted_text}, priority=Priority.BACKGROUND
+                        )
+                    )
                 final_original_text = formatted_text
             except Exception:
                 final_original_text = raw_text
                 translated_text = ""
                 
-            DocumentPage.objects.create(
-                document=document_obj,
-                page_number=page_num,
-                original_text=final_original_text,
-                translated_text=translated_text
-            )
+            with instrumentation.timed("db_write"):
+                DocumentPage.objects.update_or_create(
+                    document=document_obj,
+                    page_number=page_num,
+                    defaults={'original_text': final_original_text, 'translated_text': translated_text}
+                )
 
     def _index_documents(self, document_obj, docs):
-        split_docs = self.text_splitter.split_documents(docs)
+        with instrumentation.timed("split"):
+            split_docs = self.text_splitter.split_documents(docs)
         if not split_docs:
             return
 
@@ -108,25 +154,29 @@ class DocumentService:
         project_id = str(document_obj.project.id)
         document_id = str(document_obj.id)
         
-        collection = self.chroma_service.get_or_create_collection(project_id)
-        
         for i, doc in enumerate(split_docs):
             documents_to_add.append(doc.page_content)
             metadatas_to_add.append({
                 "document_id": document_id,
                 "source_page": doc.metadata.get('page', 0),
+                "chunk_index": i,
                 "name": document_obj.name
             })
             ids_to_add.append(f"doc_{document_id}_chunk_{i}")
             
-        collection.add(
-            embeddings=self.chroma_service.embeddings.embed_documents(documents_to_add),
+        with instrumentation.timed("embed"):
+            embeddings = embed_documents(self.chroma_service.embeddings, documents_to_add)
+        self.chroma_service.add_chunks(
+            project_id,
+            ids=ids_to_add,
+            embeddings=embeddings,
             documents=documents_to_add,
-            metadatas=metadatas_to_add,
-            ids=ids_to_add
+            metadatas=metadatas_to_add
         )
+        with instrumentation.timed("keyword_index"):
+            self.keyword_index.add_chunks(project_id, ids_to_add, documents_to_add, metadatas_to_add)
 
-    def _create_formatting_chain(self):
+    def _create_formatting_prompt(self):
         prompt = ChatPromptTemplate.from_template(
             """
             You are a professional document formatter.
@@ -141,9 +191,9 @@ class DocumentService:
             Raw Text: {text}
             """
         )
-        return prompt | self.llm | StrOutputParser()
+        return prompt
 
-    def _create_translation_chain(self):
+    def _create_translation_prompt(self):
         prompt = ChatPromptTemplate.from_template(
             """
             Translate the following English Markdown text into Korean.
@@ -156,13 +206,14 @@ class DocumentService:
             Markdown Text: {text}
             """
         )
-        return prompt | self.llm | StrOutputParser()
+        return prompt
 
     def _clean_llm_output(self, text):
         return text.replace("```markdown", "").replace("```", "").strip()
 
-    def delete_document_vectors(self, document_obj):
-        return self.chroma_service.delete_documents(
-            str(document_obj.project.id), 
-            str(document_obj.id)
-        )
+    def delete_document_vectors(self, project_id, document_ids):
+        """Removes the documents' chunks from the keyword index and the Chroma collection."""
+        project_id = str(project_id)
+        for document_id in document_ids:
+            self.keyword_index.delete_documents(project_id, document_id)
+        return self.chroma_service.delete_documents(project_id, document_ids)
@@ -0,0 +1,52 @@
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+@contextlib.contextmanager
+def flocked(path: str):
+    """
+    Holds an exclusive flock on `path` across worker processes, creating the
+    file (and its directory) as needed; without fcntl it only yields. A holder
+    may unlink the file, so once locked it is checked to still be the file at
+    `path`, and the lock is retaken on the new one otherwise.
+    """
+    if fcntl is None:
+        yield
+        return
+    while True:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            lock_file = open(path, "a")
+        except FileNotFoundError:
+            # The directory was removed between the two calls
+            continue
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                current = False
+        except BaseException:
+            lock_file.close()
+            raise
+        if current:
+            break
+        lock_file.close()
+    try:
+        yield
+    finally:
+        # Closing the file releases the lock
+        lock_file.close()
+
+
+def unlink_held(path: str):
+    """Removes a lock file while it is still held, so no waiter can lock the old file and proceed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,188 @@
+import bisect
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cache lookups through multi-minute page batches
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "stage_duration_seconds": "Wall time of one pipeline stage (PDF load, LLM calls, embedding, vector I/O, DB writes).",
+    "stage_errors_total": "Pipeline stages that raised.",
+    "operation_duration_seconds": "End-to-end wall time of one document ingestion or chat answer.",
+    "llm_request_duration_seconds": "Latency of one LLM chain invocation, including limiter waits.",
+    "llm_requests_total": "LLM chain invocations.",
+    "llm_errors_total": "LLM chain invocations that raised.",
+    "llm_escalations_total": "Stage results rejected by validation and retried on the next model.",
+    "llm_tokens_total": "Tokens reported by the OpenAI API.",
+    "embedding_tokens_total": "Tokens sent to the embeddings endpoint (tiktoken count).",
+    "cache_requests_total": "Cache lookups by result.",
+    "rag_errors_total": "Chat answers that fell back to an error message.",
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = defaultdict(float)
+_current = contextvars.ContextVar("instrumentation_breakdown", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Adds one sample to a latency histogram."""
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        if histogram is None:
+            histogram = _histograms[_key(name, labels)] = {
+                "buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0,
+            }
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(LATENCY_BUCKETS):
+            histogram["buckets"][index] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+def increment(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def record_cache(cache, hit):
+    increment("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_tokens(stage, model, input_tokens, output_tokens):
+    increment("llm_tokens_total", input_tokens, stage=stage, model=model, direction="input")
+    increment("llm_tokens_total", output_tokens, stage=stage, model=model, direction="output")
+    current = _current.get()
+    if current is not None:
+        current.tokens += input_tokens + output_tokens
+
+
+@contextmanager
+def timed(stage):
+    """
+    Times a pipeline stage into stage_duration_seconds and, inside a
+    breakdown(), into that operation's per-stage totals. Errors are counted
+    and re-raised.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        increment("stage_errors_total", stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("stage_duration_seconds", elapsed, stage=stage)
+        current = _current.get()
+        if current is not None:
+            current.add(stage, elapsed)
+
+
+class Breakdown:
+    def __init__(self, operation, key):
+        self.operation = operation
+        self.key = key
+        self.stages = {}
+        self.tokens = 0
+        self.started = time.perf_counter()
+
+    def add(self, stage, seconds):
+        total, calls = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (total + seconds, calls + 1)
+
+    def summary(self, elapsed):
+        parts = []
+        for stage, (total, calls) in self.stages.items():
+            parts.append(f"{stage} {total * 1000:.0f}ms" + (f" x{calls}" if calls > 1 else ""))
+        return (f"{self.operation} {self.key} took {elapsed * 1000:.0f}ms "
+                f"({', '.join(parts) or 'no stages'}; {self.tokens} LLM tokens)")
+
+
+@contextmanager
+def breakdown(operation, key):
+    """
+    Collects the timed() stages of one document or chat message and logs the
+    per-stage totals when it finishes. Stages must run on the calling thread;
+    a nested breakdown joins the outer one.
+    """
+    if _current.get() is not None:
+        yield _current.get()
+        return
+    current = Breakdown(operation, key)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        elapsed = time.perf_counter() - current.started
+        observe("operation_duration_seconds", elapsed, operation=operation)
+        logger.info("%s", current.summary(elapsed))
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_prometheus(gauges=()):
+    """
+    Renders every metric in the Prometheus text exposition format (0.0.4).
+    `gauges` adds point-in-time (name, labels dict, value) samples.
+    """
+    with _lock:
+        histograms = {key: {**h, "buckets": list(h["buckets"])} for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    families = defaultdict(list)
+    for (name, labels), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+            cumulative += count
+            families[(name, "histogram")].append(
+                f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}"
+            )
+        families[(name, "histogram")].extend([
+            f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}",
+            f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}",
+            f"{name}_count{_format_labels(labels)} {histogram['count']}",
+        ])
+    for (name, labels), value in sorted(counters.items()):
+        families[(name, "counter")].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for name, labels, value in gauges:
+        labels = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        families[(name, "gauge")].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    lines = []
+    for (name, kind), samples in families.items():
+        if name in HELP:
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
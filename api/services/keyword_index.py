@@ -0,0 +1,268 @@
+import contextlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from langchain_core.documents import Document
+from .file_lock import flocked, unlink_held
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+HANGUL_RE = re.compile(r"[가-힣]")
+
+
+def tokenize(text: str):
+    """
+    Lowercased word tokens. Hangul words also emit character bigrams so that
+    terms still match when a particle is attached (e.g. "행렬은" vs "행렬").
+    """
+    tokens = []
+    for word in TOKEN_RE.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > 2 and HANGUL_RE.search(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def reciprocal_rank_fusion(result_lists, k: int = 60):
+    """
+    Fuses ranked lists of Documents by reciprocal rank (sum of 1 / (k + rank)).
+    Documents are matched on their chunk id.
+    """
+    scores = defaultdict(float)
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            scores[doc.id] += 1.0 / (k + rank + 1)
+            docs.setdefault(doc.id, doc)
+    ranked = sorted(scores, key=lambda chunk_id: scores[chunk_id], reverse=True)
+    return [docs[chunk_id] for chunk_id in ranked]
+
+
+def cap_per_document(docs, cap: int, k: int):
+    """Keeps at most `cap` chunks per document, preserving order, up to k total."""
+    counts = defaultdict(int)
+    kept = []
+    for doc in docs:
+        document_id = doc.metadata.get("document_id")
+        if counts[document_id] >= cap:
+            continue
+        counts[document_id] += 1
+        kept.append(doc)
+        if len(kept) == k:
+            break
+    return kept
+
+
+class BM25Index:
+    """
+    In-memory inverted index over one project's chunks, scored with Okapi BM25.
+    Supports incremental add and per-document removal.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {chunk_id: tf}
+        self.doc_lengths = {}
+        self.chunks = {}  # chunk_id -> {"text": str, "metadata": dict}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def add(self, chunk_id: str, text: str, metadata: dict):
+        if chunk_id in self.chunks:
+            self.remove(chunk_id)
+
+        term_counts = Counter(tokenize(text))
+        for term, tf in term_counts.items():
+            self.postings[term][chunk_id] = tf
+
+        length = sum(term_counts.values())
+        self.doc_lengths[chunk_id] = length
+        self.total_length += length
+        self.chunks[chunk_id] = {"text": text, "metadata": metadata}
+
+    def remove(self, chunk_id: str):
+        chunk = self.chunks.pop(chunk_id, None)
+        if chunk is None:
+            return
+
+        for term in set(tokenize(chunk["text"])):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(chunk_id, None)
+            if not postings:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(chunk_id, 0)
+
+    def remove_document(self, document_id: str):
+        chunk_ids = [
+            chunk_id for chunk_id, chunk in self.chunks.items()
+            if chunk["metadata"].get("document_id") == document_id
+        ]
+        for chunk_id in chunk_ids:
+            self.remove(chunk_id)
+        return len(chunk_ids)
+
+    def search(self, query: str, k: int = 10, document_ids=None):
+        """Returns up to k Documents ordered by BM25 score."""
+        if not self.chunks:
+            return []
+        allowed = {str(doc_id) for doc_id in document_ids} if document_ids else None
+
+        n = len(self.chunks)
+        avg_length = self.total_length / n if n else 0
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                if allowed is not None and self.chunks[chunk_id]["metadata"].get("document_id") not in allowed:
+                    continue
+                length_norm = 1 - self.b + self.b * self.doc_lengths[chunk_id] / (avg_length or 1)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            Document(
+                id=chunk_id,
+                page_content=self.chunks[chunk_id]["text"],
+                metadata=self.chunks[chunk_id]["metadata"]
+            )
+            for chunk_id, _ in ranked
+        ]
+
+    def to_dict(self):
+        return {"k1": self.k1, "b": self.b, "chunks": self.chunks}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for chunk_id, chunk in data.get("chunks", {}).items():
+            index.add(chunk_id, chunk["text"], chunk["metadata"])
+        return index
+
+
+class KeywordIndexService:
+    """
+    Process-wide registry of per-project BM25 indexes, persisted as JSON files.
+    Indexes missing on disk are rebuilt from the project's stored chunks.
+    """
+    _instance = None
+    _indexes = None
+    _lock = None
+    _index_dir = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(KeywordIndexService, cls).__new__(cls)
+            cls._initialize()
+        return cls._instance
+
+    @classmethod
+    def _initialize(cls):
+        KEYWORD_INDEX_DIR = "keyword_index"
+        cls._index_dir = KEYWORD_INDEX_DIR
+        cls._indexes = {}
+        cls._lock = threading.RLock()
+
+    def _index_path(self, project_id: str) -> str:
+        return os.path.join(self._index_dir, f"project_{project_id}.json")
+
+    def _stamp(self, project_id: str):
+        try:
+            stat = os.stat(self._index_path(project_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @contextlib.contextmanager
+    def _writing(self, project_id: str):
+        """Serialises load-modify-save across threads and, where flock exists, across worker processes."""
+        with self._lock, flocked(self._lock_path(project_id)):
+            yield
+
+    def _lock_path(self, project_id: str) -> str:
+        return os.path.join(self._index_dir, f"project_{project_id}.lock")
+
+    def get_index(self, project_id: str) -> BM25Index:
+        """Returns the cached index, reloading it when another worker has rewritten the file."""
+        project_id = str(project_id)
+        with self._lock:
+            cached = self._indexes.get(project_id)
+            if cached is not None and cached[0] == self._stamp(project_id):
+                return cached[1]
+            with self._writing(project_id):
+                return self._fresh(project_id)
+
+    def _fresh(self, project_id: str) -> BM25Index:
+        """Cached index if the file is unchanged, else reloaded. Callers hold _writing."""
+        cached = self._indexes.get(project_id)
+        stamp = self._stamp(project_id)
+        if cached is not None and stamp is not None and cached[0] == stamp:
+            return cached[1]
+        return self._load(project_id)
+
+    def _load(self, project_id: str) -> BM25Index:
+        path = self._index_path(project_id)
+        if os.path.exists(path):
+            stamp = self._stamp(project_id)
+            with open(path, encoding="utf-8") as f:
+                index = BM25Index.from_dict(json.load(f))
+            self._indexes[project_id] = (stamp, index)
+            return index
+
+        # Projects indexed before the keyword index existed
+        from .chroma_service import ChromaService
+        index = BM25Index()
+        ids, documents, metadatas = ChromaService().get_chunks(project_id)
+        for chunk_id, text, metadata in zip(ids, documents, metadatas):
+            index.add(chunk_id, text, metadata or {})
+        self._save(project_id, index)
+        return index
+
+    def _save(self, project_id: str, index: BM25Index):
+        os.makedirs(self._index_dir, exist_ok=True)
+        path = self._index_path(project_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._indexes[project_id] = (self._stamp(project_id), index)
+
+    def add_chunks(self, project_id: str, ids, documents, metadatas):
+        project_id = str(project_id)
+        with self._writing(project_id):
+            # Re-reads the file under the lock so chunks another worker just saved are kept
+            index = self._fresh(project_id)
+            for chunk_id, text, metadata in zip(ids, documents, metadatas):
+                index.add(chunk_id, text, metadata)
+            self._save(project_id, index)
+
+    def delete_documents(self, project_id: str, document_id: str):
+        project_id = str(project_id)
+        with self._writing(project_id):
+            index = self._fresh(project_id)
+            if index.remove_document(str(document_id)):
+                self._save(project_id, index)
+
+    def delete_index(self, project_id: str):
+        project_id = str(project_id)
+        with self._writing(project_id):
+            self._indexes.pop(project_id, None)
+            path = self._index_path(project_id)
+            if os.path.exists(path):
+                os.remove(path)
+            unlink_held(self._lock_path(project_id))
+
+    def search(self, project_id: str, query: str, k: int = 10, document_ids=None):
+        with self._lock:
+            return self.get_index(project_id).search(query, k=k, document_ids=document_ids)
@@ -0,0 +1,279 @@
+import os
+import time
+import heapq
+import sqlite3
+import itertools
+import threading
+import logging
+from enum import IntEnum
+import openai
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from . import instrumentation
+from .context_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # chat answers and query rewriting
+    NORMAL = 1       # suggestions, quizzes, conversation summaries
+    BACKGROUND = 2   # document ingestion and question-bank refills
+
+
+# Share of the bucket each class must leave untouched, so interactive
+# requests still find capacity while background work is saturating it.
+RESERVED_FRACTION = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.NORMAL: 0.1,
+    Priority.BACKGROUND: 0.25,
+}
+
+
+class InMemoryBucketStore:
+    """Request and token buckets for a single process."""
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        self.updated = now
+
+    def try_consume(self, tokens, reserved_fraction=0.0):
+        """Consumes one request and `tokens`; returns 0, or the seconds to wait first."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._consume(tokens, reserved_fraction)
+
+    def _consume(self, tokens, reserved_fraction):
+        # A single request larger than the whole bucket would never fit
+        tokens = min(tokens, self.tpm * (1 - reserved_fraction))
+        need_requests = 1 + self.rpm * reserved_fraction - self.requests
+        need_tokens = tokens + self.tpm * reserved_fraction - self.tokens
+        if need_requests <= 0 and need_tokens <= 0:
+            self.requests -= 1
+            self.tokens -= tokens
+            return 0
+        return max(need_requests * 60 / self.rpm, need_tokens * 60 / self.tpm, 0.01)
+
+    def adjust(self, tokens):
+        """Charges (positive) or refunds (negative) tokens after the actual usage is known."""
+        with self._lock:
+            self.tokens = min(self.tpm, self.tokens - tokens)
+
+    def snapshot(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {"requests_available": round(self.requests, 2), "tokens_available": round(self.tokens)}
+
+
+class SQLiteBucketStore(InMemoryBucketStore):
+    """
+    Buckets kept in a local SQLite file so several worker processes on one
+    host share the same budget. BEGIN IMMEDIATE serialises the updates.
+    """
+
+    def __init__(self, rpm, tpm, path, name):
+        super().__init__(rpm, tpm)
+        self.path = path
+        self.name = name
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_buckets "
+                "(name TEXT PRIMARY KEY, requests REAL, tokens REAL, updated REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _transaction(self, func):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT requests, tokens, updated FROM llm_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                now = time.time()
+                if row:
+                    self.requests, self.tokens, self.updated = row
+                else:
+                    self.requests, self.tokens, self.updated = float(self.rpm), float(self.tpm), now
+                self._refill(now)
+                result = func()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_buckets (name, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+                    (self.name, self.requests, self.tokens, self.updated)
+                )
+                conn.execute("COMMIT")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def try_consume(self, tokens, reserved_fraction=0.0):
+        return self._transaction(lambda: self._consume(tokens, reserved_fraction))
+
+    def adjust(self, tokens):
+        def _adjust():
+            self.tokens = min(self.tpm, self.tokens - tokens)
+        self._transaction(_adjust)
+
+    def snapshot(self):
+        return self._transaction(lambda: {
+            "requests_available": round(self.requests, 2), "tokens_available": round(self.tokens)
+        })
+
+
+class LLMRateLimiter:
+    """
+    Token-bucket limiter for one OpenAI resource (requests/min and tokens/min).
+    Waiting callers are served strictly by priority, FIFO within a class. A 429
+    puts the whole limiter into exponential backoff, honouring Retry-After.
+    """
+
+    def __init__(self, name, rpm, tpm, shared_path=None):
+        self.name = name
+        if shared_path:
+            self.store = SQLiteBucketStore(rpm, tpm, shared_path, name)
+        else:
+            self.store = InMemoryBucketStore(rpm, tpm)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._backoff_until = 0.0
+        self._backoff_seconds = 0.0
+        self.stats = {"granted": 0, "rate_limited": 0, "wait_seconds": 0.0}
+
+    def acquire(self, priority=Priority.NORMAL, tokens=0):
+        ticket = (int(priority), next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = self._backoff_until - time.monotonic()
+                    if self._queue[0] == ticket and wait <= 0:
+                        wait = self.store.try_consume(tokens, RESERVED_FRACTION[Priority(ticket[0])])
+                        if wait == 0:
+                            break
+                    self._cond.wait(timeout=wait if wait > 0 else None)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+            self.stats["granted"] += 1
+            self.stats["wait_seconds"] += time.monotonic() - started
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        if actual_tokens:
+            self.store.adjust(actual_tokens - estimated_tokens)
+
+    def on_rate_limited(self, retry_after=None):
+        with self._cond:
+            self._backoff_seconds = min(max(1.0, self._backoff_seconds * 2), 60.0)
+            delay = max(self._backoff_seconds, retry_after or 0)
+            self._backoff_until = max(self._backoff_until, time.monotonic() + delay)
+            self.stats["rate_limited"] += 1
+            self._cond.notify_all()
+        logger.warning("%s rate limited; backing off %.1fs", self.name, delay)
+
+    def on_success(self):
+        with self._cond:
+            self._backoff_seconds /= 2
+
+    def call(self, priority, func, *args, tokens=0, max_retries=3, **kwargs):
+        """Runs func under the limiter, retrying on 429 after the adaptive backoff."""
+        for attempt in range(max_retries + 1):
+            self.acquire(priority, tokens)
+            try:
+                result = func(*args, **kwargs)
+            except openai.RateLimitError as e:
+                self.on_rate_limited(_retry_after(e))
+                if attempt == max_retries:
+                    raise
+                continue
+            self.on_success()
+            return result
+
+    def snapshot(self):
+        with self._cond:
+            depth = {priority.name.lower(): 0 for priority in Priority}
+            for priority, _ in self._queue:
+                depth[Priority(priority).name.lower()] += 1
+            backoff = max(0.0, self._backoff_until - time.monotonic())
+            stats = dict(self.stats)
+        return {
+            "queue_depth": depth,
+            "backoff_seconds": round(backoff, 2),
+            **self.store.snapshot(),
+            **stats,
+        }
+
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """
+    Process-wide limiter for "chat" or "embeddings". Limits come from
+    OPENAI_<NAME>_RPM / OPENAI_<NAME>_TPM; setting LLM_LIMITER_SHARED_PATH to a
+    file shares the budget across processes.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            defaults = {"chat": (500, 30000), "embeddings": (3000, 1000000)}[name]
+            _limiters[name] = LLMRateLimiter(
+                name,
+                rpm=int(os.getenv(f"OPENAI_{name.upper()}_RPM", defaults[0])),
+                tpm=int(os.getenv(f"OPENAI_{name.upper()}_TPM", defaults[1])),
+                shared_path=os.getenv("LLM_LIMITER_SHARED_PATH") or None
+            )
+        return _limiters[name]
+
+
+def invoke_chain(chain, inputs, priority=Priority.NORMAL, output_tokens=1000, usage=None):
+    """
+    Invokes a prompt | llm | parser chain under the chat limiter. The estimate
+    (prompt inputs plus an output allowance) is corrected with the reported usage.
+    Pass a UsageMetadataCallbackHandler as `usage` to read the token counts back.
+    """
+    limiter = get_limiter("chat")
+    estimated = sum(count_tokens(str(value)) for value in inputs.values()) + output_tokens
+    if usage is None:
+        usage = UsageMetadataCallbackHandler()
+    result = limiter.call(priority, chain.invoke, inputs, {"callbacks": [usage]}, tokens=estimated)
+    actual = sum(u.get("total_tokens", 0) for u in usage.usage_metadata.values())
+    limiter.record_usage(estimated, actual)
+    return result
+
+
+def embed_documents(embeddings, texts, priority=Priority.BACKGROUND):
+    limiter = get_limiter("embeddings")
+    tokens = sum(count_tokens(text) for text in texts)
+    instrumentation.increment("embedding_tokens_total", tokens, kind="documents")
+    return limiter.call(priority, embeddings.embed_documents, texts, tokens=tokens)
+
+
+def embed_query(embeddings, text, priority=Priority.INTERACTIVE):
+    limiter = get_limiter("embeddings")
+    tokens = count_tokens(text)
+    instrumentation.increment("embedding_tokens_total", tokens, kind="query")
+    return limiter.call(priority, embeddings.embed_query, text, tokens=tokens)
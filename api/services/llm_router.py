@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+import logging
+from collections import defaultdict
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.output_parsers import StrOutputParser
+from langchain_openai import ChatOpenAI
+from . import instrumentation
+from .llm_limiter import Priority, invoke_chain
+
+logger = logging.getLogger(__name__)
+
+LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", "gpt-4o")
+SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "gpt-4o-mini")
+# Limiter reservation for stages without max_tokens; corrected by the reported usage
+UNCAPPED_OUTPUT_ESTIMATE = 2000
+
+# Per-stage model choice. "escalate_to" names the model retried when the
+# stage's output fails validation; None disables the cascade. Formatted and
+# translated pages and answers are left uncapped (max_tokens None): a cap
+# would silently cut them off mid-text.
+DEFAULT_STAGES = {
+    "formatting": {"model": SMALL_MODEL, "temperature": 0.0, "max_tokens": None, "escalate_to": None},
+    "translation": {"model": LARGE_MODEL, "temperature": 0.0, "max_tokens": None, "escalate_to": None},
+    "rewrite": {"model": SMALL_MODEL, "temperature": 0.0, "max_tokens": 100, "escalate_to": None},
+    "answer": {"model": LARGE_MODEL, "temperature": 0.0, "max_tokens": None, "escalate_to": None},
+    "summary": {"model": SMALL_MODEL, "temperature": 0.0, "max_tokens": 400, "escalate_to": None},
+    "suggestions": {"model": SMALL_MODEL, "temperature": 0.0, "max_tokens": 200, "escalate_to": LARGE_MODEL},
+    "quiz": {"model": SMALL_MODEL, "temperature": 0.0, "max_tokens": 2500, "escalate_to": LARGE_MODEL},
+}
+
+
+def stage_config(stage):
+    """
+    Stage settings, overridable per stage with LLM_<STAGE>_MODEL,
+    LLM_<STAGE>_TEMPERATURE, LLM_<STAGE>_MAX_TOKENS and LLM_<STAGE>_ESCALATE_TO
+    (empty string disables escalation).
+    """
+    config = dict(DEFAULT_STAGES[stage])
+    prefix = f"LLM_{stage.upper()}_"
+    if os.getenv(prefix + "MODEL"):
+        config["model"] = os.getenv(prefix + "MODEL")
+    if os.getenv(prefix + "TEMPERATURE"):
+        config["temperature"] = float(os.getenv(prefix + "TEMPERATURE"))
+    if os.getenv(prefix + "MAX_TOKENS"):
+        config["max_tokens"] = int(os.getenv(prefix + "MAX_TOKENS"))
+    if os.getenv(prefix + "ESCALATE_TO") is not None:
+        config["escalate_to"] = os.getenv(prefix + "ESCALATE_TO") or None
+    return config
+
+
+class LLMRouter:
+    """
+    Runs prompts for a named stage on that stage's model, escalating to the
+    larger model when the cheap model's output fails validation. Clients are
+    shared per (model, temperature, max_tokens) and latency/token usage is
+    recorded per stage and model.
+    """
+    _clients = {}
+    _metrics = defaultdict(lambda: {
+        "calls": 0, "errors": 0, "escalations": 0, "latency_seconds": 0.0,
+        "input_tokens": 0, "output_tokens": 0,
+    })
+    _lock = threading.Lock()
+
+    def llm(self, stage, model=None, temperature=None):
+        config = stage_config(stage)
+        model = model or config["model"]
+        temperature = config["temperature"] if temperature is None else temperature
+        key = (model, temperature, config["max_tokens"])
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = ChatOpenAI(
+                    model=model,
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    temperature=temperature,
+                    max_tokens=config["max_tokens"]
+                )
+            return self._clients[key]
+
+    def run(self, stage, prompt, inputs, priority=Priority.NORMAL, parse=None, validate=None, temperature=None):
+        """
+        Invokes prompt | llm | StrOutputParser for the stage. `parse` turns the
+        text into a result; `validate(result)` returning False (or `parse`
+        raising) escalates to the stage's larger model when one is configured.
+        The last model's result is returned as-is for the caller to handle.
+        """
+        config = stage_config(stage)
+        models = [config["model"]]
+        if (parse or validate) and config["escalate_to"] and config["escalate_to"] != config["model"]:
+            models.append(config["escalate_to"])
+
+        for attempt, model in enumerate(models):
+            is_last = attempt == len(models) - 1
+            text = self._invoke(stage, model, prompt, inputs, priority, temperature, config["max_tokens"])
+            try:
+                result = parse(text) if parse else text
+            except Exception:
+                if is_last:
+                    raise
+                self._escalated(stage, model)
+                continue
+            if is_last or validate is None or validate(result):
+                return result
+            self._escalated(stage, model)
+
+    def _invoke(self, stage, model, prompt, inputs, priority, temperature, max_tokens):
+        chain = prompt | self.llm(stage, model, temperature) | StrOutputParser()
+        usage = UsageMetadataCallbackHandler()
+        started = time.perf_counter()
+        try:
+            return invoke_chain(
+                chain, inputs, priority=priority, output_tokens=max_tokens or UNCAPPED_OUTPUT_ESTIMATE, usage=usage
+            )
+        except Exception:
+            self._record(stage, model, error=True)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._record(stage, model, latency=elapsed, usage=usage.usage_metadata.values())
+            logger.debug("LLM stage %s on %s took %.2fs", stage, model, elapsed)
+
+    def _escalated(self, stage, model):
+        self._record(stage, model, escalation=True)
+        logger.info("LLM stage %s escalating from %s", stage, model)
+
+    def _record(self, stage, model, latency=None, usage=(), error=False, escalation=False):
+        with self._lock:
+            metrics = self._metrics[(stage, model)]
+            if latency is not None:
+                metrics["calls"] += 1
+                metrics["latency_seconds"] += latency
+            for u in usage:
+                metrics["input_tokens"] += u.get("input_tokens", 0)
+                metrics["output_tokens"] += u.get("output_tokens", 0)
+            metrics["errors"] += int(error)
+            metrics["escalations"] += int(escalation)
+        if latency is not None:
+            instrumentation.observe("llm_request_duration_seconds", latency, stage=stage, model=model)
+            instrumentation.increment("llm_requests_total", stage=stage, model=model)
+        for u in usage:
+            instrumentation.record_tokens(stage, model, u.get("input_tokens", 0), u.get("output_tokens", 0))
+        if error:
+            instrumentation.increment("llm_errors_total", stage=stage, model=model)
+        if escalation:
+            instrumentation.increment("llm_escalations_total", stage=stage, model=model)
+
+    def metrics(self):
+        """Per-stage, per-model counters with average latency."""
+        with self._lock:
+            snapshot = {}
+            for (stage, model), metrics in self._metrics.items():
+                entry = dict(metrics)
+                entry["avg_latency_seconds"] = round(metrics["latency_seconds"] / metrics["calls"], 3) if metrics["calls"] else 0.0
+                snapshot.setdefault(stage, {})[model] = entry
+            return snapshot
@@ -0,0 +1,114 @@
+import html
+import re
+import uuid
+from django.db import connection
+
+# Private-use sentinels survive html.escape and become <mark> tags afterwards
+MARK_START, MARK_END = "\ue000", "\ue001"
+SNIPPET_TOKENS = 16
+MAX_TERMS = 8
+
+
+def search_terms(query: str):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def highlight(snippet):
+    """Escapes page text and turns the engine's sentinels into <mark> tags."""
+    if not snippet:
+        return ""
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class PageSearchService:
+    """
+    Keyword search over DocumentPage text without touching the LLM or the
+    vector store: SQLite FTS5 (api_documentpage_fts) or a PostgreSQL tsvector
+    GIN index, both created by migration 0014 and maintained on every write.
+    """
+
+    def search(self, project_id, query: str, document_ids=None, limit: int = 20):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        if connection.vendor == "postgresql":
+            rows = self._search_postgres(project_id, terms, document_ids, limit)
+        else:
+            rows = self._search_sqlite(project_id, terms, document_ids, limit)
+        return [
+            {
+                # SQLite hands back UUIDs as bare hex
+                "document_id": str(uuid.UUID(str(document_id))),
+                "document_name": document_name,
+                "page_id": str(uuid.UUID(str(page_id))),
+                "page_number": page_number,
+                "original_snippet": highlight(original_snippet),
+                "translated_snippet": highlight(translated_snippet),
+            }
+            for page_id, page_number, document_id, document_name, original_snippet, translated_snippet in rows
+        ]
+
+    def _document_clause(self, document_ids, params):
+        if not document_ids:
+            return ""
+        params.extend(str(doc_id).replace("-", "") if connection.vendor == "sqlite" else str(doc_id)
+                      for doc_id in document_ids)
+        return f" AND d.id IN ({', '.join(['%s'] * len(document_ids))})"
+
+    def _search_sqlite(self, project_id, terms, document_ids, limit):
+        # Each term is quoted (FTS5 syntax characters are literal) and prefix-matched; terms are ANDed
+        match = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        params = [MARK_START, MARK_END, SNIPPET_TOKENS, MARK_START, MARK_END, SNIPPET_TOKENS,
+                  match, match, str(project_id).replace("-", "")]
+        # Ranks and limits first so snippets are only built for the returned pages
+        sql = f"""
+            SELECT p.id, p.page_number, d.id, d.name,
+                   snippet(api_documentpage_fts, 0, %s, %s, '…', %s),
+                   snippet(api_documentpage_fts, 1, %s, %s, '…', %s)
+            FROM api_documentpage_fts
+            JOIN api_documentpage_search_key k ON k.id = api_documentpage_fts.rowid
+            JOIN api_documentpage p ON p.id = k.page_id
+            JOIN api_document d ON d.id = p.document_id
+            WHERE api_documentpage_fts MATCH %s AND api_documentpage_fts.rowid IN (
+                SELECT api_documentpage_fts.rowid FROM api_documentpage_fts
+                JOIN api_documentpage_search_key fk ON fk.id = api_documentpage_fts.rowid
+                JOIN api_documentpage fp ON fp.id = fk.page_id
+                JOIN api_document d ON d.id = fp.document_id
+                WHERE api_documentpage_fts MATCH %s AND d.project_id = %s AND d.deleted_at IS NULL
+                {self._document_clause(document_ids, params)}
+                ORDER BY bm25(api_documentpage_fts)
+                LIMIT %s
+            )
+            ORDER BY bm25(api_documentpage_fts), d.name, p.page_number
+        """
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _search_postgres(self, project_id, terms, document_ids, limit):
+        # search_terms only yields \w+ words, so they are safe inside to_tsquery
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_TOKENS}, MinWords=5"
+        params = [tsquery, options, options, str(project_id)]
+        sql = f"""
+            WITH q AS (SELECT to_tsquery('simple', %s) AS query)
+            SELECT p.id, p.page_number, d.id, d.name,
+                   ts_headline('simple', coalesce(p.original_text, ''), q.query, %s),
+                   ts_headline('simple', coalesce(p.translated_text, ''), q.query, %s)
+            FROM api_documentpage p
+            JOIN api_document d ON d.id = p.document_id, q
+            WHERE to_tsvector('simple', coalesce(p.original_text, '') || ' ' || coalesce(p.translated_text, ''))
+                  @@ q.query
+              AND d.project_id = %s AND d.deleted_at IS NULL
+            {self._document_clause(document_ids, params)}
+            ORDER BY ts_rank(
+                to_tsvector('simple', coalesce(p.original_text, '') || ' ' || coalesce(p.translated_text, '')),
+                q.query
+            ) DESC, d.name, p.page_number
+            LIMIT %s
+        """
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
@@ -1,54 +1,297 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
 import os
 import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import transaction
+from django.db.models import F
+from .background import submit_on_commit
 from .chroma_service import ChromaService
+from .chunk_selector import RepresentativeChunkSelector
+from .context_builder import count_tokens
+from .llm_limiter import Priority
+from .llm_router import LLMRouter
+
+QUIZ_TYPES = ('MULTIPLE_CHOICE', 'FLASHCARD')
+BANK_TARGET_SIZE = int(os.getenv("QUESTION_BANK_SIZE", "30"))
+BANK_LOW_WATERMARK = int(os.getenv("QUESTION_BANK_LOW_WATERMARK", "10"))
+SHARD_SIZE = int(os.getenv("QUIZ_SHARD_SIZE", "5"))
+MAX_PARALLEL_SHARDS = int(os.getenv("QUIZ_MAX_PARALLEL_SHARDS", "4"))
+MAX_SHARD_RETRIES = 2
+CHUNKS_PER_SHARD = 8
+SHARD_CONTEXT_TOKEN_BUDGET = int(os.getenv("QUIZ_CONTEXT_TOKEN_BUDGET", "3000"))
+DUPLICATE_THRESHOLD = 0.85
+
+
+def _trigrams(text):
+    normalized = re.sub(r"\W+", "", text.lower())
+    return {normalized[i:i + 3] for i in range(max(1, len(normalized) - 2))}
+
+
+def is_near_duplicate(trigrams_a, trigrams_b, threshold=DUPLICATE_THRESHOLD):
+    if not trigrams_a or not trigrams_b:
+        return False
+    return len(trigrams_a & trigrams_b) / len(trigrams_a | trigrams_b) >= threshold
+
+
+def dedupe_questions(questions, existing=()):
+    """
+    Drops questions that are near-duplicates (question and answer together)
+    of an earlier one or of an `existing` (question_text, answer) pair.
+    """
+    seen = [_trigrams(f"{text} {answer}") for text, answer in existing]
+    unique = []
+    for q in questions:
+        trigrams = _trigrams(f"{q['question_text']} {q['answer']}")
+        if any(is_near_duplicate(trigrams, other) for other in seen):
+            continue
+        seen.append(trigrams)
+        unique.append(q)
+    return unique
+
 
 class QuizService:
+    _refills_in_flight = set()
+    _lock = threading.Lock()
+
     def __init__(self):
         self.chroma_service = ChromaService()
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            api_key=os.getenv("OPENAI_API_KEY"),
-            temperature=0.0
-        )
+        self.chunk_selector = RepresentativeChunkSelector(self.chroma_service)
+        self.llm_router = LLMRouter()
 
-    def generate_quiz(self, project_id: str, num_questions=5, quiz_type='MULTIPLE_CHOICE'):
+    def generate_quiz(self, project_id: str, num_questions=5, quiz_type='MULTIPLE_CHOICE', document_ids=None):
         try:
-            from api.models import Project, Quiz, Question
-            
+            from api.models import Project
+
             project = Project.objects.get(id=project_id)
-            
-            vector_store = self.chroma_service.get_vector_store(project_id)
-            retriever = vector_store.as_retriever(search_kwargs={"k": 15})
-            docs = retriever.invoke("important key concepts and definitions summary")
-            context = "\n\n".join([doc.page_content for doc in docs])
-            
-            if not context:
+            num_questions = int(num_questions)
+
+            # Whole-project quizzes are assembled from the pre-generated bank when possible
+            if not document_ids:
+                quiz = self.create_quiz_from_bank(project, num_questions, quiz_type)
+                if quiz:
+                    return quiz
+
+            questions_data = self._generate_questions(project_id, num_questions, quiz_type, document_ids)
+            if not questions_data:
                 return None
+            return self._create_quiz(project, quiz_type, questions_data)
 
-            questions_data = self._generate_questions_json(context, num_questions, quiz_type)
-            
+        except Exception:
+            return None
+
+    def start_job(self, job):
+        """
+        Completes the job inline when the question bank can serve it, otherwise
+        queues generation on the background worker pool.
+        """
+        if not job.document_ids:
+            quiz = self.create_quiz_from_bank(job.project, job.num_questions, job.quiz_type)
+            if quiz:
+                self._update_job(job, 'completed', "Completed", quiz=quiz)
+                return job
+        submit_on_commit(self.run_job, str(job.id))
+        return job
+
+    def run_job(self, job_id):
+        from api.models import QuizJob
+
+        job = QuizJob.objects.get(id=job_id)
+        self._update_job(job, 'processing', "Generating questions...")
+        quiz = self.generate_quiz(
+            str(job.project_id), job.num_questions, job.quiz_type, document_ids=job.document_ids or None
+        )
+        if quiz:
+            self._update_job(job, 'completed', "Completed", quiz=quiz)
+        else:
+            self._update_job(job, 'failed', "Failed to generate quiz. Ensure documents are uploaded.")
+        return job
+
+    def _update_job(self, job, status, message, quiz=None):
+        job.status = status
+        job.processing_message = message
+        if quiz is not None:
+            job.quiz = quiz
+        job.save()
+
+    def _create_quiz(self, project, quiz_type, questions_data):
+        from api.models import Quiz, Question
+
+        with transaction.atomic():
             quiz = Quiz.objects.create(
                 project=project,
                 title=f"Generated {'Flashcards' if quiz_type == 'FLASHCARD' else 'Quiz'} ({len(questions_data)} Questions)",
                 quiz_type=quiz_type
             )
-            
-            for q in questions_data:
-                Question.objects.create(
+            Question.objects.bulk_create([
+                Question(
                     quiz=quiz,
                     question_text=q['question_text'],
                     options=q['options'],
                     answer=q['answer']
                 )
-            return quiz
+                for q in questions_data
+            ])
+        return quiz
 
-        except Exception:
+    def create_quiz_from_bank(self, project, num_questions, quiz_type):
+        """
+        Samples the least-used bank questions into a new quiz. Returns None if
+        the bank cannot cover the request; schedules a top-up when it runs low.
+        """
+        from api.models import BankQuestion
+
+        bank = BankQuestion.objects.filter(project=project, quiz_type=quiz_type)
+        picked = list(bank.order_by('times_used', '?')[:num_questions])
+        if len(picked) < num_questions:
+            self.schedule_bank_refill(project.id, quiz_types=[quiz_type])
             return None
 
-    def _generate_questions_json(self, context, num, q_type):
+        quiz = self._create_quiz(project, quiz_type, [
+            {"question_text": q.question_text, "options": q.options, "answer": q.answer}
+            for q in picked
+        ])
+        BankQuestion.objects.filter(id__in=[q.id for q in picked]).update(times_used=F('times_used') + 1)
+
+        if bank.filter(times_used=0).count() < BANK_LOW_WATERMARK:
+            self.schedule_bank_refill(project.id, quiz_types=[quiz_type])
+        return quiz
+
+    def schedule_bank_refill(self, project_id, quiz_types=QUIZ_TYPES, reset=False):
+        """Queues a background top-up; reset empties the bank first (e.g. after document changes)."""
+        if reset:
+            from api.models import BankQuestion
+            BankQuestion.objects.filter(project_id=project_id, quiz_type__in=quiz_types).delete()
+        for quiz_type in quiz_types:
+            submit_on_commit(self.refill_bank, str(project_id), quiz_type)
+
+    def refill_bank(self, project_id, quiz_type):
+        key = (project_id, quiz_type)
+        with self._lock:
+            if key in self._refills_in_flight:
+                return
+            self._refills_in_flight.add(key)
+        try:
+            self._refill_bank(project_id, quiz_type)
+        finally:
+            with self._lock:
+                self._refills_in_flight.discard(key)
+
+    def _refill_bank(self, project_id, quiz_type):
+        from api.models import BankQuestion
+
+        bank = BankQuestion.objects.filter(project_id=project_id, quiz_type=quiz_type)
+        missing = BANK_TARGET_SIZE - bank.filter(times_used=0).count()
+        if missing <= 0:
+            return
+
+        generated = self._generate_questions(project_id, missing, quiz_type, priority=Priority.BACKGROUND)
+        existing = list(bank.values_list('question_text', 'answer'))
+        BankQuestion.objects.bulk_create([
+            BankQuestion(
+                project_id=project_id,
+                quiz_type=quiz_type,
+                question_text=q['question_text'],
+                options=q['options'],
+                answer=q['answer']
+            )
+            for q in dedupe_questions(generated, existing=existing)
+        ])
+
+    def _generate_questions(self, project_id, num_questions, quiz_type, document_ids=None, priority=Priority.NORMAL):
+        """
+        Splits large requests into shards of SHARD_SIZE questions, each over its
+        own group of chunks, generated concurrently and validated independently.
+        A failed shard only loses its own questions. Bank refills pass
+        Priority.BACKGROUND so they queue behind user-requested quizzes.
+        """
+        shard_sizes = [SHARD_SIZE] * (num_questions // SHARD_SIZE)
+        if num_questions % SHARD_SIZE:
+            shard_sizes.append(num_questions % SHARD_SIZE)
+        if not shard_sizes:
+            return []
+
+        docs = self._retrieve_context_docs(
+            project_id, document_ids, k=max(15, CHUNKS_PER_SHARD * len(shard_sizes)), priority=priority
+        )
+        if not docs:
+            return []
+
+        # Round-robin so every shard gets a mix of highly and less relevant chunks
+        groups = [docs[i::len(shard_sizes)] for i in range(len(shard_sizes))]
+        if len(shard_sizes) == 1:
+            results = [self._generate_shard(groups[0], shard_sizes[0], quiz_type, priority)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(shard_sizes), MAX_PARALLEL_SHARDS)) as pool:
+                results = list(pool.map(
+                    self._generate_shard, groups, shard_sizes,
+                    [quiz_type] * len(shard_sizes), [priority] * len(shard_sizes)
+                ))
+
+        merged = dedupe_questions([q for shard in results for q in shard])
+        return merged[:num_questions]
+
+    def _generate_shard(self, docs, num, quiz_type, priority=Priority.NORMAL):
+        context = self._pack_context(docs)
+        best = []
+        for attempt in range(1 + MAX_SHARD_RETRIES):
+            try:
+                # Retries use a little temperature so a malformed answer isn't just repeated
+                data = self._generate_questions_json(
+                    context, num, quiz_type, temperature=0.4 if attempt else None, priority=priority
+                )
+            except Exception:
+                continue
+            valid = self._validate_questions(data, quiz_type)
+            if len(valid) > len(best):
+                best = valid
+            if len(best) >= num:
+                break
+        return best[:num]
+
+    def _pack_context(self, docs):
+        parts = []
+        used_tokens = 0
+        for doc in docs:
+            tokens = count_tokens(doc.page_content)
+            if parts and used_tokens + tokens > SHARD_CONTEXT_TOKEN_BUDGET:
+                break
+            parts.append(doc.page_content)
+            used_tokens += tokens
+        return "\n\n".join(parts)
+
+    def _validate_questions(self, data, quiz_type):
+        if not isinstance(data, list):
+            return []
+        valid = []
+        for q in data:
+            if not isinstance(q, dict):
+                continue
+            question_text, answer, options = q.get('question_text'), q.get('answer'), q.get('options', [])
+            if not isinstance(question_text, str) or not question_text.strip():
+                continue
+            if not isinstance(answer, str) or not answer.strip() or not isinstance(options, list):
+                continue
+            if quiz_type != 'FLASHCARD' and (len(options) < 2 or answer not in options):
+                continue
+            valid.append({"question_text": question_text, "options": options, "answer": answer})
+        return valid
+
+    def _retrieve_context_docs(self, project_id, document_ids=None, k=15, priority=Priority.NORMAL):
+        """
+        Representative chunks from clustering the stored embeddings, which
+        spreads quizzes over the material instead of one fixed semantic query.
+        """
+        try:
+            return self.chunk_selector.select(project_id, k, document_ids)
+        except Exception:
+            return self.chroma_service.similarity_search(
+                project_id, "important key concepts and definitions summary", k=k,
+                document_ids=document_ids, priority=priority
+            )
+
+    def _generate_questions_json(self, context, num, q_type, temperature=None, priority=Priority.NORMAL):
         if q_type == 'FLASHCARD':
             template = """
             Generate {num} flashcards (term/definition) in Korean JSON from Context.
@@ -61,8 +304,11 @@ class QuizService:
             Format: [{{"question_text": "", "options": ["A","B","C","D"], "answer": "Correct Option"}}]
             Context: {context}
             """
-            
+
         prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-        res = chain.invoke({"context": context, "num": num})
-        return json.loads(res.replace("```json", "").replace("```", "").strip())
+        # The cheap model's questions are escalated to the large model when too few validate
+        return self.llm_router.run(
+            "quiz", prompt, {"context": context, "num": num}, priority=priority, temperature=temperature,
+            parse=lambda res: json.loads(res.replace("```json", "").replace("```", "").strip()),
+            validate=lambda data: len(self._validate_questions(data, q_type)) >= num
+        )
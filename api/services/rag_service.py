@@ -1,66 +1,176 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-import os
+import math
+import json
+import logging
+import openai
+from . import instrumentation
 from .chroma_service import ChromaService
+from .context_builder import ContextBuilder
+from .llm_limiter import Priority
+from .llm_router import LLMRouter
+from .keyword_index import KeywordIndexService, reciprocal_rank_fusion, cap_per_document
+
+logger = logging.getLogger(__name__)
 
 class RAGService:
     def __init__(self):
         self.chroma_service = ChromaService()
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            api_key=os.getenv("OPENAI_API_KEY"),
-            temperature=0.0
-        )
+        self.keyword_index = KeywordIndexService()
+        self.context_builder = ContextBuilder()
+        self.llm_router = LLMRouter()
+
+    def get_answer(self, project_id: str, query: str, document_ids=None, history=None):
+        """
+        history: optional {"summary": str, "messages": [{"role", "content"}, ...]}
+        with a bounded window of recent turns, used to resolve follow-up questions.
+        """
+        with instrumentation.breakdown("message", f"in project {project_id}"):
+            return self._answer(project_id, query, document_ids, history)
 
-    def get_answer(self, project_id: str, query: str):
+    def _answer(self, project_id, query, document_ids, history):
         try:
-            vector_store = self.chroma_service.get_vector_store(project_id)
-            retriever = vector_store.as_retriever(search_kwargs={"k": 10})
-            
-            docs = retriever.invoke(query)
+            conversation = self._format_history(history)
+            search_query = query
+            if conversation and not self._keyword_only_query(query):
+                with instrumentation.timed("rewrite"):
+                    search_query = self._rewrite_query(query, conversation)
+
+            docs = self._retrieve(project_id, search_query, k=10, document_ids=document_ids)
             
-            formatted_context, sources_metadata = self._format_docs(docs)
+            with instrumentation.timed("build_context"):
+                formatted_context, sources_metadata = self._format_docs(docs)
             
-            answer = self._generate_answer(formatted_context, query)
+            with instrumentation.timed("generate"):
+                answer = self._generate_answer(formatted_context, query, conversation)
             
             return {
                 "answer": answer,
                 "sources": sources_metadata
             }
+        except openai.RateLimitError:
+            instrumentation.increment("rag_errors_total", reason="rate_limited")
+            logger.warning("Answer for project %s rate limited", project_id)
+            return {
+                "answer": "요청이 많아 잠시 답변할 수 없습니다. 잠시 후 다시 시도해 주세요.",
+                "sources": []
+            }
         except Exception:
+            instrumentation.increment("rag_errors_total", reason="error")
+            logger.exception("Answer for project %s failed", project_id)
             return {
                 "answer": "답변을 생성하는 중 오류가 발생했습니다.",
                 "sources": []
             }
 
+    def _format_history(self, history):
+        if not history:
+            return ""
+        lines = []
+        if history.get("summary"):
+            lines.append(f"(Earlier conversation summary) {history['summary']}")
+        for message in history.get("messages", []):
+            lines.append(f"{message['role']}: {message['content']}")
+        return "\n".join(lines)
+
+    def _rewrite_query(self, query: str, conversation: str):
+        """Rewrites a follow-up question into a standalone search query."""
+        template = """
+        Rewrite the [Follow-up Question] into a standalone question that can be understood
+        without the [Conversation]. Resolve references like "that", "the second one" or "그거".
+        Keep the original language. Return ONLY the rewritten question.
+
+        [Conversation]:
+        {conversation}
+
+        [Follow-up Question]:
+        {query}
+        """
+        prompt = ChatPromptTemplate.from_template(template)
+        rewritten = self.llm_router.run(
+            "rewrite", prompt, {"conversation": conversation, "query": query}, priority=Priority.INTERACTIVE
+        ).strip()
+        return rewritten or query
+
+    def summarize_conversation(self, previous_summary: str, messages):
+        """Folds older messages into the rolling conversation summary."""
+        template = """
+        Update the running summary of a study conversation between a user and an AI assistant.
+        Keep topics asked about, key answers and anything the user may refer back to.
+        Write in Korean, at most 150 words. Return ONLY the updated summary.
+
+        [Current Summary]:
+        {summary}
+
+        [New Messages]:
+        {messages}
+        """
+        prompt = ChatPromptTemplate.from_template(template)
+        return self.llm_router.run("summary", prompt, {
+            "summary": previous_summary or "(none)",
+            "messages": "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        }, priority=Priority.NORMAL).strip()
+
+    def _retrieve(self, project_id: str, query: str, k: int = 10, document_ids=None):
+        """
+        Hybrid retrieval: BM25 keyword hits fused with dense Chroma hits by
+        reciprocal rank. Keyword-only queries that match skip the embedding call.
+        When scoped to several documents, each contributes at most a fair share.
+        """
+        candidates = k
+        per_document_cap = k
+        if document_ids and len(document_ids) > 1:
+            candidates = k * 2
+            per_document_cap = max(3, math.ceil(k / len(document_ids)))
+
+        keyword_query = self._keyword_only_query(query)
+        with instrumentation.timed("keyword_search"):
+            keyword_docs = self.keyword_index.search(
+                project_id, keyword_query or query, k=candidates, document_ids=document_ids
+            )
+        if keyword_query and keyword_docs:
+            return cap_per_document(keyword_docs, per_document_cap, k)
+
+        dense_docs = self.chroma_service.similarity_search(
+            project_id, query, k=candidates, document_ids=document_ids
+        )
+        return cap_per_document(reciprocal_rank_fusion([dense_docs, keyword_docs]), per_document_cap, k)
+
+    def _keyword_only_query(self, query: str):
+        """
+        Returns the search terms when the query is a quoted phrase or a few
+        identifier-like terms (course codes, formula names), otherwise None.
+        """
+        stripped = query.strip()
+        if len(stripped) > 2 and stripped[0] == stripped[-1] == '"':
+            return stripped[1:-1]
+
+        terms = stripped.split()
+        if 0 < len(terms) <= 3 and all(
+            any(c.isdigit() for c in term) or (len(term) > 1 and term.isupper())
+            for term in terms
+        ):
+            return stripped
+        return None
+
     def _format_docs(self, docs):
-        formatted_context = ""
-        sources = []
-        
-        for doc in docs:
-            doc_id = doc.metadata.get('document_id', 'unknown')
-            page_num = doc.metadata.get('source_page', 0) + 1
-            doc_name = doc.metadata.get('name', 'Unknown Document')
-            
-            formatted_context += f"[Document ID: {doc_id}, Page: {page_num}] {doc.page_content}\n\n"
-            
-            sources.append({
-                "document_id": doc_id,
-                "page": page_num,
-                "name": doc_name,
-                "content_snippet": doc.page_content[:100] + "..."
-            })
-            
+        formatted_context, sources, stats = self.context_builder.build(docs)
+        logger.info(
+            "RAG context: %d chunks -> %d blocks, %d tokens (saved %d)",
+            stats['chunks'], stats['blocks'], stats['context_tokens'], stats['tokens_saved']
+        )
         return formatted_context, sources
 
-    def _generate_answer(self, context, query):
+    def _generate_answer(self, context, query, conversation=""):
         template = """
         당신은 AI 어시스턴트입니다. [Context]를 기반으로 [Question]에 답변하세요.
+        [Conversation]은 이전 대화로, 질문의 지시 대상을 파악하는 데만 사용하세요.
         문장 끝에 출처 [Document ID: ..., Page: ...]를 명시하세요.
         Context에 없으면 모른다고 하세요.
         답변 작성 시 마크다운 규칙:
         - 제목은 H3(###) 이하만 사용하세요
+
+        [Conversation]:
+        {conversation}
         
         [Context]:
         {context}
@@ -71,23 +181,21 @@ class RAGService:
         [Answer]:
         """
         prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"context": context, "query": query})
+        return self.llm_router.run(
+            "answer", prompt, {"context": context, "query": query, "conversation": conversation or "(none)"},
+            priority=Priority.INTERACTIVE
+        )
 
     def generate_suggested_questions(self, project_id: str, last_message_content: str = None):
+        """Returns three follow-up questions, or None when generation fails."""
         try:
-            vector_store = self.chroma_service.get_vector_store(project_id)
-            retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-            
             search_query = last_message_content if last_message_content else "summary overview main topics"
-            docs = retriever.invoke(search_query)
+            docs = self.chroma_service.similarity_search(project_id, search_query, k=5, priority=Priority.NORMAL)
             context = "\n\n".join([d.page_content for d in docs])
             
             if not context:
                 return ["문서를 업로드하면 질문을 추천해 드릴 수 있어요.", "이 문서의 주요 내용은 무엇인가요?", "문서 요약을 부탁해 보세요."]
 
-            import json
-            
             template = """
             Generate 3 Korean follow-up questions based on the context.
             Output JSON Array of strings: ["Q1", "Q2", "Q3"]
@@ -95,10 +203,14 @@ class RAGService:
             """
             
             prompt = ChatPromptTemplate.from_template(template)
-            chain = prompt | self.llm | StrOutputParser()
             
-            res = chain.invoke({"context": context})
-            return json.loads(res.replace("```json", "").replace("```", "").strip())[:3]
+            questions = self.llm_router.run(
+                "suggestions", prompt, {"context": context}, priority=Priority.NORMAL,
+                parse=lambda res: json.loads(res.replace("```json", "").replace("```", "").strip()),
+                validate=lambda qs: isinstance(qs, list) and len(qs) >= 3 and all(isinstance(q, str) for q in qs)
+            )
+            return questions[:3]
             
         except Exception:
-            return ["추천 질문 생성 실패", "문서 요약을 부탁해 보세요.", "핵심 내용은 무엇인가요?"]
+            logger.exception("Suggested questions for project %s failed", project_id)
+            return None
@@ -0,0 +1,81 @@
+import logging
+import threading
+from django.db.models import F
+from django.utils import timezone
+from .background import submit_on_commit
+
+logger = logging.getLogger(__name__)
+
+NO_DOCUMENT_SUGGESTIONS = ["문서를 업로드하면 질문을 추천해 드릴 수 있어요.", "이 문서의 주요 내용은 무엇인가요?", "문서 요약을 부탁해 보세요."]
+PENDING_SUGGESTIONS = ["이 문서의 주요 내용은 무엇인가요?", "문서 요약을 부탁해 보세요.", "핵심 개념을 설명해 주세요."]
+
+class SuggestionService:
+    """
+    Stores suggested questions per project and regenerates them in the
+    background when documents finish processing or an assistant reply is saved.
+    """
+    _in_flight = set()
+    _lock = threading.Lock()
+
+    def get_suggestions(self, project):
+        """Serves the stored set, scheduling a refresh if it is missing or stale."""
+        from api.models import SuggestedQuestionSet
+
+        suggestion_set = SuggestedQuestionSet.objects.filter(project=project).first()
+        if suggestion_set is None or suggestion_set.is_stale:
+            self.schedule_refresh(project.id, mark_stale=False)
+        if suggestion_set and suggestion_set.questions:
+            return suggestion_set.questions
+        if project.documents.filter(status='processed').exists():
+            return PENDING_SUGGESTIONS
+        return NO_DOCUMENT_SUGGESTIONS
+
+    def mark_stale(self, project_id):
+        from api.models import SuggestedQuestionSet
+
+        updated = SuggestedQuestionSet.objects.filter(project_id=project_id).update(version=F('version') + 1)
+        if not updated:
+            SuggestedQuestionSet.objects.get_or_create(project_id=project_id)
+
+    def schedule_refresh(self, project_id, mark_stale=True):
+        if mark_stale:
+            self.mark_stale(project_id)
+        submit_on_commit(self.refresh, str(project_id))
+
+    def refresh(self, project_id):
+        """Regenerates the project's suggestions unless they are already fresh."""
+        with self._lock:
+            if project_id in self._in_flight:
+                return
+            self._in_flight.add(project_id)
+        try:
+            self._refresh(project_id)
+        finally:
+            with self._lock:
+                self._in_flight.discard(project_id)
+
+    def _refresh(self, project_id):
+        from api.models import Document, Message, SuggestedQuestionSet
+        from .rag_service import RAGService
+
+        suggestion_set, _ = SuggestedQuestionSet.objects.get_or_create(project_id=project_id)
+        if not suggestion_set.is_stale:
+            return
+        target_version = suggestion_set.version
+
+        if not Document.objects.filter(project_id=project_id, status='processed').exists():
+            questions = NO_DOCUMENT_SUGGESTIONS
+        else:
+            last_message = Message.objects.filter(project_id=project_id, role='assistant').order_by('-created_at').first()
+            questions = RAGService().generate_suggested_questions(
+                project_id, last_message.content if last_message else None
+            )
+            if questions is None:
+                # Leaves the set stale so the next request retries
+                logger.warning("Keeping stale suggestions for project %s", project_id)
+                return
+
+        # Don't overwrite a newer version that was generated concurrently
+        SuggestedQuestionSet.objects.filter(
+            pk=suggestion_set.pk, generated_version__lt=target_version
+        ).update(questions=questions, generated_version=target_version, updated_at=timezone.now())
@@ -0,0 +1,530 @@
+import contextlib
+import json
+import os
+import threading
+import uuid
+import zlib
+import chromadb
+import numpy as np
+from chromadb.errors import NotFoundError
+from .file_lock import flocked, unlink_held
+
+
+def matches(metadata: dict, where) -> bool:
+    """Evaluates the subset of Chroma's `where` syntax the services use ($eq, $ne, $in, $nin, $and, $or)."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class VectorStore:
+    """
+    Per-project chunk storage used by ChromaService. ids, documents and
+    metadatas are parallel lists; `where` uses Chroma's filter syntax.
+    """
+    name = None
+
+    def exists(self, project_id: str) -> bool:
+        raise NotImplementedError
+
+    def count(self, project_id: str) -> int:
+        raise NotImplementedError
+
+    def add(self, project_id: str, ids, embeddings, documents, metadatas):
+        raise NotImplementedError
+
+    def query(self, project_id: str, embedding, k: int, where=None):
+        """Returns (ids, documents, metadatas) of the k nearest chunks, nearest first."""
+        raise NotImplementedError
+
+    def get(self, project_id: str, where=None, include_embeddings=False):
+        """Returns (ids, documents, metadatas, embeddings); embeddings is None unless requested."""
+        raise NotImplementedError
+
+    def delete(self, project_id: str, where) -> bool:
+        raise NotImplementedError
+
+    def drop(self, project_id: str) -> bool:
+        raise NotImplementedError
+
+    def warm(self, project_id: str):
+        """Loads the project's vectors into memory ahead of its first query."""
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Chroma-backed storage in one of two layouts:
+
+    - "per-project": one collection (HNSW segment) per project, `project_<id>`.
+    - "shared": every project in one collection, or `shards` collections picked
+      by a stable hash of the project id, with `project_id` in each chunk's
+      metadata and every read/delete filtered on it.
+    """
+    name = "chroma"
+
+    def __init__(self, path: str, layout: str = "per-project", shards: int = 1):
+        self.path = path
+        self.layout = layout
+        self.shards = max(shards, 1)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Opened on first use so processes serving only flat projects never pay for it
+        with self._lock:
+            if self._client is None:
+                self._client = chromadb.PersistentClient(path=self.path)
+            return self._client
+
+    @property
+    def shared(self) -> bool:
+        return self.layout == "shared"
+
+    def collection_name(self, project_id: str) -> str:
+        if not self.shared:
+            return f"project_{project_id}"
+        if self.shards == 1:
+            return "chunks"
+        return f"chunks_{zlib.crc32(str(project_id).encode()) % self.shards}"
+
+    def _where(self, project_id: str, where=None):
+        if not self.shared:
+            return where
+        scope = {"project_id": str(project_id)}
+        return {"$and": [scope, where]} if where else scope
+
+    def _collection(self, project_id: str, create=False):
+        name = self.collection_name(project_id)
+        if create:
+            return self.client.get_or_create_collection(name=name)
+        try:
+            return self.client.get_collection(name=name)
+        except NotFoundError:
+            return None
+
+    def _has_database(self) -> bool:
+        return self._client is not None or os.path.exists(os.path.join(self.path, "chroma.sqlite3"))
+
+    def exists(self, project_id: str) -> bool:
+        if not self._has_database():
+            return False
+        collection = self._collection(project_id)
+        if collection is None:
+            return False
+        if not self.shared:
+            return True
+        return bool(collection.get(where=self._where(project_id), limit=1, include=[])['ids'])
+
+    def count(self, project_id: str) -> int:
+        collection = self._collection(project_id)
+        if collection is None:
+            return 0
+        if not self.shared:
+            return collection.count()
+        return len(collection.get(where=self._where(project_id), include=[])['ids'])
+
+    def add(self, project_id: str, ids, embeddings, documents, metadatas):
+        if self.shared:
+            metadatas = [{**(metadata or {}), "project_id": str(project_id)} for metadata in metadatas]
+        collection = self._collection(project_id, create=True)
+        collection.upsert(ids=list(ids), embeddings=embeddings, documents=list(documents), metadatas=list(metadatas))
+
+    def query(self, project_id: str, embedding, k: int, where=None):
+        collection = self._collection(project_id)
+        if collection is None:
+            return [], [], []
+        results = collection.query(query_embeddings=[embedding], n_results=k, where=self._where(project_id, where))
+        return results['ids'][0], results['documents'][0], results['metadatas'][0]
+
+    def get(self, project_id: str, where=None, include_embeddings=False):
+        collection = self._collection(project_id)
+        if collection is None:
+            return [], [], [], None
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = collection.get(where=self._where(project_id, where), include=include)
+        embeddings = results['embeddings'] if include_embeddings else None
+        return results['ids'], results['documents'] or [], results['metadatas'] or [], embeddings
+
+    def delete(self, project_id: str, where) -> bool:
+        collection = self._collection(project_id)
+        if collection is None:
+            return False
+        collection.delete(where=self._where(project_id, where))
+        return True
+
+    def warm(self, project_id: str):
+        # Chroma loads a segment's HNSW index on the first query against it
+        collection = self._collection(project_id)
+        if collection is None:
+            return
+        sample = collection.get(where=self._where(project_id), limit=1, include=["embeddings"])
+        if len(sample['embeddings']):
+            collection.query(query_embeddings=[sample['embeddings'][0]], n_results=1, where=self._where(project_id))
+
+    def drop(self, project_id: str) -> bool:
+        if not self._has_database():
+            return False
+        if self.shared:
+            collection = self._collection(project_id)
+            if collection is None:
+                return False
+            collection.delete(where=self._where(project_id))
+            return True
+        try:
+            self.client.delete_collection(name=self.collection_name(project_id))
+        except NotFoundError:
+            return False
+        return True
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def encode(vectors, dtype, dimensions=None):
+    """
+    Encodes unit float32 rows for scanning: optionally truncated to the leading
+    `dimensions` (text-embedding-3 vectors stay meaningful when shortened) and
+    renormalised, then cast to float16/float32 or quantised to int8 with one
+    scale per row. Returns (matrix, scales or None).
+    """
+    if dimensions and vectors.shape[1] > dimensions:
+        vectors = normalize(vectors[:, :dimensions])
+    if dtype == np.int8:
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        quantized = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+class FlatIndex:
+    """
+    A loaded project: the memory-mapped search matrix (possibly quantised or
+    truncated), optional per-row int8 scales, the optional full-precision
+    matrix used for re-scoring, and the sidecar lists.
+    """
+
+    def __init__(self, vectors, scales, full, ids, documents, metadatas, stamp):
+        self.vectors = vectors
+        self.scales = scales
+        self.full = full
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.stamp = stamp
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def files(self):
+        return [array.filename for array in (self.vectors, self.scales, self.full)
+                if array is not None and array.filename]
+
+    def rows(self, where):
+        if not where:
+            return np.arange(len(self.ids))
+        return np.fromiter(
+            (i for i, metadata in enumerate(self.metadatas) if matches(metadata, where)), dtype=np.int64
+        )
+
+    def scores(self, rows, query, block: int = 4096):
+        """
+        Approximate scores from the search matrix. Compact encodings are widened
+        to float32 a block at a time, since numpy has no BLAS path for int8/float16.
+        """
+        vectors = self.vectors if len(rows) == len(self) else self.vectors[rows]
+        query = query[:vectors.shape[1]]
+        if vectors.dtype == np.float32:
+            scores = vectors @ query
+        else:
+            scores = np.empty(len(vectors), dtype=np.float32)
+            for start in range(0, len(vectors), block):
+                scores[start:start + block] = np.asarray(vectors[start:start + block], dtype=np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales if len(rows) == len(self) else self.scales[rows]
+        return scores
+
+    def embeddings(self, rows):
+        """Best available float32 vectors for the rows: the full matrix, else the decoded search matrix."""
+        if self.full is not None:
+            return np.asarray(self.full[rows], dtype=np.float32)
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= np.asarray(self.scales[rows])[:, None]
+        return vectors
+
+
+class FlatVectorStore(VectorStore):
+    """
+    Exact search over one memory-mapped matrix per project. Vectors are stored
+    L2-normalised, so a dot product ranks like Chroma's L2 distance does for
+    the unit-length OpenAI embeddings.
+
+    With `dtype` int8/float16 or `dimensions` set, the scanned matrix is the
+    compact encoding. When `rescore` is on, the float32 vectors are kept in a
+    second, memory-mapped file that is only read for the top
+    `k * rescore_factor` candidates; with it off they are not stored at all.
+
+    Layout: <root>/project_<id>/meta.json names the current matrix files.
+    Writes produce new files and then atomically replace meta.json, so
+    readers (in this or another process) always see a consistent set.
+    """
+    name = "flat"
+
+    def __init__(self, root: str, dtype: str = "float32", dimensions: int = None,
+                 rescore: bool = True, rescore_factor: int = 4):
+        self.root = root
+        self.dtype = np.dtype(dtype)
+        self.dimensions = dimensions or None
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self._indexes = {}
+        self._lock = threading.RLock()
+        self._held = set()
+
+    @property
+    def compact(self) -> bool:
+        return self.dtype != np.float32 or self.dimensions is not None
+
+    @property
+    def keeps_full_width(self) -> bool:
+        """False when truncated vectors are the only copy, so they can't move to another backend."""
+        return self.dimensions is None or self.rescore
+
+    def _dir(self, project_id: str) -> str:
+        return os.path.join(self.root, f"project_{project_id}")
+
+    def _meta_path(self, project_id: str) -> str:
+        return os.path.join(self._dir(project_id), "meta.json")
+
+    def exists(self, project_id: str) -> bool:
+        return os.path.exists(self._meta_path(project_id))
+
+    def writing(self, project_id: str):
+        """Holds the project's write lock across several calls; the store's own writes re-enter it."""
+        return self._writing(project_id)
+
+    @contextlib.contextmanager
+    def _writing(self, project_id: str):
+        """Serialises writers across threads and, where flock exists, across worker processes."""
+        with self._lock:
+            # A second flock from this process would wait on itself
+            if project_id in self._held:
+                yield
+                return
+            with flocked(self._lock_path(project_id)):
+                self._held.add(project_id)
+                try:
+                    yield
+                finally:
+                    self._held.discard(project_id)
+
+    def _lock_path(self, project_id: str) -> str:
+        return os.path.join(self._dir(project_id), ".lock")
+
+    def _load(self, project_id: str):
+        path = self._meta_path(project_id)
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            index = self._indexes.get(project_id)
+            if index is not None and index.stamp == stamp:
+                return index
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f)
+            directory = self._dir(project_id)
+            arrays = {
+                key: np.load(os.path.join(directory, meta[key]), mmap_mode="r") if meta.get(key) else None
+                for key in ("vectors", "scales", "full")
+            }
+            index = FlatIndex(
+                arrays["vectors"], arrays["scales"], arrays["full"],
+                meta["ids"], meta["documents"], meta["metadatas"], stamp
+            )
+            self._indexes[project_id] = index
+            return index
+
+    def _write(self, project_id: str, vectors, ids, documents, metadatas):
+        directory = self._dir(project_id)
+        os.makedirs(directory, exist_ok=True)
+        previous = self._load(project_id)
+        previous_files = previous.files if previous is not None else []
+
+        token = uuid.uuid4().hex
+        search, scales = encode(vectors, self.dtype, self.dimensions)
+        arrays = {"vectors": search, "scales": scales}
+        if self.compact and self.rescore:
+            arrays["full"] = vectors.astype(np.float32)
+        meta = {"dtype": self.dtype.name, "dimensions": search.shape[1],
+                "ids": ids, "documents": documents, "metadatas": metadatas}
+        for key, array in arrays.items():
+            if array is None:
+                continue
+            meta[key] = f"{key}-{token}.npy"
+            np.save(os.path.join(directory, meta[key]), np.ascontiguousarray(array))
+
+        meta_path = self._meta_path(project_id)
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+        self._indexes.pop(project_id, None)
+        for previous_file in previous_files:
+            try:
+                # Open memory maps of the old files stay valid until they are dropped
+                os.remove(previous_file)
+            except OSError:
+                pass
+
+    def count(self, project_id: str) -> int:
+        index = self._load(project_id)
+        return len(index) if index else 0
+
+    def add(self, project_id: str, ids, embeddings, documents, metadatas):
+        new = normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._writing(project_id):
+            index = self._load(project_id)
+            if index is None:
+                self._write(project_id, new, list(ids), list(documents), list(metadatas))
+                return
+            # Same ids replace their rows, as Chroma's upsert does
+            replaced = set(ids)
+            keep = [i for i, chunk_id in enumerate(index.ids) if chunk_id not in replaced]
+            existing = index.embeddings(keep)
+            if existing.shape[1] < new.shape[1]:
+                # Stored without full precision: the new rows can only join at the stored width
+                new = normalize(new[:, :existing.shape[1]])
+            self._write(
+                project_id,
+                np.concatenate([existing.reshape(len(keep), new.shape[1]), new]),
+                [index.ids[i] for i in keep] + list(ids),
+                [index.documents[i] for i in keep] + list(documents),
+                [index.metadatas[i] for i in keep] + list(metadatas),
+            )
+
+    def query(self, project_id: str, embedding, k: int, where=None):
+        index = self._load(project_id)
+        if index is None or not len(index):
+            return [], [], []
+        rows = index.rows(where)
+        if not len(rows):
+            return [], [], []
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = index.scores(rows, query)
+        if index.full is not None:
+            candidates = self._top(scores, k * self.rescore_factor)
+            rows = rows[candidates]
+            scores = np.asarray(index.full[rows], dtype=np.float32) @ query
+        hits = rows[self._top(scores, k)]
+        return (
+            [index.ids[i] for i in hits],
+            [index.documents[i] for i in hits],
+            [index.metadatas[i] for i in hits],
+        )
+
+    def _top(self, scores, k):
+        """Positions of the k highest scores, best first."""
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def get(self, project_id: str, where=None, include_embeddings=False):
+        index = self._load(project_id)
+        if index is None:
+            return [], [], [], None
+        rows = index.rows(where)
+        return (
+            [index.ids[i] for i in rows],
+            [index.documents[i] for i in rows],
+            [index.metadatas[i] for i in rows],
+            index.embeddings(rows) if include_embeddings else None,
+        )
+
+    def delete(self, project_id: str, where) -> bool:
+        with self._writing(project_id):
+            index = self._load(project_id)
+            if index is None:
+                return False
+            doomed = set(index.rows(where).tolist())
+            if not doomed:
+                return True
+            keep = [i for i in range(len(index)) if i not in doomed]
+            embeddings = index.embeddings(keep)
+            self._write(
+                project_id,
+                embeddings.reshape(len(keep), -1) if len(keep) else embeddings.reshape(0, index.vectors.shape[1]),
+                [index.ids[i] for i in keep],
+                [index.documents[i] for i in keep],
+                [index.metadatas[i] for i in keep],
+            )
+            return True
+
+    def warm(self, project_id: str):
+        # Reading the scanned matrix once pulls its pages into the page cache
+        index = self._load(project_id)
+        if index is not None and len(index):
+            index.vectors.sum(dtype=np.float64)
+            if index.scales is not None:
+                index.scales.sum(dtype=np.float64)
+
+    def move_to(self, project_id: str, target) -> int:
+        """
+        Copies the project into another store and drops it here, all under the
+        write lock so an add from another worker can't land in between.
+        """
+        with self._writing(project_id):
+            ids, documents, metadatas, embeddings = self.get(project_id, include_embeddings=True)
+            if ids:
+                target.add(project_id, ids, embeddings.tolist(), documents, metadatas)
+            self._remove_files(project_id)
+            return len(ids)
+
+    def drop(self, project_id: str) -> bool:
+        if not os.path.isdir(self._dir(project_id)):
+            return False
+        with self._writing(project_id):
+            dropped = self._remove_files(project_id)
+            unlink_held(self._lock_path(project_id))
+            try:
+                os.rmdir(self._dir(project_id))
+            except OSError:
+                pass
+            return dropped
+
+    def _remove_files(self, project_id: str) -> bool:
+        """Callers hold _writing. The .lock file stays; drop removes it while still holding it."""
+        self._indexes.pop(project_id, None)
+        directory = self._dir(project_id)
+        if not os.path.isdir(directory):
+            return False
+        existed = self.exists(project_id)
+        for name in os.listdir(directory):
+            if name != ".lock":
+                os.remove(os.path.join(directory, name))
+        return existed
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+from cachetools import TTLCache
+from django.core.signals import request_started
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from .background import submit, submit_on_commit
+from .context_builder import count_tokens
+from .llm_limiter import get_limiter
+from .rag_service import RAGService
+from .suggestion_service import SuggestionService
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TTL = int(os.getenv("WARMUP_TTL", "600"))
+PREWARM_RECENT_PROJECTS = int(os.getenv("PREWARM_RECENT_PROJECTS", "10"))
+
+class WarmupService:
+    """
+    Loads what a project's first chat question would otherwise pay for: its
+    vectors and keyword index, the shared embedding/LLM clients and tokenizer,
+    and its suggestions. A project is not re-warmed within WARMUP_TTL seconds.
+    """
+    _recent = TTLCache(maxsize=1024, ttl=WARMUP_TTL)
+    _in_flight = set()
+    _lock = threading.Lock()
+
+    def schedule(self, project_id, force=False):
+        """Queues a warm-up unless one ran recently; returns whether it was queued."""
+        project_id = str(project_id)
+        with self._lock:
+            if not force and project_id in self._recent:
+                return False
+        submit_on_commit(self.warm, project_id)
+        return True
+
+    def warm(self, project_id):
+        with self._lock:
+            if project_id in self._in_flight:
+                return
+            self._in_flight.add(project_id)
+        try:
+            started = time.perf_counter()
+            self._warm(project_id)
+            with self._lock:
+                self._recent[project_id] = True
+            logger.info("Warmed project %s in %.0f ms", project_id, (time.perf_counter() - started) * 1000)
+        finally:
+            with self._lock:
+                self._in_flight.discard(project_id)
+
+    def _warm(self, project_id):
+        rag_service = RAGService()
+        rag_service.chroma_service.warm(project_id)
+        rag_service.keyword_index.get_index(project_id)
+        for stage in ("rewrite", "answer"):
+            rag_service.llm_router.llm(stage)
+        for name in ("chat", "embeddings"):
+            get_limiter(name)
+        count_tokens("warm-up")
+        SuggestionService().schedule_refresh(project_id, mark_stale=False)
+
+    def schedule_recent(self, limit=PREWARM_RECENT_PROJECTS):
+        """Startup hook: warms the most recently active projects on the background pool."""
+        if limit > 0:
+            submit(self.warm_recent, limit)
+
+    def schedule_recent_per_worker(self):
+        """
+        Server startup hook. Chroma clients and the background pool don't survive
+        fork(), so the warm-up runs in each worker: right after uWSGI forks it,
+        or, under other servers, on the worker's first request.
+        """
+        try:
+            import uwsgi
+        except ImportError:
+            request_started.connect(self._schedule_recent_once, weak=False, dispatch_uid="warmup_recent")
+            return
+        if uwsgi.worker_id() == 0:
+            # Loaded in the master (no lazy-apps): wait for the fork
+            from uwsgidecorators import postfork
+            postfork(self.schedule_recent)
+        else:
+            self.schedule_recent()
+
+    def _schedule_recent_once(self, **kwargs):
+        # Only the thread that removes the receiver schedules
+        if request_started.disconnect(dispatch_uid="warmup_recent"):
+            self.schedule_recent()
+
+    def warm_recent(self, limit):
+        from api.models import Project
+
+        project_ids = Project.objects.annotate(
+            last_active=Coalesce(Max('messages__created_at'), 'updated_at')
+        ).order_by('-last_active').values_list('id', flat=True)[:limit]
+        for project_id in project_ids:
+            self.warm(str(project_id))
@@ -0,0 +1,58 @@
+from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from api.authentication import invalidate_token, invalidate_user
+from api.models import CustomUser, Project, Document, DocumentPage, Message, Quiz, Question
+from api.services.conversation_service import ConversationService
+from api.services.suggestion_service import SuggestionService
+
+@receiver(post_save, sender=Message)
+def refresh_on_assistant_message(sender, instance, created, **kwargs):
+    if created and instance.role == 'assistant':
+        SuggestionService().schedule_refresh(instance.project_id)
+        ConversationService().schedule_summary_update(instance.project_id)
+
+def is_cascade(instance, origin):
+    """True for rows removed by deleting their parent, which bumps the version itself."""
+    return isinstance(origin, models.Model) and origin is not instance
+
+def bump_project_version(project_id):
+    Project.objects.filter(id=project_id).update(version=F('version') + 1)
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, **kwargs):
+    bump_project_version(instance.id)
+
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Quiz)
+def project_content_changed(sender, instance, origin=None, **kwargs):
+    if is_cascade(instance, origin):
+        return
+    bump_project_version(instance.project_id)
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, origin=None, **kwargs):
+    if is_cascade(instance, origin):
+        return
+    Project.objects.filter(quizzes__id=instance.quiz_id).update(version=F('version') + 1)
+
+@receiver(post_save, sender=DocumentPage)
+def page_saved(sender, instance, **kwargs):
+    Document.objects.filter(id=instance.document_id).update(version=F('version') + 1)
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    # Cached auth carries the user object, so drop it on any change (deactivation included)
+    invalidate_user(instance.pk)
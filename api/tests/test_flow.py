@@ -3,6 +3,7 @@ from rest_framework import status
 from unittest.mock import patch
 from django.core.files.uploadedfile import SimpleUploadedFile
 from ..models import CustomUser, Project, Document, Message, Quiz
+from ..services.quiz_service import QuizService
 
 class UserJourneyFlowTests(APITestCase):
     def test_full_rag_flow(self):
@@ -41,12 +42,19 @@ class UserJourneyFlowTests(APITestCase):
             self.assertEqual(res_msg.status_code, status.HTTP_201_CREATED)
             self.assertEqual(res_msg.data['content'], 'Flow Answer')
 
-        # 5. Generate Quiz
+        # 5. Generate Quiz (queued as a background job)
         url_quiz = f'/api/projects/{project_id}/quizzes'
+        res_quiz = self.client.post(url_quiz, {'num_questions': 3})
+        self.assertEqual(res_quiz.status_code, status.HTTP_202_ACCEPTED)
+        job_id = res_quiz.data['id']
+
         with patch('api.services.quiz_service.QuizService.generate_quiz') as mock_quiz_gen:
             # Mock return a helper Quiz obj
             mock_quiz_obj = Quiz.objects.create(project_id=project_id, title="Flow Quiz")
             mock_quiz_gen.return_value = mock_quiz_obj
-            
-            res_quiz = self.client.post(url_quiz, {'num_questions': 3})
-            self.assertEqual(res_quiz.status_code, status.HTTP_201_CREATED)
+            QuizService().run_job(job_id)
+
+        # 6. Poll job status
+        res_job = self.client.get(f'/api/projects/{project_id}/quiz-jobs/{job_id}')
+        self.assertEqual(res_job.data['status'], 'completed')
+        self.assertEqual(res_job.data['quiz']['id'], str(mock_quiz_obj.id))
@@ -1,7 +1,54 @@
 from django.test import TestCase
 from unittest.mock import patch, MagicMock
-from ..services.document_service import DocumentService
-from ..models import CustomUser, Project, Document, DocumentPage
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+import openai
+from langchain_core.documents import Document as LCDocument
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from ..services import instrumentation
+from ..services.chroma_service import ChromaService
+from ..services.deletion_service import DeletionService
+from ..services.document_service import DocumentService, DocumentDeleted
+from ..services.chunk_selector import RepresentativeChunkSelector
+from ..services.context_builder import ContextBuilder
+from ..services.keyword_index import BM25Index, KeywordIndexService, tokenize, reciprocal_rank_fusion
+from ..services.rag_service import RAGService
+from ..services.quiz_service import QuizService, BANK_TARGET_SIZE
+from ..services.conversation_service import ConversationService, HISTORY_WINDOW
+from ..services.suggestion_service import SuggestionService, NO_DOCUMENT_SUGGESTIONS, PENDING_SUGGESTIONS
+from ..services.llm_limiter import LLMRateLimiter, Priority
+from ..services.llm_router import LLMRouter, stage_config
+from ..services.warmup_service import WarmupService
+from ..services.vector_store import ChromaVectorStore, FlatVectorStore, encode, matches
+from ..services.file_lock import flocked, unlink_held
+from ..models import CustomUser, Project, Document, DocumentPage, Message, SuggestedQuestionSet, ConversationSummary, BankQuestion
+
+
+class ScratchIndexesMixin:
+    """Writes the keyword index and flat vector store files into a scratch directory, not the repo root."""
+
+    def setUp(self):
+        super().setUp()
+        KeywordIndexService()
+        self.index_dir = tempfile.mkdtemp()
+        self.index_patches = [
+            patch.object(KeywordIndexService, '_index_dir', os.path.join(self.index_dir, 'keyword_index')),
+            patch.object(ChromaService().backend('flat'), 'root', os.path.join(self.index_dir, 'vector_index')),
+        ]
+        for index_patch in self.index_patches:
+            index_patch.start()
+
+    def tearDown(self):
+        for index_patch in reversed(self.index_patches):
+            index_patch.stop()
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+        super().tearDown()
 
 class ServiceTests(TestCase):
     def setUp(self):
@@ -13,11 +60,11 @@ class ServiceTests(TestCase):
 
     @patch('api.services.document_service.PyPDFLoader')
     @patch('api.services.document_service.RecursiveCharacterTextSplitter')
-    @patch('api.services.chroma_service.chromadb.PersistentClient')
+    @patch('api.services.vector_store.chromadb.PersistentClient')
     @patch('api.services.chroma_service.OpenAIEmbeddings')
-    @patch('api.services.document_service.ChatOpenAI')
+    @patch('api.services.llm_router.ChatOpenAI')
     @patch('api.services.document_service.ChatPromptTemplate')
-    @patch('api.services.document_service.StrOutputParser')
+    @patch('api.services.llm_router.StrOutputParser')
     def test_process_and_index_pdf_success(self, mock_parser, mock_prompt, mock_chat, mock_embeddings, mock_chroma, mock_splitter, mock_loader):
         # 1. Setup Mock Behavior
         # Loader
@@ -40,3 +87,815 @@ class ServiceTests(TestCase):
         self.assertEqual(self.document.status, 'failed')
         self.assertIn("Load Error", self.document.processing_message)
 
+
+class KeywordIndexTests(TestCase):
+    def test_tokenize_adds_hangul_bigrams(self):
+        tokens = tokenize("행렬은 CSE3010")
+        self.assertIn("cse3010", tokens)
+        self.assertIn("행렬", tokens)
+
+    def test_bm25_search_and_remove(self):
+        index = BM25Index()
+        index.add("c1", "Gradient descent minimizes the loss", {"document_id": "d1"})
+        index.add("c2", "CSE3010 covers operating systems", {"document_id": "d2"})
+        index.add("c3", "행렬의 고유값 분해", {"document_id": "d2"})
+
+        self.assertEqual(index.search("CSE3010")[0].id, "c2")
+        self.assertEqual(index.search("고유값")[0].id, "c3")
+
+        self.assertEqual(index.search("CSE3010", document_ids=["d1"]), [])
+        self.assertEqual(index.remove_document("d2"), 2)
+        self.assertEqual(index.search("CSE3010"), [])
+        self.assertEqual(len(index), 1)
+
+    def test_reciprocal_rank_fusion(self):
+        a = LCDocument(id="a", page_content="a")
+        b = LCDocument(id="b", page_content="b")
+        c = LCDocument(id="c", page_content="c")
+        fused = reciprocal_rank_fusion([[a, b], [b, c]])
+        self.assertEqual([d.id for d in fused], ["b", "a", "c"])
+
+    def test_keyword_only_query_skips_embedding(self):
+        service = RAGService.__new__(RAGService)
+        service.chroma_service = MagicMock()
+        service.keyword_index = MagicMock()
+        service.keyword_index.search.return_value = [LCDocument(id="c2", page_content="CSE3010")]
+
+        docs = service._retrieve("p1", "CSE3010", k=10)
+
+        self.assertEqual([d.id for d in docs], ["c2"])
+        service.chroma_service.similarity_search.assert_not_called()
+
+    def test_index_follows_writes_from_other_workers(self):
+        service = KeywordIndexService()
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(KeywordIndexService, '_index_dir', tmp_dir):
+            service.add_chunks("p1", ["c1"], ["Gradient descent"], [{"document_id": "d1"}])
+            self.assertEqual(len(service.get_index("p1")), 1)
+
+            # Another worker saves its own copy with an extra chunk
+            other = BM25Index.from_dict(json.load(open(service._index_path("p1"), encoding="utf-8")))
+            other.add("c2", "CSE3010 operating systems", {"document_id": "d2"})
+            with open(service._index_path("p1"), "w", encoding="utf-8") as f:
+                json.dump(other.to_dict(), f)
+
+            self.assertEqual(service.search("p1", "CSE3010")[0].id, "c2")
+            service.add_chunks("p1", ["c3"], ["행렬의 고유값"], [{"document_id": "d3"}])
+            saved = json.load(open(service._index_path("p1"), encoding="utf-8"))
+            self.assertEqual(sorted(saved["chunks"]), ["c1", "c2", "c3"])
+
+            service.delete_index("p1")
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+    def test_waiter_on_an_unlinked_lock_file_relocks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'project.lock')
+            waiting, locked = threading.Event(), []
+
+            def waiter():
+                waiting.set()
+                with flocked(path):
+                    locked.append(os.path.exists(path))
+
+            with flocked(path):
+                thread = threading.Thread(target=waiter)
+                thread.start()
+                waiting.wait(5)
+                time.sleep(0.1)
+                unlink_held(path)
+            thread.join(5)
+            self.assertEqual(locked, [True])
+
+class ContextBuilderTests(TestCase):
+    def _chunk(self, index, text, page=0, document_id="d1"):
+        return LCDocument(
+            id=f"doc_{document_id}_chunk_{index}",
+            page_content=text,
+            metadata={"document_id": document_id, "source_page": page, "chunk_index": index, "name": "a.pdf"}
+        )
+
+    def test_merges_overlapping_chunks_from_same_page(self):
+        first = self._chunk(0, "Alpha beta gamma delta. The overlap sentence is repeated here.")
+        second = self._chunk(1, "The overlap sentence is repeated here. Epsilon zeta.")
+
+        context, sources, stats = ContextBuilder(token_budget=1000).build([second, first])
+
+        self.assertEqual(len(sources), 1)
+        self.assertEqual(context.count("The overlap sentence is repeated here."), 1)
+        self.assertIn("Epsilon zeta.", context)
+        self.assertGreater(stats['tokens_saved'], 0)
+
+    def test_drops_near_duplicates_across_documents(self):
+        text = "Dynamic programming solves problems by combining solutions to overlapping subproblems " * 3
+        docs = [self._chunk(0, text, document_id="d1"), self._chunk(0, text, document_id="d2")]
+
+        _, sources, _ = ContextBuilder(token_budget=1000).build(docs)
+
+        self.assertEqual([s['document_id'] for s in sources], ["d1"])
+
+    def test_respects_token_budget(self):
+        docs = [self._chunk(i, f"Unique chunk number {i} " + "word " * 200, page=i) for i in range(5)]
+
+        _, _, stats = ContextBuilder(token_budget=300).build(docs)
+
+        self.assertLessEqual(stats['context_tokens'], 300)
+        self.assertLess(stats['blocks'], 5)
+
+class SuggestionServiceTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='test', email='t@t.com')
+        self.project = Project.objects.create(owner=self.user, title='Test Proj')
+
+    @patch('api.services.rag_service.RAGService')
+    def test_refresh_without_documents_skips_llm(self, mock_rag):
+        SuggestionService().refresh(str(self.project.id))
+        suggestion_set = SuggestedQuestionSet.objects.get(project=self.project)
+        self.assertFalse(suggestion_set.is_stale)
+        self.assertEqual(suggestion_set.questions, NO_DOCUMENT_SUGGESTIONS)
+        mock_rag.assert_not_called()
+
+    @patch('api.services.rag_service.RAGService')
+    def test_refresh_regenerates_stale_set(self, mock_rag):
+        Document.objects.create(project=self.project, name='a.pdf', file='a.pdf', status='processed')
+        mock_rag.return_value.generate_suggested_questions.return_value = ['A', 'B', 'C']
+        service = SuggestionService()
+        service.mark_stale(self.project.id)
+
+        service.refresh(str(self.project.id))
+        service.refresh(str(self.project.id))
+
+        suggestion_set = SuggestedQuestionSet.objects.get(project=self.project)
+        self.assertEqual(suggestion_set.questions, ['A', 'B', 'C'])
+        self.assertFalse(suggestion_set.is_stale)
+        mock_rag.return_value.generate_suggested_questions.assert_called_once()
+
+    @patch('api.services.rag_service.RAGService')
+    def test_failed_generation_leaves_set_stale(self, mock_rag):
+        Document.objects.create(project=self.project, name='a.pdf', file='a.pdf', status='processed')
+        mock_rag.return_value.generate_suggested_questions.return_value = None
+        service = SuggestionService()
+        service.mark_stale(self.project.id)
+
+        with self.assertLogs('api.services.suggestion_service', 'WARNING'):
+            service.refresh(str(self.project.id))
+
+        suggestion_set = SuggestedQuestionSet.objects.get(project=self.project)
+        self.assertTrue(suggestion_set.is_stale)
+        self.assertEqual(service.get_suggestions(self.project), PENDING_SUGGESTIONS)
+
+class ConversationServiceTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='test', email='t@t.com')
+        self.project = Project.objects.create(owner=self.user, title='Test Proj')
+        for i in range(12):
+            Message.objects.create(project=self.project, role='user' if i % 2 == 0 else 'assistant', content=f'message {i}')
+
+    def test_history_window_is_bounded(self):
+        history = ConversationService().get_history(self.project)
+        self.assertEqual(len(history['messages']), HISTORY_WINDOW)
+        self.assertEqual(history['messages'][-1]['content'], 'message 11')
+
+    @patch('api.services.rag_service.RAGService')
+    def test_update_summary_folds_aged_out_messages(self, mock_rag):
+        mock_rag.return_value.summarize_conversation.return_value = 'rolling summary'
+
+        ConversationService().update_summary(str(self.project.id))
+
+        summary = ConversationSummary.objects.get(project=self.project)
+        self.assertEqual(summary.summary, 'rolling summary')
+        folded = mock_rag.return_value.summarize_conversation.call_args.args[1]
+        self.assertEqual([m['content'] for m in folded], [f'message {i}' for i in range(12 - HISTORY_WINDOW)])
+
+        # Nothing new has aged out, so a second update is a no-op
+        ConversationService().update_summary(str(self.project.id))
+        mock_rag.return_value.summarize_conversation.assert_called_once()
+
+    def test_follow_up_query_is_rewritten_for_retrieval(self):
+        service = RAGService.__new__(RAGService)
+        service._rewrite_query = MagicMock(return_value='standalone question')
+        service._retrieve = MagicMock(return_value=[])
+        service._format_docs = MagicMock(return_value=('', []))
+        service._generate_answer = MagicMock(return_value='answer')
+
+        service.get_answer('p1', 'explain the second one', history={'summary': '', 'messages': [{'role': 'user', 'content': 'list sorts'}]})
+
+        self.assertEqual(service._retrieve.call_args.args[1], 'standalone question')
+
+class QuestionBankTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='test', email='t@t.com')
+        self.project = Project.objects.create(owner=self.user, title='Test Proj')
+        BankQuestion.objects.bulk_create([
+            BankQuestion(project=self.project, question_text=f'Bank question about topic {i}', options=['A', 'B'], answer='A')
+            for i in range(6)
+        ])
+
+    @patch('api.services.llm_router.ChatOpenAI')
+    def test_quiz_sampled_from_bank_without_llm(self, mock_chat):
+        service = QuizService()
+        with patch.object(service, '_generate_questions_json') as mock_generate, \
+                self.captureOnCommitCallbacks() as callbacks:
+            quiz = service.generate_quiz(str(self.project.id), 5, 'MULTIPLE_CHOICE')
+
+        mock_generate.assert_not_called()
+        self.assertEqual(quiz.questions.count(), 5)
+        self.assertEqual(BankQuestion.objects.filter(times_used=1).count(), 5)
+        self.assertEqual(len(callbacks), 1)  # bank is below the low watermark
+
+    @patch('api.services.llm_router.ChatOpenAI')
+    def test_refill_bank_adds_missing_questions(self, mock_chat):
+        service = QuizService()
+        generated = [{'question_text': 'Bank question about topic 0', 'options': ['A', 'B'], 'answer': 'A'}] + [
+            {'question_text': f'Which statement about subject {name} is true?', 'options': ['A', 'B'], 'answer': 'B'}
+            for name in ('heaps', 'graphs', 'tries')
+        ]
+        with patch.object(service, '_generate_questions', return_value=generated) as mock_generate:
+            service.refill_bank(str(self.project.id), 'MULTIPLE_CHOICE')
+
+        self.assertEqual(mock_generate.call_args.args[1], BANK_TARGET_SIZE - 6)
+        self.assertEqual(BankQuestion.objects.filter(project=self.project).count(), 9)
+
+
+class ShardedQuizGenerationTests(TestCase):
+    @patch('api.services.llm_router.ChatOpenAI')
+    def test_large_request_is_sharded_and_deduplicated(self, mock_chat):
+        service = QuizService()
+        docs = [LCDocument(id=f'c{i}', page_content=f'chunk {i}') for i in range(24)]
+
+        def fake_generate(context, num, quiz_type, temperature=None, priority=None):
+            shard = context.split()[1]
+            questions = [
+                {'question_text': f'Shard {shard} question {i}', 'options': ['A', 'B'], 'answer': 'A'}
+                for i in range(num)
+            ]
+            # Every shard also repeats one shared question
+            questions[0] = {'question_text': 'What is a shared question?', 'options': ['A', 'B'], 'answer': 'A'}
+            return questions
+
+        with patch.object(service, '_retrieve_context_docs', return_value=docs), \
+                patch.object(service, '_generate_questions_json', side_effect=fake_generate) as mock_generate:
+            questions = service._generate_questions('p1', 12, 'MULTIPLE_CHOICE')
+
+        self.assertEqual(mock_generate.call_count, 3)
+        self.assertEqual([call.args[1] for call in mock_generate.call_args_list], [5, 5, 2])
+        texts = [q['question_text'] for q in questions]
+        self.assertEqual(texts.count('What is a shared question?'), 1)
+        self.assertEqual(len(texts), len(set(texts)))
+
+    @patch('api.services.llm_router.ChatOpenAI')
+    def test_failed_shard_is_retried_independently(self, mock_chat):
+        service = QuizService()
+        docs = [LCDocument(id='c1', page_content='chunk')]
+        valid = [{'question_text': f'Question {i}', 'options': [f'A{i}', 'B'], 'answer': f'A{i}'} for i in range(5)]
+
+        with patch.object(service, '_retrieve_context_docs', return_value=docs), \
+                patch.object(service, '_generate_questions_json', side_effect=[ValueError('bad json'), valid]):
+            questions = service._generate_questions('p1', 5, 'MULTIPLE_CHOICE')
+
+        self.assertEqual(len(questions), 5)
+
+    def test_validation_rejects_answer_outside_options(self):
+        service = QuizService.__new__(QuizService)
+        data = [
+            {'question_text': 'ok', 'options': ['A', 'B'], 'answer': 'A'},
+            {'question_text': 'bad', 'options': ['A', 'B'], 'answer': 'C'},
+        ]
+        self.assertEqual([q['question_text'] for q in service._validate_questions(data, 'MULTIPLE_CHOICE')], ['ok'])
+
+class RepresentativeChunkSelectorTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='test', email='t@t.com')
+        self.project = Project.objects.create(owner=self.user, title='Test Proj')
+        Document.objects.create(project=self.project, name='a.pdf', file='a.pdf', status='processed')
+
+        rng = np.random.default_rng(1)
+        centers = np.eye(3, 8, dtype=np.float32) * 10
+        embeddings = np.vstack([center + rng.normal(0, 0.1, size=(5, 8)) for center in centers])
+        ids = [f'topic{t}_chunk{i}' for t in range(3) for i in range(5)]
+        self.chroma = MagicMock()
+        self.chroma.get_embeddings.return_value = (ids, ids, [{} for _ in ids], embeddings)
+        RepresentativeChunkSelector._cache.clear()
+
+    @patch('api.services.chunk_selector.NUM_CLUSTERS', 3)
+    def test_selects_one_chunk_per_topic_and_caches_clusters(self):
+        selector = RepresentativeChunkSelector(self.chroma)
+
+        docs = selector.select(self.project.id, 3)
+        self.assertEqual(sorted(doc.id.split('_')[0] for doc in docs), ['topic0', 'topic1', 'topic2'])
+
+        selector.select(self.project.id, 6)
+        self.chroma.get_embeddings.assert_called_once()
+
+    @patch('api.services.chunk_selector.NUM_CLUSTERS', 3)
+    def test_new_document_invalidates_cached_clusters(self):
+        selector = RepresentativeChunkSelector(self.chroma)
+        selector.select(self.project.id, 3)
+        Document.objects.create(project=self.project, name='b.pdf', file='b.pdf', status='processed')
+        selector.select(self.project.id, 3)
+        self.assertEqual(self.chroma.get_embeddings.call_count, 2)
+
+
+class LLMRateLimiterTests(TestCase):
+    def test_waiting_callers_are_served_by_priority(self):
+        limiter = LLMRateLimiter('test', rpm=60, tpm=100000)
+        limiter.store.requests = 0  # next request slot opens in one second
+        order = []
+
+        def worker(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+
+        threads = []
+        for priority in (Priority.BACKGROUND, Priority.NORMAL, Priority.INTERACTIVE):
+            thread = threading.Thread(target=worker, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.05)
+
+        self.assertEqual(limiter.snapshot()['queue_depth'], {'interactive': 1, 'normal': 1, 'background': 1})
+        limiter.store.requests = 60
+        limiter.store.tokens = 100000
+        with limiter._cond:
+            limiter._cond.notify_all()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(order, [Priority.INTERACTIVE, Priority.NORMAL, Priority.BACKGROUND])
+
+    def test_background_leaves_reserved_capacity(self):
+        limiter = LLMRateLimiter('test', rpm=100, tpm=1000)
+        limiter.store.tokens = 200
+        self.assertGreater(limiter.store.try_consume(10, reserved_fraction=0.25), 0)
+        self.assertEqual(limiter.store.try_consume(10), 0)
+
+    def test_rate_limit_backs_off_and_retries(self):
+        limiter = LLMRateLimiter('test', rpm=1000, tpm=100000)
+        response = MagicMock(status_code=429, headers={'retry-after': '0'})
+        error = openai.RateLimitError('rate limited', response=response, body=None)
+        func = MagicMock(side_effect=[error, 'ok'])
+
+        with patch.object(limiter, 'on_rate_limited') as mock_backoff:
+            self.assertEqual(limiter.call(Priority.INTERACTIVE, func), 'ok')
+
+        mock_backoff.assert_called_once_with(0.0)
+        self.assertEqual(func.call_count, 2)
+
+    def test_backoff_doubles_up_to_limit(self):
+        limiter = LLMRateLimiter('test', rpm=1000, tpm=100000)
+        with self.assertLogs('api.services.llm_limiter', level='WARNING'):
+            for _ in range(8):
+                limiter.on_rate_limited()
+        self.assertEqual(limiter._backoff_seconds, 60.0)
+        self.assertGreater(limiter.snapshot()['backoff_seconds'], 0)
+
+
+class LLMRouterTests(TestCase):
+    def setUp(self):
+        self.prompt = ChatPromptTemplate.from_template("{text}")
+        self.models = {
+            'gpt-4o-mini': FakeListChatModel(responses=['not json']),
+            'gpt-4o': FakeListChatModel(responses=['["A", "B", "C"]']),
+        }
+        LLMRouter._metrics.clear()
+
+    def test_cascade_escalates_on_invalid_output(self):
+        router = LLMRouter()
+        with patch.object(router, 'llm', side_effect=lambda stage, model, temperature: self.models[model]):
+            result = router.run('suggestions', self.prompt, {'text': 'x'}, parse=json.loads)
+
+        self.assertEqual(result, ['A', 'B', 'C'])
+        metrics = router.metrics()['suggestions']
+        self.assertEqual(metrics['gpt-4o-mini']['escalations'], 1)
+        self.assertEqual(metrics['gpt-4o']['calls'], 1)
+
+    def test_stage_without_validation_uses_single_model(self):
+        router = LLMRouter()
+        with patch.object(router, 'llm', side_effect=lambda stage, model, temperature: self.models[model]), \
+                patch.dict('os.environ', {'LLM_FORMATTING_MODEL': 'gpt-4o'}):
+            result = router.run('formatting', self.prompt, {'text': 'x'})
+
+        self.assertEqual(result, '["A", "B", "C"]')
+        self.assertEqual(list(router.metrics()['formatting']), ['gpt-4o'])
+
+    def test_page_and_answer_stages_are_uncapped(self):
+        for stage in ('formatting', 'translation', 'answer'):
+            self.assertIsNone(stage_config(stage)['max_tokens'])
+        with patch.dict('os.environ', {'LLM_ANSWER_MAX_TOKENS': '800'}):
+            self.assertEqual(stage_config('answer')['max_tokens'], 800)
+
+
+class DeletionServiceTests(ScratchIndexesMixin, TestCase):
+    def setUp(self):
+        from django.core.files.base import ContentFile
+
+        super().setUp()
+        self.user = CustomUser.objects.create(username='test', email='t@t.com')
+        self.project = Project.objects.create(owner=self.user, title='Test Proj')
+        self.documents = []
+        for name in ('a.pdf', 'b.pdf'):
+            document = Document.objects.create(project=self.project, name=name)
+            document.file.save(name, ContentFile(b'%PDF'), save=True)
+            self.documents.append(document)
+        ChromaService().add_chunks(
+            str(self.project.id),
+            ids=['a0', 'a1', 'b0'],
+            embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+            documents=['a0', 'a1', 'b0'],
+            metadatas=[{'document_id': str(self.documents[i].id)} for i in (0, 0, 1)],
+        )
+
+    def tearDown(self):
+        ChromaService().delete_collection(str(self.project.id))
+        for document in Document.all_objects.filter(id__in=[d.id for d in self.documents]):
+            document.file.delete(save=False)
+        super().tearDown()
+
+    def test_document_tombstoned_then_swept(self):
+        doomed, kept = self.documents
+        with self.captureOnCommitCallbacks() as callbacks:
+            DeletionService().delete_document(doomed)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Document.objects.filter(id=doomed.id).exists())
+        self.assertEqual(list(self.project.documents.all()), [kept])
+        self.assertEqual(ChromaService().count(self.project.id), 3)
+
+        DeletionService().sweep()
+        self.assertFalse(Document.all_objects.filter(id=doomed.id).exists())
+        self.assertEqual(ChromaService().get_chunks(self.project.id)[0], ['b0'])
+        self.assertFalse(doomed.file.storage.exists(doomed.file.name))
+        self.assertTrue(kept.file.storage.exists(kept.file.name))
+
+    def test_processing_stops_for_tombstoned_document(self):
+        document = self.documents[0]
+        DeletionService().delete_document(document)
+        with self.assertRaises(DocumentDeleted):
+            DocumentService()._update_status(document, 'processing', 'page 2')
+        document.refresh_from_db(from_queryset=Document.all_objects.all())
+        self.assertIsNotNone(document.deleted_at)
+
+    def test_chunks_indexed_after_sweep_are_discarded(self):
+        document = self.documents[0]
+
+        def delete_during_embedding(embeddings, texts, **kwargs):
+            DeletionService().delete_document(document)
+            DeletionService().sweep()
+            return [[0.5, 0.5]] * len(texts)
+
+        service = DocumentService()
+        with patch('api.services.document_service.PyPDFLoader') as mock_loader, \
+                patch.object(service, '_process_pages'), \
+                patch('api.services.document_service.embed_documents', side_effect=delete_during_embedding):
+            mock_loader.return_value.load.return_value = [LCDocument(page_content='late chunk', metadata={'page': 0})]
+            self.assertFalse(service.process_document(document))
+
+        self.assertEqual(ChromaService().get_chunks(self.project.id)[0], ['b0'])
+        self.assertEqual(service.keyword_index.search(self.project.id, 'late chunk'), [])
+
+    def test_project_tombstoned_then_swept(self):
+        project_id = str(self.project.id)
+        DocumentPage.objects.create(document=self.documents[0], page_number=1, original_text='page')
+        Message.objects.create(project=self.project, role='user', content='hi')
+        # The tombstone and the version bump, however big the project is
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(2):
+            DeletionService().delete_project(self.project)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Project.objects.filter(id=project_id).exists())
+        self.assertFalse(self.user.projects.exists())
+        self.assertEqual(Document.all_objects.filter(project_id=project_id).count(), 2)
+        self.assertEqual(ChromaService().count(project_id), 3)
+
+        DeletionService().sweep()
+        self.assertFalse(Project.all_objects.filter(id=project_id).exists())
+        self.assertFalse(Document.all_objects.filter(project_id=project_id).exists())
+        self.assertFalse(DocumentPage.objects.filter(document__project_id=project_id).exists())
+        self.assertFalse(Message.objects.filter(project_id=project_id).exists())
+        self.assertFalse(ChromaService().delete_collection(project_id))
+        self.assertFalse(any(d.file.storage.exists(d.file.name) for d in self.documents))
+
+
+class FlatVectorStoreTests(ScratchIndexesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = FlatVectorStore(self.tmp_dir.name)
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(200, 16)).astype(np.float32)
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.ids = [f"c{i}" for i in range(200)]
+        self.store.add(
+            'p1', self.ids, self.vectors, [f"text {i}" for i in range(200)],
+            [{'document_id': f"d{i % 4}", 'chunk_index': i} for i in range(200)]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def test_query_matches_brute_force(self):
+        query = self.vectors[7] + 0.1
+        expected = [self.ids[i] for i in np.argsort(-(self.vectors @ query))[:5]]
+        ids, documents, metadatas = self.store.query('p1', query, k=5)
+        self.assertEqual(ids, expected)
+        self.assertEqual(documents[0], f"text {ids[0][1:]}")
+
+    def test_where_filter_and_delete(self):
+        ids, _, metadatas = self.store.query('p1', self.vectors[0], k=10, where={'document_id': {'$in': ['d1', 'd2']}})
+        self.assertEqual(len(ids), 10)
+        self.assertTrue(all(m['document_id'] in ('d1', 'd2') for m in metadatas))
+
+        self.store.delete('p1', {'document_id': 'd1'})
+        self.assertEqual(self.store.count('p1'), 150)
+        remaining, _, metadatas, embeddings = self.store.get('p1', include_embeddings=True)
+        self.assertNotIn('c1', remaining)
+        np.testing.assert_allclose(embeddings[0], self.vectors[0], atol=1e-6)
+
+    def test_upsert_replaces_rows_and_float16_storage(self):
+        store = FlatVectorStore(self.tmp_dir.name, dtype='float16')
+        store.add('p2', ['a', 'b'], [[1.0, 0.0], [0.0, 1.0]], ['a', 'b'], [{}, {}])
+        store.add('p2', ['a'], [[0.0, 2.0]], ['a2'], [{}])
+        self.assertEqual(store.count('p2'), 2)
+        ids, documents, _ = store.query('p2', [0.0, 1.0], k=2)
+        self.assertEqual(documents[0], 'a2' if ids[0] == 'a' else 'b')
+        self.assertEqual(store._load('p2').vectors.dtype, np.float16)
+        self.assertTrue(store.drop('p2'))
+        self.assertFalse(store.exists('p2'))
+
+    def test_move_and_drop_hold_the_project_lock(self):
+        import fcntl
+
+        self.store.add('p5', self.ids[:10], self.vectors[:10], ['t'] * 10, [{}] * 10)
+        lock_path = os.path.join(self.store._dir('p5'), '.lock')
+        target = FlatVectorStore(os.path.join(self.tmp_dir.name, 'target'))
+        held = []
+
+        def add(*args):
+            with open(lock_path) as other:
+                try:
+                    fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(other, fcntl.LOCK_UN)
+                    held.append(False)
+                except BlockingIOError:
+                    held.append(True)
+            FlatVectorStore.add(target, *args)
+
+        with patch.object(target, 'add', side_effect=add):
+            self.assertEqual(self.store.move_to('p5', target), 10)
+        self.assertEqual(held, [True])
+        self.assertEqual(target.count('p5'), 10)
+        self.assertFalse(self.store.exists('p5'))
+        self.assertEqual(os.listdir(self.store._dir('p5')), ['.lock'])
+
+        self.store.add('p5', self.ids[:2], self.vectors[:2], ['t'] * 2, [{}] * 2)
+        self.assertTrue(self.store.drop('p5'))
+        self.assertFalse(self.store.drop('p5'))
+        self.assertFalse(os.path.exists(self.store._dir('p5')))
+
+    def test_int8_truncated_search_rescored_with_full_precision(self):
+        store = FlatVectorStore(self.tmp_dir.name, dtype='int8', dimensions=8)
+        store.add('p3', self.ids, self.vectors, ['t'] * 200, [{}] * 200)
+        index = store._load('p3')
+        self.assertEqual(index.vectors.dtype, np.int8)
+        self.assertEqual(index.vectors.shape, (200, 8))
+        self.assertEqual(index.full.shape, (200, 16))
+
+        for i, query in enumerate(self.vectors[:20]):
+            ids = store.query('p3', query, k=5)[0]
+            self.assertEqual(ids[0], self.ids[i])
+            exact_scores = [self.vectors[self.ids.index(chunk_id)] @ query for chunk_id in ids]
+            self.assertEqual(exact_scores, sorted(exact_scores, reverse=True))
+
+    def test_compact_storage_without_rescoring(self):
+        store = FlatVectorStore(self.tmp_dir.name, dtype='int8', dimensions=8, rescore=False)
+        store.add('p4', self.ids[:100], self.vectors[:100], ['t'] * 100, [{}] * 100)
+        store.add('p4', self.ids[100:], self.vectors[100:], ['t'] * 100, [{}] * 100)
+        self.assertIsNone(store._load('p4').full)
+        self.assertFalse(store.keeps_full_width)
+        _, _, _, embeddings = store.get('p4', include_embeddings=True)
+        self.assertEqual(embeddings.shape, (200, 8))
+        self.assertEqual(store.query('p4', self.vectors[3], k=1)[0], ['c3'])
+
+    def test_int8_encoding_error_is_small(self):
+        quantized, scales = encode(self.vectors, np.int8)
+        decoded = quantized.astype(np.float32) * scales[:, None]
+        self.assertLess(np.abs(decoded - self.vectors).max(), 0.01)
+
+    def test_matches(self):
+        metadata = {'document_id': 'd1', 'source_page': 3}
+        self.assertTrue(matches(metadata, {'$and': [{'document_id': 'd1'}, {'source_page': {'$in': [2, 3]}}]}))
+        self.assertFalse(matches(metadata, {'document_id': {'$nin': ['d1']}}))
+
+    def test_large_projects_move_to_chroma(self):
+        service = ChromaService()
+        project_id = 'promotion-test'
+        with patch('api.services.chroma_service.FLAT_INDEX_MAX_CHUNKS', 150):
+            service.add_chunks(project_id, self.ids[:100], self.vectors[:100].tolist(),
+                               ['t'] * 100, [{'document_id': 'd'}] * 100)
+            self.assertEqual(service.store_for(project_id).name, 'flat')
+            service.add_chunks(project_id, self.ids[100:], self.vectors[100:].tolist(),
+                               ['t'] * 100, [{'document_id': 'd'}] * 100)
+        self.assertEqual(service.store_for(project_id).name, 'chroma')
+        self.assertEqual(service.count(project_id), 200)
+        self.assertTrue(service.delete_collection(project_id))
+
+
+    def test_add_waiting_on_a_promotion_goes_to_chroma(self):
+        chroma = ChromaVectorStore(os.path.join(self.tmp_dir.name, 'chroma'))
+
+        def worker():
+            # Each worker process has its own flat store (and lock) over the same files
+            service = object.__new__(ChromaService)
+            service._stores = {'flat': FlatVectorStore(os.path.join(self.tmp_dir.name, 'flat')), 'chroma': chroma}
+            service._lock = threading.Lock()
+            return service
+
+        promoting, stale = worker(), worker()
+        project_id = 'interleaved'
+        copying, release = threading.Event(), threading.Event()
+        real_add = chroma.add
+
+        def slow_add(*args):
+            if not copying.is_set():
+                copying.set()
+                release.wait(5)
+            real_add(*args)
+
+        with patch('api.services.chroma_service.FLAT_INDEX_MAX_CHUNKS', 150), \
+                patch.object(chroma, 'add', side_effect=slow_add):
+            promoting.add_chunks(project_id, self.ids[:100], self.vectors[:100].tolist(),
+                                 ['t'] * 100, [{'document_id': 'd'}] * 100)
+            promotion = threading.Thread(target=promoting.add_chunks, args=(
+                project_id, self.ids[100:199], self.vectors[100:199].tolist(),
+                ['t'] * 99, [{'document_id': 'd'}] * 99,
+            ))
+            promotion.start()
+            self.assertTrue(copying.wait(5))
+            late = threading.Thread(target=stale.add_chunks, args=(
+                project_id, self.ids[199:], self.vectors[199:].tolist(), ['t'], [{'document_id': 'd'}],
+            ))
+            late.start()
+            time.sleep(0.2)
+            release.set()
+            promotion.join(5)
+            late.join(5)
+
+        self.assertFalse(stale.backend('flat').exists(project_id))
+        self.assertEqual(stale.store_for(project_id).name, 'chroma')
+        self.assertEqual(chroma.count(project_id), 200)
+        chroma.drop(project_id)
+
+class ChromaLayoutTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.vectors = {'p1': [[1.0, 0.0], [0.9, 0.1]], 'p2': [[1.0, 0.05], [0.0, 1.0]]}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _fill(self, store):
+        for project_id, vectors in self.vectors.items():
+            store.add(project_id, [f"{project_id}_a", f"{project_id}_b"], vectors, ['a', 'b'],
+                      [{'document_id': f"{project_id}_d"}] * 2)
+
+    def test_shared_layout_isolates_projects(self):
+        store = ChromaVectorStore(self.tmp_dir.name, layout='shared', shards=3)
+        self._fill(store)
+        self.assertEqual(store.count('p1'), 2)
+        ids, _, metadatas = store.query('p1', [1.0, 0.0], k=5)
+        self.assertEqual(ids, ['p1_a', 'p1_b'])
+        self.assertEqual(metadatas[0]['project_id'], 'p1')
+        self.assertEqual(store.query('p2', [1.0, 0.0], k=1, where={'document_id': 'p2_d'})[0], ['p2_a'])
+
+        self.assertTrue(store.drop('p1'))
+        self.assertFalse(store.exists('p1'))
+        self.assertEqual(store.count('p2'), 2)
+
+    def test_shared_layout_search_never_counts_the_project(self):
+        store = ChromaVectorStore(self.tmp_dir.name, layout='shared')
+        self._fill(store)
+        service = ChromaService()
+        with patch.object(service, 'store_for', return_value=store), \
+                patch.object(store, 'count', side_effect=AssertionError('count pulls every id')), \
+                patch('api.services.chroma_service.embed_query', return_value=[1.0, 0.0]) as embed:
+            results = service.similarity_search('p1', 'question', k=1)
+            self.assertEqual([doc.id for doc in results], ['p1_a'])
+            self.assertEqual(service.similarity_search('p3', 'question'), [])
+        embed.assert_called_once()
+
+    def test_migration_moves_per_project_collections(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        per_project = ChromaVectorStore(self.tmp_dir.name)
+        self._fill(per_project)
+        configured = ChromaVectorStore(self.tmp_dir.name, shards=2)
+        with patch.object(ChromaService, 'backend', return_value=configured):
+            call_command('migrate_chroma_layout', stdout=StringIO())
+
+        shared = ChromaVectorStore(self.tmp_dir.name, layout='shared', shards=2)
+        self.assertFalse(per_project.exists('p1'))
+        self.assertEqual(shared.count('p1'), 2)
+        self.assertEqual(shared.get('p2')[0], ['p2_a', 'p2_b'])
+
+
+class WarmupServiceTests(ScratchIndexesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(username='test', email='t@t.com')
+        self.project = Project.objects.create(owner=self.user, title='Test Proj')
+        WarmupService._recent.clear()
+
+    def tearDown(self):
+        WarmupService._recent.clear()
+        super().tearDown()
+
+    def test_schedule_skips_recently_warmed_projects(self):
+        project_id = str(self.project.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(WarmupService().schedule(project_id))
+        self.assertEqual(len(callbacks), 1)
+
+        WarmupService._recent[project_id] = True
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertFalse(WarmupService().schedule(project_id))
+            self.assertTrue(WarmupService().schedule(project_id, force=True))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_warm_loads_vectors_and_keyword_index(self):
+        project_id = str(self.project.id)
+        service = ChromaService()
+        service.add_chunks(project_id, ['c0'], [[1.0, 0.0]], ['text'], [{'document_id': 'd'}])
+        store = service.store_for(project_id)
+        with patch.object(type(store), 'warm') as mock_warm, \
+                patch.object(LLMRouter, 'llm') as mock_llm, \
+                patch('api.services.warmup_service.SuggestionService.schedule_refresh') as mock_refresh:
+            WarmupService().warm(project_id)
+        mock_warm.assert_called_once_with(project_id)
+        self.assertEqual([c.args for c in mock_llm.call_args_list], [('rewrite',), ('answer',)])
+        mock_refresh.assert_called_once_with(project_id, mark_stale=False)
+        self.assertIn(project_id, WarmupService._recent)
+        service.delete_collection(project_id)
+
+    def test_startup_warmup_waits_for_the_first_request(self):
+        from django.core.signals import request_started
+
+        with patch.object(WarmupService, 'schedule_recent') as mock_schedule:
+            WarmupService().schedule_recent_per_worker()
+            mock_schedule.assert_not_called()
+            request_started.send(sender=None)
+            request_started.send(sender=None)
+        mock_schedule.assert_called_once_with()
+
+    def test_warm_recent_orders_by_activity(self):
+        # Created later, but the older project has the newer message
+        Project.objects.create(owner=self.user, title='Quiet')
+        Message.objects.create(project=self.project, role='user', content='hi')
+        with patch.object(WarmupService, 'warm') as mock_warm:
+            WarmupService().warm_recent(1)
+        mock_warm.assert_called_once_with(str(self.project.id))
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.reset()
+
+    def test_breakdown_logs_stage_totals_and_exports_histograms(self):
+        with self.assertLogs('api.services.instrumentation', 'INFO') as logs:
+            with instrumentation.breakdown('document', 'd1'):
+                for _ in range(2):
+                    with instrumentation.timed('format'):
+                        pass
+                with instrumentation.breakdown('message', 'nested joins the outer breakdown'):
+                    with instrumentation.timed('embed'):
+                        pass
+                instrumentation.record_tokens('formatting', 'gpt-4o-mini', 10, 5)
+
+        [line] = logs.output
+        self.assertIn('document d1 took', line)
+        self.assertIn('format 0ms x2', line)
+        self.assertIn('embed', line)
+        self.assertIn('15 LLM tokens', line)
+
+        text = instrumentation.render_prometheus([('background_queue_depth', {}, 3)])
+        self.assertIn('# TYPE stage_duration_seconds histogram', text)
+        self.assertIn('stage_duration_seconds_bucket{stage="format",le="+Inf"} 2', text)
+        self.assertIn('stage_duration_seconds_count{stage="format"} 2', text)
+        self.assertIn('operation_duration_seconds_count{operation="document"} 1', text)
+        self.assertIn('llm_tokens_total{direction="input",model="gpt-4o-mini",stage="formatting"} 10', text)
+        self.assertIn('background_queue_depth 3', text)
+
+    def test_stage_errors_are_counted_and_reraised(self):
+        with self.assertRaises(ValueError), instrumentation.timed('pdf_load'):
+            raise ValueError('broken pdf')
+        text = instrumentation.render_prometheus()
+        self.assertIn('stage_errors_total{stage="pdf_load"} 1', text)
+        self.assertIn('stage_duration_seconds_count{stage="pdf_load"} 1', text)
+
+    def test_failed_answer_is_logged_and_counted(self):
+        service = RAGService.__new__(RAGService)
+        service._retrieve = MagicMock(side_effect=RuntimeError('chroma unavailable'))
+
+        with self.assertLogs('api.services.rag_service', 'ERROR') as logs:
+            response = service.get_answer('p1', 'what is an eigenvalue?')
+
+        self.assertEqual(response['sources'], [])
+        self.assertIn('RuntimeError: chroma unavailable', logs.output[0])
+        self.assertIn('rag_errors_total{reason="error"} 1', instrumentation.render_prometheus())
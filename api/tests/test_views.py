@@ -3,7 +3,9 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.core.files.uploadedfile import SimpleUploadedFile
 from unittest.mock import patch
-from ..models import CustomUser, Project, Document, Message
+from django.db import connection
+from django.utils import timezone
+from ..models import CustomUser, Project, Document, DocumentPage, Message, SuggestedQuestionSet, QuizJob
 
 class ViewTests(APITestCase):
     def setUp(self):
@@ -29,6 +31,16 @@ class ViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_project_open_schedules_warmup(self):
+        with patch('api.views.project.WarmupService.schedule') as mock_schedule:
+            response = self.client.get(f'/api/projects/{self.project.id}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            mock_schedule.assert_called_once_with(self.project.id)
+
+            response = self.client.post(f'/api/projects/{self.project.id}/warmup')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            mock_schedule.assert_called_with(self.project.id, force=True)
+
     @patch('api.services.document_service.DocumentService.process_document_by_id')
     def test_upload_document(self, mock_process):
         url = f'/api/projects/{self.project.id}/documents'
@@ -52,3 +64,243 @@ class ViewTests(APITestCase):
         response = self.client.post(url, {'content': 'Hi'})
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Message.objects.count(), 2) # User + AI
+
+    @patch('api.services.rag_service.RAGService.generate_suggested_questions')
+    def test_suggested_questions_served_from_cache(self, mock_generate):
+        SuggestedQuestionSet.objects.create(
+            project=self.project, questions=['Q1', 'Q2', 'Q3'], version=1, generated_version=1
+        )
+        url = f'/api/projects/{self.project.id}/suggested-questions'
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, ['Q1', 'Q2', 'Q3'])
+        self.assertEqual(len(callbacks), 0)
+        mock_generate.assert_not_called()
+
+    @patch('api.services.rag_service.RAGService.get_answer')
+    def test_assistant_message_marks_suggestions_stale(self, mock_rag):
+        mock_rag.return_value = {'answer': 'AI Ans', 'sources': []}
+        SuggestedQuestionSet.objects.create(project=self.project, questions=['Q1'], version=1, generated_version=1)
+        url = f'/api/projects/{self.project.id}/messages'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(url, {'content': 'Hi'})
+        self.assertTrue(SuggestedQuestionSet.objects.get(project=self.project).is_stale)
+        self.assertEqual(len(callbacks), 2)  # suggestion refresh + conversation summary
+
+    @patch('api.services.rag_service.RAGService.get_answer')
+    def test_chat_message_scoped_to_documents(self, mock_rag):
+        mock_rag.return_value = {'answer': 'AI Ans', 'sources': []}
+        doc = Document.objects.create(project=self.project, name='a.pdf', file='a.pdf')
+        url = f'/api/projects/{self.project.id}/messages'
+        response = self.client.post(url, {'content': 'Hi', 'document_ids': [str(doc.id)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(mock_rag.call_args.kwargs['document_ids'], [str(doc.id)])
+
+    def test_chat_message_rejects_foreign_document(self):
+        other_project = Project.objects.create(owner=self.user, title="Other")
+        doc = Document.objects.create(project=other_project, name='b.pdf', file='b.pdf')
+        url = f'/api/projects/{self.project.id}/messages'
+        response = self.client.post(url, {'content': 'Hi', 'document_ids': [str(doc.id)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Message.objects.count(), 0)
+
+    def test_create_quiz_returns_job(self):
+        url = f'/api/projects/{self.project.id}/quizzes'
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(url, {'num_questions': 3, 'quiz_type': 'FLASHCARD'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertTrue(QuizJob.objects.filter(id=response.data['id'], project=self.project).exists())
+        self.assertTrue(len(callbacks) >= 1)
+
+    def test_create_quiz_rejects_invalid_count(self):
+        url = f'/api/projects/{self.project.id}/quizzes'
+        response = self.client.post(url, {'num_questions': -1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class PaginationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='test', email='test@e.com', password='pw')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(owner=self.user, title="Test Proj")
+
+    def test_messages_follow_cursor(self):
+        Message.objects.bulk_create([
+            Message(project=self.project, role='user', content=f'm{i}') for i in range(5)
+        ])
+        response = self.client.get(f'/api/projects/{self.project.id}/messages?page_size=3')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    def test_messages_newest_first_for_chat(self):
+        for i in range(5):
+            Message.objects.create(project=self.project, role='user', content=f'm{i}')
+        response = self.client.get(f'/api/projects/{self.project.id}/messages?order=newest&page_size=2')
+        self.assertEqual([m['content'] for m in response.data['results']], ['m4', 'm3'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([m['content'] for m in response.data['results']], ['m2', 'm1'])
+
+    def test_document_pages_ordered_by_page_number(self):
+        document = Document.objects.create(project=self.project, name='a.pdf', file='a.pdf')
+        DocumentPage.objects.bulk_create([
+            DocumentPage(document=document, page_number=n, original_text='text') for n in (3, 1, 2)
+        ])
+        response = self.client.get(f'/api/projects/{self.project.id}/documents/{document.id}/pages?fields=page_number')
+        self.assertEqual(response.data['results'], [{'page_number': 1}, {'page_number': 2}, {'page_number': 3}])
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='test', email='test@e.com', password='pw')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(owner=self.user, title="Test Proj")
+        Message.objects.bulk_create([
+            Message(project=self.project, role='user', content='긴 메시지 ' * 50) for _ in range(10)
+        ])
+        self.url = f'/api/projects/{self.project.id}/messages'
+
+    def test_zstd_preferred_and_gzip_fallback(self):
+        import gzip
+        import json
+        import zstandard
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, zstd')
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        body = json.loads(zstandard.ZstdDecompressor().decompress(response.content))
+        self.assertEqual(len(body['results']), 10)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 10)
+
+    def test_uncompressed_without_accept_encoding(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_weak_etag_from_compressed_response_still_matches(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_json_body_parsed(self):
+        response = self.client.post('/api/projects', {'title': 'JSON P'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/api/projects', '{"title": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PageSearchTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='test', email='test@e.com', password='pw')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(owner=self.user, title="Search Proj")
+        self.document = Document.objects.create(project=self.project, name='linear.pdf', file='linear.pdf')
+        DocumentPage.objects.create(
+            document=self.document, page_number=3,
+            original_text="Eigenvalues of <b>symmetric</b> matrices are real.",
+            translated_text="대칭 행렬의 고유값은 실수이다."
+        )
+        DocumentPage.objects.create(
+            document=self.document, page_number=4, original_text="Gradient descent", translated_text="경사 하강법"
+        )
+        self.url = f'/api/projects/{self.project.id}/search'
+
+    def test_prefix_search_with_escaped_highlights(self):
+        with patch('api.services.rag_service.RAGService.get_answer') as mock_rag, self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': '행렬 symmetric'})
+        mock_rag.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [result] = response.data['results']
+        self.assertEqual(result['page_number'], 3)
+        self.assertEqual(result['document_id'], str(self.document.id))
+        self.assertIn('<mark>행렬의</mark>', result['translated_snippet'])
+        self.assertIn('&lt;b&gt;<mark>symmetric</mark>&lt;/b&gt;', result['original_snippet'])
+
+    def test_index_follows_page_writes(self):
+        page = DocumentPage.objects.get(page_number=4)
+        page.translated_text = "확률적 경사 하강법"
+        page.save()
+        self.assertEqual(len(self.client.get(self.url, {'q': '확률적'}).data['results']), 1)
+
+        page.delete()
+        self.assertEqual(self.client.get(self.url, {'q': 'gradient'}).data['results'], [])
+
+    def test_index_keeps_one_row_per_page(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 is SQLite-only')
+
+        def fts_rows():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM api_documentpage_fts")
+                return cursor.fetchone()[0]
+
+        self.assertEqual(fts_rows(), 2)
+        page = DocumentPage.objects.get(page_number=4)
+        page.original_text = "Stochastic gradient descent"
+        page.save()
+        self.assertEqual(fts_rows(), 2)
+        page.delete()
+        self.assertEqual(fts_rows(), 1)
+
+    def test_index_survives_renumbered_rowids(self):
+        # VACUUM may renumber api_documentpage's implicit rowids
+        if connection.vendor != 'sqlite':
+            self.skipTest('rowids are SQLite-only')
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE api_documentpage SET rowid = rowid + 1000")
+        [result] = self.client.get(self.url, {'q': 'gradient'}).data['results']
+        self.assertEqual(result['page_number'], 4)
+
+    def test_scoped_to_project_and_live_documents(self):
+        other = Project.objects.create(owner=self.user, title="Other")
+        other_document = Document.objects.create(project=other, name='o.pdf', file='o.pdf')
+        DocumentPage.objects.create(document=other_document, page_number=1, original_text="Gradient boosting")
+
+        results = self.client.get(self.url, {'q': 'gradient'}).data['results']
+        self.assertEqual([r['page_number'] for r in results], [4])
+        filtered = self.client.get(self.url, {'q': 'gradient', 'document_ids': str(other_document.id)})
+        self.assertEqual(filtered.data['results'], [])
+
+        self.document.deleted_at = timezone.now()
+        self.document.save()
+        self.assertEqual(self.client.get(self.url, {'q': 'gradient'}).data['results'], [])
+
+    def test_rejects_empty_query(self):
+        self.assertEqual(self.client.get(self.url, {'q': ' '}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': '"*'}).data['results'], [])
+
+
+class MetricsEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='test', email='test@e.com', password='pw')
+        self.admin = CustomUser.objects.create_user(username='admin', email='admin@e.com', password='pw', is_staff=True)
+        self.url = '/api/metrics'
+
+    def test_prometheus_text_for_admins(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE llm_limiter_queue_depth gauge', body)
+        self.assertIn('llm_limiter_queue_depth{limiter="chat",priority="interactive"} 0', body)
+        self.assertIn('background_queue_depth', body)
+
+    def test_requires_admin_or_scrape_token(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=None)
+        with patch('api.views.metrics.METRICS_TOKEN', 'scrape-secret'):
+            self.assertEqual(
+                self.client.get(self.url, HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, status.HTTP_200_OK
+            )
+            self.assertNotEqual(
+                self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, status.HTTP_200_OK
+            )
@@ -4,15 +4,18 @@ from . import views
 urlpatterns = [
     path('user', views.RegisterView.as_view(), name='register'), # PUT /user
     path('login', views.CustomLoginView.as_view(), name='login'),
+    path('logout', views.LogoutView.as_view(), name='logout'),
     
     # Projects
     path('projects', views.ProjectListCreateView.as_view(), name='project-list-create'),
     path('projects/<uuid:project_id>', views.ProjectDetailView.as_view(), name='project-detail'),
+    path('projects/<uuid:project_id>/warmup', views.ProjectWarmupView.as_view(), name='project-warmup'),
     
     # Documents
     path('projects/<uuid:project_id>/documents', views.DocumentListUploadView.as_view(), name='document-list-upload'),
     path('projects/<uuid:project_id>/documents/<uuid:document_id>', views.DocumentDeleteView.as_view(), name='document-delete'),
     path('projects/<uuid:project_id>/documents/<uuid:document_id>/pages', views.DocumentPageListView.as_view(), name='document-page-list'),
+    path('projects/<uuid:project_id>/search', views.PageSearchView.as_view(), name='page-search'),
     
     # Chat
     path('projects/<uuid:project_id>/messages', views.MessageListCreateView.as_view(), name='message-list-create'),
@@ -20,7 +23,12 @@ urlpatterns = [
     # Quizzes
     path('projects/<uuid:project_id>/quizzes', views.QuizListCreateView.as_view(), name='quiz-list-create'),
     path('projects/<uuid:project_id>/quizzes/<uuid:quiz_id>', views.QuizDetailView.as_view(), name='quiz-detail'),
+    path('projects/<uuid:project_id>/quiz-jobs/<uuid:job_id>', views.QuizJobDetailView.as_view(), name='quiz-job-detail'),
     
     # Suggestions
     path('projects/<uuid:project_id>/suggested-questions', views.SuggestedQuestionView.as_view(), name='suggested-questions'), # GET suggested questions
+
+    # Operations
+    path('llm-status', views.LLMStatusView.as_view(), name='llm-status'),
+    path('metrics', views.PrometheusMetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
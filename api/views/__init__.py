@@ -1,5 +1,6 @@
-from .auth import RegisterView, CustomLoginView
-from .project import ProjectListCreateView, ProjectDetailView
-from .document import DocumentListUploadView, DocumentDeleteView, DocumentPageListView
+from .auth import RegisterView, CustomLoginView, LogoutView
+from .project import ProjectListCreateView, ProjectDetailView, ProjectWarmupView
+from .document import DocumentListUploadView, DocumentDeleteView, DocumentPageListView, PageSearchView
 from .chat import MessageListCreateView, SuggestedQuestionView
-from .quiz import QuizListCreateView, QuizDetailView
+from .quiz import QuizListCreateView, QuizDetailView, QuizJobDetailView
+from .metrics import LLMStatusView, PrometheusMetricsView
@@ -60,3 +60,14 @@ class CustomLoginView(ObtainAuthToken):
             'username': user.username,
             'email': user.email
         })
+
+class LogoutView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        if request.auth is not None:
+            # Deleting the token also evicts it from the auth cache (see api.signals)
+            Token.objects.filter(key=request.auth.key).delete()
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        response.delete_cookie('auth_token', samesite='Lax')
+        return response
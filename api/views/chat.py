@@ -3,19 +3,44 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from api.models import Project, Message
-from api.serializers import MessageSerializer
+from api.conditional import versioned_response
+from api.pagination import CreatedAtCursorPagination, NewestFirstCursorPagination
+from api.serializers import MessageSerializer, DocumentScopeSerializer
+from api.services import instrumentation
 from api.services.rag_service import RAGService
+from api.services.conversation_service import ConversationService
+from api.services.suggestion_service import SuggestionService
 
 from api.services.rag_service import RAGService
 
+def paginated_messages(request, project, view):
+    """
+    Cursor page of the project's messages, oldest first (?order=newest for
+    chat views that load the latest page and page back), honouring ?fields=.
+    Served with an ETag on the project version and cached per version.
+    """
+    messages = project.messages.all()
+    fields = MessageSerializer.selected_fields(request)
+    if fields:
+        messages = messages.only('project_id', 'created_at', *fields)
+    if request.query_params.get('order') == 'newest':
+        paginator = NewestFirstCursorPagination()
+    else:
+        paginator = CreatedAtCursorPagination()
+
+    def build():
+        page = paginator.paginate_queryset(messages, request, view=view)
+        serializer = MessageSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data).data
+
+    return versioned_response(request, ('messages', project.id, project.version), build)
+
 class MessageListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
-        messages = project.messages.all()
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        return paginated_messages(request, project, self)
 
     def post(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
@@ -24,21 +49,31 @@ class MessageListCreateView(APIView):
         if not content:
             return Response({"error": "Content is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user_message = Message.objects.create(
-            project=project,
-            role='user',
-            content=content
-        )
-        
-        rag_service = RAGService()
-        rag_response = rag_service.get_answer(project_id, content)
-        
-        ai_message = Message.objects.create(
-            project=project,
-            role='assistant',
-            content=rag_response['answer'],
-            sources=rag_response['sources']
-        )
+        scope = DocumentScopeSerializer(data=request.data, context={'project': project})
+        if not scope.is_valid():
+            return Response({"error": scope.errors}, status=status.HTTP_400_BAD_REQUEST)
+        document_ids = scope.validated_data.get('document_ids')
+        with instrumentation.breakdown("message", f"in project {project.id}"):
+            with instrumentation.timed("db_read"):
+                history = ConversationService().get_history(project)
+
+            with instrumentation.timed("db_write"):
+                user_message = Message.objects.create(
+                    project=project,
+                    role='user',
+                    content=content
+                )
+
+            rag_service = RAGService()
+            rag_response = rag_service.get_answer(project_id, content, document_ids=document_ids, history=history)
+
+            with instrumentation.timed("db_write"):
+                ai_message = Message.objects.create(
+                    project=project,
+                    role='assistant',
+                    content=rag_response['answer'],
+                    sources=rag_response['sources']
+                )
 
         serializer = MessageSerializer(ai_message)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -49,10 +84,6 @@ class SuggestedQuestionView(APIView):
     def get(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
         
-        last_message = project.messages.filter(role='assistant').order_by('-created_at').first()
-        last_message_content = last_message.content if last_message else None
-        
-        rag_service = RAGService()
-        questions = rag_service.generate_suggested_questions(project_id, last_message_content)
+        questions = SuggestionService().get_suggestions(project)
         
         return Response(questions, status=status.HTTP_200_OK)
@@ -4,9 +4,16 @@ from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
 from api.models import Project, Document
+from api.conditional import versioned_response
+from api.pagination import CreatedAtCursorPagination, PageNumberCursorPagination
 from api.serializers import DocumentSerializer, DocumentPageSerializer
+from api.services.deletion_service import DeletionService
 from api.services.document_service import DocumentService
+from api.services.page_search import PageSearchService
+from api.services.quiz_service import QuizService
+from api.services.suggestion_service import SuggestionService
 import threading
+import uuid
 
 from api.services.document_service import DocumentService
 import threading
@@ -17,9 +24,13 @@ class DocumentListUploadView(APIView):
 
     def get(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
-        documents = project.documents.all()
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = CreatedAtCursorPagination()
+
+        def build():
+            page = paginator.paginate_queryset(project.documents.all(), request, view=self)
+            return paginator.get_paginated_response(DocumentSerializer(page, many=True).data).data
+
+        return versioned_response(request, ('documents', project.id, project.version), build)
 
     def post(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
@@ -53,22 +64,62 @@ class DocumentDeleteView(APIView):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
         document = get_object_or_404(Document, id=document_id, project=project)
         
-        document_service = DocumentService()
         try:
-            document_service.delete_document_vectors(document)
-            document.file.delete(save=False)
-            document.delete()
+            DeletionService().delete_document(document)
+            SuggestionService().schedule_refresh(project.id)
+            QuizService().schedule_bank_refill(project.id, reset=True)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class DocumentPageListView(generics.ListAPIView):
+    """Pages in page_number order; `?fields=id,page_number` skips the text columns."""
     serializer_class = DocumentPageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PageNumberCursorPagination
+
+    def get_document(self):
+        if not hasattr(self, '_document'):
+            self._document = get_object_or_404(
+                Document, id=self.kwargs['document_id'],
+                project__id=self.kwargs['project_id'], project__owner=self.request.user,
+                project__deleted_at__isnull=True
+            )
+        return self._document
+
+    def list(self, request, *args, **kwargs):
+        document = self.get_document()
+        return versioned_response(
+            request, ('pages', document.id, document.version),
+            lambda: super(DocumentPageListView, self).list(request, *args, **kwargs).data
+        )
 
     def get_queryset(self):
-        project_id = self.kwargs['project_id']
-        document_id = self.kwargs['document_id']
-        project = get_object_or_404(Project, id=project_id, owner=self.request.user)
-        document = get_object_or_404(Document, id=document_id, project=project)
-        return document.pages.all()
+        pages = self.get_document().pages.all()
+        fields = DocumentPageSerializer.selected_fields(self.request)
+        if fields:
+            pages = pages.only('document_id', 'page_number', *fields)
+        return pages
+
+class PageSearchView(APIView):
+    """Keyword search over the project's page text: `?q=term&document_ids=a,b&limit=20`."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, project_id, *args, **kwargs):
+        project = get_object_or_404(Project, id=project_id, owner=request.user)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            document_ids = [
+                uuid.UUID(doc_id) for doc_id in request.query_params.get('document_ids', '').split(',') if doc_id
+            ]
+        except ValueError:
+            return Response({"error": "document_ids must be UUIDs"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = PageSearchService().search(project.id, query, document_ids=document_ids, limit=limit)
+        return Response({"query": query, "results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,45 @@
+import os
+import secrets
+from django.http import HttpResponse
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api.services import instrumentation
+from api.services.background import queue_depth
+from api.services.llm_limiter import get_limiter
+from api.services.llm_router import LLMRouter
+
+# Lets a Prometheus scraper in with "Authorization: Bearer <token>" instead of an admin session
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+class LLMStatusView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            "limiters": {name: get_limiter(name).snapshot() for name in ("chat", "embeddings")},
+            "stages": LLMRouter().metrics(),
+        }, status=status.HTTP_200_OK)
+
+class IsAdminOrMetricsToken(permissions.IsAdminUser):
+    def has_permission(self, request, view):
+        header = request.headers.get('Authorization', '')
+        if METRICS_TOKEN and secrets.compare_digest(header, f"Bearer {METRICS_TOKEN}"):
+            return True
+        return super().has_permission(request, view)
+
+class PrometheusMetricsView(APIView):
+    """Stage latency histograms, token and cache counters and limiter gauges for Prometheus."""
+    permission_classes = [IsAdminOrMetricsToken]
+
+    def get(self, request, *args, **kwargs):
+        gauges = [("background_queue_depth", {}, queue_depth())]
+        for name in ("chat", "embeddings"):
+            snapshot = get_limiter(name).snapshot()
+            for priority, depth in snapshot["queue_depth"].items():
+                gauges.append(("llm_limiter_queue_depth", {"limiter": name, "priority": priority}, depth))
+            for field in ("backoff_seconds", "requests_available", "tokens_available"):
+                gauges.append((f"llm_limiter_{field}", {"limiter": name}, snapshot[field]))
+        return HttpResponse(
+            instrumentation.render_prometheus(gauges), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
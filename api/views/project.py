@@ -1,9 +1,25 @@
-from rest_framework import generics, permissions
-from api.models import Project
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch
+from api.models import Project, Document
+from api.conditional import versioned_response
 from api.serializers import ProjectSerializer
-from api.services.document_service import DocumentService
+from api.services.deletion_service import DeletionService
+from api.services.warmup_service import WarmupService
 
-from api.services.document_service import DocumentService
+def project_queryset(user):
+    """
+    The user's projects with their documents loaded in one extra query,
+    restricted to the columns ProjectSerializer renders.
+    """
+    documents = Document.objects.only(
+        'id', 'project_id', 'name', 'file', 'status', 'processing_message', 'created_at'
+    )
+    return user.projects.only(
+        'id', 'owner_id', 'title', 'description', 'created_at', 'updated_at'
+    ).prefetch_related(Prefetch('documents', queryset=documents))
 
 class ProjectListCreateView(generics.ListCreateAPIView):
     # ... (unchanged)
@@ -11,7 +27,15 @@ class ProjectListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return self.request.user.projects.all()
+        return project_queryset(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        # Project versions are bumped by changes to their documents too
+        versions = tuple(request.user.projects.order_by('id').values_list('id', 'version'))
+        return versioned_response(
+            request, ('projects', request.user.id, versions),
+            lambda: super(ProjectListCreateView, self).list(request, *args, **kwargs).data
+        )
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -23,13 +47,21 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_url_kwarg = 'project_id'
 
     def get_queryset(self):
-        return self.request.user.projects.all()
+        return project_queryset(self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # Opening a project usually precedes its first question
+        WarmupService().schedule(self.kwargs['project_id'])
+        return response
     
     def perform_destroy(self, instance):
-        document_service = DocumentService()
-        for document in instance.documents.all():
-            try:
-                document_service.delete_document_vectors(document)
-            except Exception as e:
-                print(f"Error removing vectors for document {document.id}: {e}")
-        instance.delete()
+        DeletionService().delete_project(instance)
+
+class ProjectWarmupView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, project_id, *args, **kwargs):
+        project = get_object_or_404(Project, id=project_id, owner=request.user)
+        WarmupService().schedule(project.id, force=True)
+        return Response({"status": "scheduled"}, status=status.HTTP_202_ACCEPTED)
@@ -1,37 +1,77 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
-from api.models import Project, Quiz, Message
-from api.serializers import QuizSerializer, MessageSerializer
+from api.models import Project, Quiz, Question, QuizJob, Message
+from api.conditional import versioned_response
+from api.pagination import NewestFirstCursorPagination
+from api.serializers import QuizSerializer, QuizJobSerializer, MessageSerializer, DocumentScopeSerializer
 from api.services.quiz_service import QuizService
 from api.services.rag_service import RAGService
+from api.services.conversation_service import ConversationService
+from .chat import paginated_messages
 
 from api.services.quiz_service import QuizService
 from api.services.rag_service import RAGService
 
+def questions_prefetch(lookup='questions'):
+    """Loads quiz questions in one query, limited to the serialized columns."""
+    return Prefetch(lookup, queryset=Question.objects.only('id', 'quiz_id', 'question_text', 'options', 'answer'))
+
 class QuizListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
-        quizzes = project.quizzes.all().order_by('-created_at')
-        serializer = QuizSerializer(quizzes, many=True)
-        return Response(serializer.data)
+        quizzes = project.quizzes.prefetch_related(questions_prefetch())
+        paginator = NewestFirstCursorPagination()
+
+        def build():
+            page = paginator.paginate_queryset(quizzes, request, view=self)
+            return paginator.get_paginated_response(QuizSerializer(page, many=True).data).data
+
+        return versioned_response(request, ('quizzes', project.id, project.version), build)
 
     def post(self, request, project_id, *args, **kwargs):
         project = get_object_or_404(Project, id=project_id, owner=request.user)
-        num_questions = request.data.get('num_questions', 5)
         quiz_type = request.data.get('quiz_type', 'MULTIPLE_CHOICE')
-        
-        quiz_service = QuizService()
-        quiz = quiz_service.generate_quiz(project_id, num_questions, quiz_type)
-        
-        if quiz:
-            serializer = QuizSerializer(quiz)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        else:
-            return Response({"error": "Failed to generate quiz. Ensure documents are uploaded."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        try:
+            num_questions = int(request.data.get('num_questions', 5))
+        except (TypeError, ValueError):
+            num_questions = 0
+        if not 1 <= num_questions <= 50:
+            return Response({"error": "num_questions must be between 1 and 50"}, status=status.HTTP_400_BAD_REQUEST)
+        if quiz_type not in ('MULTIPLE_CHOICE', 'FLASHCARD'):
+            return Response({"error": "Invalid quiz_type"}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = DocumentScopeSerializer(data=request.data, context={'project': project})
+        if not scope.is_valid():
+            return Response({"error": scope.errors}, status=status.HTTP_400_BAD_REQUEST)
+        document_ids = scope.validated_data.get('document_ids')
+
+        job = QuizJob.objects.create(
+            project=project,
+            quiz_type=quiz_type,
+            num_questions=num_questions,
+            document_ids=document_ids or [],
+            status='queued',
+            processing_message='Queued for generation...'
+        )
+        QuizService().start_job(job)
+
+        return Response(QuizJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class QuizJobDetailView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, project_id, job_id, *args, **kwargs):
+        jobs = QuizJob.objects.select_related('quiz').prefetch_related(questions_prefetch('quiz__questions'))
+        job = get_object_or_404(
+            jobs, id=job_id, project__id=project_id, project__owner=request.user, project__deleted_at__isnull=True
+        )
+        return Response(QuizJobSerializer(job).data, status=status.HTTP_200_OK)
 
 class QuizDetailView(generics.RetrieveAPIView):
     serializer_class = QuizSerializer
@@ -41,7 +81,9 @@ class QuizDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
-        return Quiz.objects.filter(project__id=project_id, project__owner=self.request.user)
+        return Quiz.objects.filter(
+            project__id=project_id, project__owner=self.request.user, project__deleted_at__isnull=True
+        )
 
     def get(self, request, project_id, *args, **kwargs):
         # Override get to return messages? - wait, original code returned messages for GET on quiz detail???
@@ -56,9 +98,7 @@ class QuizDetailView(generics.RetrieveAPIView):
         # I must copy logic exactly.
         
         project = get_object_or_404(Project, id=project_id, owner=request.user)
-        messages = project.messages.all().order_by('created_at')
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_messages(request, project, self)
 
     def post(self, request, project_id, *args, **kwargs):
         # Original code had POST on QuizDetailView to send messages? 
@@ -70,6 +110,12 @@ class QuizDetailView(generics.RetrieveAPIView):
         if not content:
             return Response({"error": "Content is required"}, status=status.HTTP_400_BAD_REQUEST)
 
+        scope = DocumentScopeSerializer(data=request.data, context={'project': project})
+        if not scope.is_valid():
+            return Response({"error": scope.errors}, status=status.HTTP_400_BAD_REQUEST)
+        document_ids = scope.validated_data.get('document_ids')
+        history = ConversationService().get_history(project)
+
         user_message = Message.objects.create(
             project=project,
             role='user',
@@ -77,7 +123,7 @@ class QuizDetailView(generics.RetrieveAPIView):
         )
         
         rag_service = RAGService()
-        rag_response = rag_service.get_answer(project_id, content)
+        rag_response = rag_service.get_answer(project_id, content, document_ids=document_ids, history=history)
 
         ai_message = Message.objects.create(
             project=project,
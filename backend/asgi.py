@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Only servers load this module, so management commands and tests skip the prewarm
+from api.services.warmup_service import WarmupService  # noqa: E402
+
+WarmupService().schedule_recent_per_worker()
@@ -62,6 +62,7 @@ CORS_ALLOW_CREDENTIALS = True  # Allow cookies to be sent
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,12 +95,85 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE selects the database setup:
+#   sqlite         - WAL journal, busy timeout, synchronous=NORMAL and persistent
+#                    connections so background ingestion doesn't lock out readers (default)
+#   sqlite-legacy  - stock rollback-journal SQLite, kept for comparison
+#   postgres       - PostgreSQL (requires `psycopg[binary,pool]`), pooled by default
+DB_PROFILE = os.getenv('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    POSTGRES_POOL = os.getenv('POSTGRES_POOL', 'true').lower() == 'true'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'sogong'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            # Django's pool and CONN_MAX_AGE are mutually exclusive; without the pool
+            # connections persist per thread for CONN_MAX_AGE seconds instead.
+            'CONN_MAX_AGE': 0 if POSTGRES_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+                    'timeout': 10,
+                },
+            } if POSTGRES_POOL else {},
+        }
     }
-}
+elif DB_PROFILE == 'sqlite-legacy':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Writers take the lock at BEGIN, so they queue on the busy timeout
+                # instead of failing with "database is locked" when upgrading a read lock
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000'
+                ),
+            },
+        }
+    }
+
+# Cache for serialized read responses (api/conditional.py). Entries are keyed on
+# version counters, so a per-process local-memory cache stays correct; CACHE_BACKEND=file
+# shares entries between worker processes on one host.
+if os.getenv('CACHE_BACKEND', 'locmem') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / '.cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '2000'))},
+        }
+    }
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,4 +231,13 @@ REST_FRAMEWORK = {
         # Use custom cookie-based token authentication
         'api.authentication.CookieTokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from 'react'
 import DocumentViewerModal from '@/features/document/ui/DocumentViewerModal'
-import { getDocuments } from '@/shared/lib/api'
+import { getProject } from '@/shared/lib/api'
 
 export default function InterceptedDocumentPage({ params, searchParams }: { params: Promise<{ id: string, docId: string }>, searchParams: Promise<{ page?: string }> }) {
     const [projectId, setProjectId] = useState<string | null>(null)
@@ -27,8 +27,9 @@ export default function InterceptedDocumentPage({ params, searchParams }: { para
         const fetchDocName = async () => {
             if (projectId && docId) {
                 try {
-                    const docs = await getDocuments(projectId)
-                    const doc = docs.find((d: any) => d.id === docId)
+                    // The project detail embeds its documents, so no list paging is needed
+                    const project = await getProject(projectId)
+                    const doc = project.documents.find((d: any) => d.id === docId)
                     if (doc) {
                         setDocName(doc.name)
                     }
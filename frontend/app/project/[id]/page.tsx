@@ -16,6 +16,8 @@ export default function ProjectPage({ params }: { params: Promise<{ id: string }
     const [project, setProject] = useState<any>(null)
     const [documents, setDocuments] = useState<any[]>([])
     const [messages, setMessages] = useState<any[]>([])
+    const [documentsCursor, setDocumentsCursor] = useState<string | null>(null)
+    const [messagesCursor, setMessagesCursor] = useState<string | null>(null)
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<string | null>(null)
 
@@ -46,8 +48,10 @@ export default function ProjectPage({ params }: { params: Promise<{ id: string }
                 minLoadTime
             ])
             setProject(projectData)
-            setDocuments(docsData)
-            setMessages(msgsData)
+            setDocuments(docsData.results)
+            setDocumentsCursor(docsData.next)
+            setMessages(msgsData.results)
+            setMessagesCursor(msgsData.next)
         } catch (err: any) {
             setError(err.message)
         } finally {
@@ -63,8 +67,10 @@ export default function ProjectPage({ params }: { params: Promise<{ id: string }
 
         const interval = setInterval(async () => {
             try {
-                const updatedDocs = await getDocuments(projectId)
-                setDocuments(updatedDocs)
+                // One request covering the documents already shown; statuses are merged by id
+                const updated = await getDocuments(projectId, null, Math.min(Math.max(documents.length, 50), 200))
+                const byId = new Map<string, any>(updated.results.map((doc: any) => [doc.id, doc] as [string, any]))
+                setDocuments(prev => prev.map(doc => byId.get(doc.id) ?? doc))
             } catch (err) {
                 console.error("Error polling documents:", err)
             }
@@ -73,6 +79,32 @@ export default function ProjectPage({ params }: { params: Promise<{ id: string }
         return () => clearInterval(interval)
     }, [documents, projectId])
 
+    const loadMoreDocuments = async () => {
+        if (!projectId || !documentsCursor) return
+        try {
+            const page = await getDocuments(projectId, documentsCursor)
+            setDocuments(prev => {
+                // Uploads are shown right away, so a later page can repeat them
+                const seen = new Set(prev.map(doc => doc.id))
+                return [...prev, ...page.results.filter((doc: any) => !seen.has(doc.id))]
+            })
+            setDocumentsCursor(page.next)
+        } catch (err: any) {
+            setError(err.message)
+        }
+    }
+
+    const loadEarlierMessages = async () => {
+        if (!projectId || !messagesCursor) return
+        try {
+            const page = await getMessages(projectId, messagesCursor)
+            setMessages(prev => [...page.results, ...prev])
+            setMessagesCursor(page.next)
+        } catch (err: any) {
+            setError(err.message)
+        }
+    }
+
 
     if (authLoading || loading) {
         return <Loading />
@@ -94,6 +126,8 @@ export default function ProjectPage({ params }: { params: Promise<{ id: string }
                 documents={documents}
                 setDocuments={setDocuments}
                 setError={setError}
+                hasMore={documentsCursor !== null}
+                onLoadMore={loadMoreDocuments}
             />
 
             {/* Main Content - Chat */}
@@ -103,6 +137,8 @@ export default function ProjectPage({ params }: { params: Promise<{ id: string }
                 messages={messages}
                 setMessages={setMessages}
                 setError={setError}
+                hasEarlier={messagesCursor !== null}
+                onLoadEarlier={loadEarlierMessages}
                 onUpdateTitle={(newTitle) => setProject({ ...project, title: newTitle })}
             />
 
@@ -3,7 +3,7 @@
 import { createContext, useContext, useEffect, useState } from 'react'
 import { Session, User } from '@supabase/supabase-js'
 import { supabase } from '../../../shared/lib/supabaseClient'
-import { syncUserToBackend } from '../../../shared/lib/api'
+import { logoutFromBackend, syncUserToBackend } from '../../../shared/lib/api'
 import { useRouter } from 'next/navigation'
 
 interface AuthContextType {
@@ -58,6 +58,7 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
     }, [])
 
     const signOut = async () => {
+        await logoutFromBackend().catch(console.error)
         await supabase.auth.signOut()
         router.push('/')
     }
@@ -19,10 +19,13 @@ export default function DocumentViewerModal({ projectId, docId, initialPage, onC
     const router = useRouter()
     const searchParams = useSearchParams()
     const [documentPages, setDocumentPages] = useState<any[]>([])
+    const [pagesCursor, setPagesCursor] = useState<string | null>(null)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<string | null>(null)
     const [targetPage, setTargetPage] = useState<number | null>(initialPage || null)
     const viewerContentRef = useRef<HTMLDivElement>(null)
+    const loadMoreRef = useRef<HTMLDivElement>(null)
 
     useEffect(() => {
         if (!initialPage) {
@@ -37,8 +40,9 @@ export default function DocumentViewerModal({ projectId, docId, initialPage, onC
         const loadPages = async () => {
             try {
                 setLoading(true)
-                const pages = await getDocumentPages(projectId, docId)
-                setDocumentPages(pages)
+                const page = await getDocumentPages(projectId, docId)
+                setDocumentPages(page.results)
+                setPagesCursor(page.next)
             } catch (err: any) {
                 setError(err.message)
             } finally {
@@ -51,8 +55,44 @@ export default function DocumentViewerModal({ projectId, docId, initialPage, onC
         }
     }, [projectId, docId])
 
+    const loadMorePages = async () => {
+        if (!pagesCursor || loadingMore) return
+        try {
+            setLoadingMore(true)
+            const page = await getDocumentPages(projectId, docId, pagesCursor)
+            setDocumentPages(prev => [...prev, ...page.results])
+            setPagesCursor(page.next)
+        } catch (err: any) {
+            setError(err.message)
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
+    // Pages load as the reader scrolls near the end of what is loaded
+    useEffect(() => {
+        const sentinel = loadMoreRef.current
+        if (!sentinel || !pagesCursor) return
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) {
+                loadMorePages()
+            }
+        }, { root: viewerContentRef.current, rootMargin: '400px' })
+        observer.observe(sentinel)
+        return () => observer.disconnect()
+    }, [pagesCursor, loadingMore, documentPages])
+
+    // A deep link to a later page keeps loading until that page is present
     useEffect(() => {
-        if (targetPage && documentPages.length > 0) {
+        if (!targetPage || loading || !pagesCursor) return
+        const lastLoaded = documentPages[documentPages.length - 1]?.page_number ?? 0
+        if (lastLoaded < targetPage) {
+            loadMorePages()
+        }
+    }, [targetPage, documentPages, pagesCursor, loading, loadingMore])
+
+    useEffect(() => {
+        if (targetPage && documentPages.some(page => page.page_number === targetPage)) {
             setTimeout(() => {
                 const pageElement = document.getElementById(`page-${targetPage}`)
                 if (pageElement) {
@@ -60,7 +100,7 @@ export default function DocumentViewerModal({ projectId, docId, initialPage, onC
                 }
             }, 500)
         }
-    }, [targetPage, documentPages])
+    }, [targetPage, documentPages.some(page => page.page_number === targetPage)])
 
     const handleClose = () => {
         if (onClose) {
@@ -180,6 +220,13 @@ export default function DocumentViewerModal({ projectId, docId, initialPage, onC
                                             No pages found.
                                         </div>
                                     )}
+                                    {pagesCursor && (
+                                        <div ref={loadMoreRef} className="flex justify-center py-6">
+                                            {loadingMore && (
+                                                <div className="h-6 w-6 animate-spin rounded-full border-2 border-primary border-t-transparent" />
+                                            )}
+                                        </div>
+                                    )}
                                 </div>
                             </div>
                         </>
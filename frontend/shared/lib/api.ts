@@ -1,5 +1,29 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000/api';
 
+// List endpoints are cursor-paginated ({ next, previous, results }). Callers get one page and
+// pass `next` back as the cursor to load more on demand.
+export interface CursorPage<T = any> {
+    results: T[];
+    next: string | null;
+}
+
+const fetchPage = async (url: string, errorMessage: string): Promise<CursorPage> => {
+    const response = await fetch(url, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+    });
+
+    if (!response.ok) {
+        throw new Error(errorMessage);
+    }
+
+    const page = await response.json();
+    return { results: page.results, next: page.next };
+};
+
 export const syncUserToBackend = async (user: any) => {
     try {
         const response = await fetch(`${API_BASE_URL}/user`, {
@@ -26,6 +50,22 @@ export const syncUserToBackend = async (user: any) => {
     }
 };
 
+export const logoutFromBackend = async () => {
+    try {
+        const response = await fetch(`${API_BASE_URL}/logout`, {
+            method: 'POST',
+            credentials: 'include',
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to log out from backend');
+        }
+    } catch (error) {
+        console.error('Error logging out:', error);
+        throw error;
+    }
+};
+
 // Projects
 export const getProjects = async () => {
     try {
@@ -134,21 +174,10 @@ export const deleteProject = async (projectId: string) => {
 };
 
 // Documents
-export const getDocuments = async (projectId: string) => {
+export const getDocuments = async (projectId: string, cursor?: string | null, pageSize?: number) => {
     try {
-        const response = await fetch(`${API_BASE_URL}/projects/${projectId}/documents`, {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            credentials: 'include',
-        });
-
-        if (!response.ok) {
-            throw new Error('Failed to fetch documents');
-        }
-
-        return await response.json();
+        const query = pageSize ? `?page_size=${pageSize}` : '';
+        return await fetchPage(cursor || `${API_BASE_URL}/projects/${projectId}/documents${query}`, 'Failed to fetch documents');
     } catch (error) {
         console.error('Error fetching documents:', error);
         throw error;
@@ -193,31 +222,26 @@ export const deleteDocument = async (projectId: string, documentId: string) => {
     }
 };
 
-export const getDocumentPages = async (projectId: string, documentId: string) => {
+export const getDocumentPages = async (projectId: string, documentId: string, cursor?: string | null) => {
     try {
-        const response = await fetch(`${API_BASE_URL}/projects/${projectId}/documents/${documentId}/pages`, {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            credentials: 'include',
-        });
-
-        if (!response.ok) {
-            throw new Error('Failed to fetch document pages');
-        }
-
-        return await response.json();
+        return await fetchPage(
+            cursor || `${API_BASE_URL}/projects/${projectId}/documents/${documentId}/pages?page_size=10`,
+            'Failed to fetch document pages'
+        );
     } catch (error) {
         console.error('Error fetching document pages:', error);
         throw error;
     }
 };
 
-// Messages
-export const getMessages = async (projectId: string) => {
+// Snippets are HTML-escaped page text with matches wrapped in <mark>
+export const searchPages = async (projectId: string, query: string, documentIds?: string[]) => {
     try {
-        const response = await fetch(`${API_BASE_URL}/projects/${projectId}/messages`, {
+        const params = new URLSearchParams({ q: query });
+        if (documentIds && documentIds.length > 0) {
+            params.set('document_ids', documentIds.join(','));
+        }
+        const response = await fetch(`${API_BASE_URL}/projects/${projectId}/search?${params}`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -226,17 +250,30 @@ export const getMessages = async (projectId: string) => {
         });
 
         if (!response.ok) {
-            throw new Error('Failed to fetch messages');
+            throw new Error('Failed to search pages');
         }
 
-        return await response.json();
+        const data = await response.json();
+        return data.results;
+    } catch (error) {
+        console.error('Error searching pages:', error);
+        throw error;
+    }
+};
+
+// Messages
+// Newest page first; `next` pages back to earlier messages. Each page is returned oldest first.
+export const getMessages = async (projectId: string, cursor?: string | null) => {
+    try {
+        const page = await fetchPage(cursor || `${API_BASE_URL}/projects/${projectId}/messages?order=newest`, 'Failed to fetch messages');
+        return { results: page.results.reverse(), next: page.next };
     } catch (error) {
         console.error('Error fetching messages:', error);
         throw error;
     }
 };
 
-export const sendMessage = async (projectId: string, content: string) => {
+export const sendMessage = async (projectId: string, content: string, documentIds?: string[]) => {
     try {
         const response = await fetch(`${API_BASE_URL}/projects/${projectId}/messages`, {
             method: 'POST',
@@ -244,7 +281,7 @@ export const sendMessage = async (projectId: string, content: string) => {
                 'Content-Type': 'application/json',
             },
             credentials: 'include',
-            body: JSON.stringify({ content }),
+            body: JSON.stringify({ content, document_ids: documentIds }),
         });
 
         if (!response.ok) {
@@ -257,7 +294,27 @@ export const sendMessage = async (projectId: string, content: string) => {
 };
 
 // Quizzes
-export const generateQuiz = async (projectId: string, numQuestions: number = 5, quizType: 'MULTIPLE_CHOICE' | 'FLASHCARD' = 'MULTIPLE_CHOICE') => {
+const QUIZ_JOB_POLL_INTERVAL_MS = 1500;
+const QUIZ_JOB_TIMEOUT_MS = 3 * 60 * 1000;
+
+export const getQuizJob = async (projectId: string, jobId: string) => {
+    const response = await fetch(`${API_BASE_URL}/projects/${projectId}/quiz-jobs/${jobId}`, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+    });
+
+    if (!response.ok) {
+        throw new Error('Failed to fetch quiz job');
+    }
+
+    return await response.json();
+};
+
+// Quiz generation runs as a background job; poll it until the quiz is ready.
+export const generateQuiz = async (projectId: string, numQuestions: number = 5, quizType: 'MULTIPLE_CHOICE' | 'FLASHCARD' = 'MULTIPLE_CHOICE', documentIds?: string[]) => {
     try {
         const response = await fetch(`${API_BASE_URL}/projects/${projectId}/quizzes`, {
             method: 'POST',
@@ -265,7 +322,7 @@ export const generateQuiz = async (projectId: string, numQuestions: number = 5,
                 'Content-Type': 'application/json',
             },
             credentials: 'include',
-            body: JSON.stringify({ num_questions: numQuestions, quiz_type: quizType }),
+            body: JSON.stringify({ num_questions: numQuestions, quiz_type: quizType, document_ids: documentIds }),
         });
 
         if (!response.ok) {
@@ -273,7 +330,21 @@ export const generateQuiz = async (projectId: string, numQuestions: number = 5,
             throw new Error(error.error || 'Failed to generate quiz');
         }
 
-        return response.json();
+        let job = await response.json();
+        const deadline = Date.now() + QUIZ_JOB_TIMEOUT_MS;
+        while (job.status !== 'completed' && job.status !== 'failed') {
+            if (Date.now() > deadline) {
+                throw new Error('Quiz generation timed out');
+            }
+            await new Promise((resolve) => setTimeout(resolve, QUIZ_JOB_POLL_INTERVAL_MS));
+            job = await getQuizJob(projectId, job.id);
+        }
+
+        if (job.status === 'failed') {
+            throw new Error(job.processing_message || 'Failed to generate quiz');
+        }
+
+        return job.quiz;
     } catch (error) {
         throw error
     }
@@ -297,21 +368,9 @@ export const getSuggestedQuestions = async (projectId: string) => {
     }
 }
 
-export const getQuizzes = async (projectId: string) => {
+export const getQuizzes = async (projectId: string, cursor?: string | null) => {
     try {
-        const response = await fetch(`${API_BASE_URL}/projects/${projectId}/quizzes`, {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            credentials: 'include',
-        });
-
-        if (!response.ok) {
-            throw new Error('Failed to fetch quizzes');
-        }
-
-        return await response.json();
+        return await fetchPage(cursor || `${API_BASE_URL}/projects/${projectId}/quizzes`, 'Failed to fetch quizzes');
     } catch (error) {
         console.error('Error fetching quizzes:', error);
         throw error;
@@ -22,9 +22,11 @@ interface ChatInterfaceProps {
     setMessages: React.Dispatch<React.SetStateAction<any[]>>
     setError: (err: string) => void
     onUpdateTitle: (newTitle: string) => void
+    hasEarlier?: boolean
+    onLoadEarlier?: () => void
 }
 
-export function ChatInterface({ projectId, projectTitle, messages, setMessages, setError, onUpdateTitle }: ChatInterfaceProps) {
+export function ChatInterface({ projectId, projectTitle, messages, setMessages, setError, onUpdateTitle, hasEarlier, onLoadEarlier }: ChatInterfaceProps) {
     const [newMessage, setNewMessage] = useState('')
     const [sending, setSending] = useState(false)
     const [suggestedQuestions, setSuggestedQuestions] = useState<string[]>([])
@@ -39,9 +41,11 @@ export function ChatInterface({ projectId, projectTitle, messages, setMessages,
         }
     }, [projectId])
 
+    // Only new messages at the bottom scroll; loading earlier ones keeps the position
+    const lastMessage = messages[messages.length - 1]
     useEffect(() => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
-    }, [messages])
+    }, [lastMessage])
 
     const loadSuggestedQuestions = async () => {
         if (!projectId) return
@@ -138,6 +142,17 @@ export function ChatInterface({ projectId, projectTitle, messages, setMessages,
             {/* Messages Area */}
             <div className="flex-1 overflow-y-auto p-6 scroll-smooth">
                 <div className="mx-auto max-w-3xl space-y-8 pb-4">
+                    {hasEarlier && (
+                        <div className="flex justify-center">
+                            <button
+                                onClick={onLoadEarlier}
+                                className="rounded-full px-4 py-1.5 text-xs font-medium text-muted-foreground ring-1 ring-border transition-colors hover:bg-muted hover:text-foreground"
+                            >
+                                Load earlier messages
+                            </button>
+                        </div>
+                    )}
+
                     {messages.length === 0 && (
                         <div className="mt-20 flex flex-col items-center justify-center space-y-4 text-center opacity-0 animate-fade-in-up">
                             <div className="rounded-full bg-primary/10 p-4 ring-1 ring-primary/20">
@@ -19,9 +19,11 @@ interface ProjectSidebarProps {
     documents: Document[]
     setDocuments: React.Dispatch<React.SetStateAction<any[]>>
     setError: (err: string) => void
+    hasMore?: boolean
+    onLoadMore?: () => void
 }
 
-export function ProjectSidebar({ projectId, documents, setDocuments, setError }: ProjectSidebarProps) {
+export function ProjectSidebar({ projectId, documents, setDocuments, setError, hasMore, onLoadMore }: ProjectSidebarProps) {
     const fileInputRef = useRef<HTMLInputElement>(null)
 
     const handleFileUpload = async (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -134,6 +136,15 @@ export function ProjectSidebar({ projectId, documents, setDocuments, setError }:
                         </div>
                     ))}
                 </div>
+
+                {hasMore && (
+                    <button
+                        onClick={onLoadMore}
+                        className="mt-2 w-full rounded-lg px-3 py-2 text-xs font-medium text-muted-foreground transition-colors hover:bg-sidebar-accent hover:text-foreground"
+                    >
+                        Load more
+                    </button>
+                )}
             </div>
 
             <div className="border-t border-sidebar-border p-4">
@@ -13,6 +13,7 @@ interface ToolsPanelProps {
 
 export function ToolsPanel({ projectId, documentsCount, setError }: ToolsPanelProps) {
     const [quizzes, setQuizzes] = useState<any[]>([])
+    const [quizzesCursor, setQuizzesCursor] = useState<string | null>(null)
     const [currentQuiz, setCurrentQuiz] = useState<any>(null)
     const [quizAnswers, setQuizAnswers] = useState<Record<string, string>>({})
     const [quizResult, setQuizResult] = useState<any>(null)
@@ -27,8 +28,23 @@ export function ToolsPanel({ projectId, documentsCount, setError }: ToolsPanelPr
 
     const loadQuizzes = async () => {
         try {
-            const data = await getQuizzes(projectId)
-            setQuizzes(data)
+            const page = await getQuizzes(projectId)
+            setQuizzes(page.results)
+            setQuizzesCursor(page.next)
+        } catch (err: any) {
+            console.error(err)
+        }
+    }
+
+    const loadMoreQuizzes = async () => {
+        if (!quizzesCursor) return
+        try {
+            const page = await getQuizzes(projectId, quizzesCursor)
+            setQuizzes(prev => {
+                const seen = new Set(prev.map(quiz => quiz.id))
+                return [...prev, ...page.results.filter((quiz: any) => !seen.has(quiz.id))]
+            })
+            setQuizzesCursor(page.next)
         } catch (err: any) {
             console.error(err)
         }
@@ -145,6 +161,14 @@ export function ToolsPanel({ projectId, documentsCount, setError }: ToolsPanelPr
                                         </button>
                                     ))}
                                 </div>
+                                {quizzesCursor && (
+                                    <button
+                                        onClick={loadMoreQuizzes}
+                                        className="mt-2 w-full rounded-lg px-3 py-2 text-xs font-medium text-muted-foreground transition-colors hover:bg-muted hover:text-foreground"
+                                    >
+                                        Load more
+                                    </button>
+                                )}
                             </div>
                         )}
                     </div>